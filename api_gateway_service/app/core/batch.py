@@ -0,0 +1,121 @@
+import json
+from typing import Any
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field
+from starlette.responses import Response, StreamingResponse
+
+# Заголовки родительского запроса, которые не переносятся в подзапросы
+_NOT_INHERITED_HEADERS = {"host", "content-length", "content-type", "content-encoding", "transfer-encoding",
+                          "accept-encoding", "if-none-match", "if-modified-since"}
+
+
+class BatchItem(BaseModel):
+    id: str | None = None  # произвольная метка клиента, возвращается в ответе как есть
+    method: str = Field("GET", pattern="^(GET|POST|PUT|PATCH|DELETE)$")
+    path: str = Field(..., min_length=1)  # путь с query-строкой, например "/posts/?category_id=1"
+    headers: dict[str, str] = {}
+    body: Any = None  # JSON-тело подзапроса
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(..., min_length=1)
+
+
+class BatchItemTooLarge(Exception):
+    pass
+
+
+class InvalidBatchItem(ValueError):
+    """Подзапрос нельзя отправить как HTTP-запрос, например заголовок не в latin-1."""
+
+
+def split_path(raw: str) -> tuple[str, str]:
+    """"/posts/?skip=10" -> ("posts/", "skip=10"): путь для таблицы маршрутов и query-строка."""
+    parts = urlsplit(raw)
+    return parts.path.lstrip("/"), parts.query
+
+
+def build_scope(parent: dict, item: BatchItem) -> tuple[dict, bytes]:
+    """ASGI scope подзапроса и его тело.
+
+    Заголовки (авторизация, ключ клиента) наследуются от запроса /batch,
+    заголовки элемента их дополняют. Сжатие отключается: тела ответов
+    встраиваются в общий JSON.
+    """
+    path, query = split_path(item.path)
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+
+    headers = {key: value for key, value in
+               ((key.decode("latin-1").lower(), value.decode("latin-1")) for key, value in parent["headers"])
+               if key not in _NOT_INHERITED_HEADERS}
+    headers.update({key.lower(): value for key, value in item.headers.items()})
+    headers["accept-encoding"] = "identity"
+    if body:
+        headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(body))
+
+    try:
+        raw_headers = [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
+    except UnicodeEncodeError:
+        raise InvalidBatchItem("Header names and values must be latin-1") from None
+
+    scope = {
+        "type": "http", "asgi": parent.get("asgi", {"version": "3.0"}), "http_version": parent.get("http_version", "1.1"),
+        "method": item.method, "scheme": parent.get("scheme", "http"), "root_path": parent.get("root_path", ""),
+        "path": f"/{path}", "raw_path": f"/{path}".encode(), "query_string": query.encode(),
+        "headers": raw_headers,
+        "client": parent.get("client"), "server": parent.get("server"), "app": parent.get("app"),
+        "path_params": {"path": path}, "state": {},
+    }
+    return scope, body
+
+
+def body_receiver(body: bytes):
+    sent = False
+
+    async def receive() -> dict:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+    return receive
+
+
+async def read_response(response: Response, max_bytes: int) -> bytes:
+    """Читает тело ответа proxy_request целиком и выполняет его фоновую задачу.
+
+    Потоковый ответ больше max_bytes прерывается (BatchItemTooLarge), но
+    соединение с upstream всё равно освобождается фоновой задачей.
+    """
+    try:
+        if not isinstance(response, StreamingResponse):
+            return response.body
+        chunks, size = [], 0
+        iterator = response.body_iterator
+        try:
+            async for chunk in iterator:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BatchItemTooLarge(size)
+                chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        return b"".join(chunks)
+    finally:
+        if response.background is not None:
+            await response.background()
+
+
+def decode_body(headers: dict[str, str], body: bytes) -> Any:
+    """JSON-ответ встраивается как JSON, остальное - как текст."""
+    if not body:
+        return None
+    if "json" in headers.get("content-type", ""):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(frozen=True)
+class BulkheadSettings:
+    max_in_flight: int = 100  # запросы к upstream маршрута, включая ещё не дочитанные ответы; 0 - без ограничения
+    queue_size: int = 100  # сколько запросов может ждать места
+    queue_timeout_s: float = 0.5  # сколько запрос ждёт в очереди, прежде чем получить 503
+    retry_after_s: int = 1
+    # Очередь по клиентам: место получает клиент с наименьшей долей обслуживания с учётом веса
+    fair_queue: bool = False
+    client_weights: dict[str, float] = field(default_factory=dict)  # вес по имени клиента, по умолчанию 1
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "BulkheadSettings | None" = None) -> "BulkheadSettings":
+        base = defaults or cls()
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown bulkhead settings: {sorted(unknown)}")
+        settings = cls(**{name: data.get(name, getattr(base, name)) for name in known})
+        if settings.max_in_flight < 0 or settings.queue_size < 0:
+            raise ValueError(f"Bulkhead limits must not be negative: {data}")
+        if any(weight <= 0 for weight in settings.client_weights.values()):
+            raise ValueError(f"Bulkhead client weights must be positive: {settings.client_weights}")
+        return settings
+
+
+class BulkheadFull(Exception):
+    """Все места отсека заняты, а очередь полна или ожидание истекло."""
+
+    def __init__(self, name: str, retry_after_s: int, reason: str):
+        super().__init__(f"Bulkhead {name} is full ({reason})")
+        self.retry_after_s = retry_after_s
+        self.reason = reason
+
+
+class Bulkhead:
+    """Отсек одного upstream: жёсткий предел одновременных запросов и своя очередь.
+
+    Место занято, пока ответ upstream не освобождён, то есть вместе с
+    соединением и буферами ответа. Поэтому медленный сервис может занять
+    только свой отсек, а запросы к остальным сервисам его не ждут.
+
+    Ожидающие запросы упорядочены по виртуальному времени окончания
+    (weighted fair queueing): каждый запрос клиента сдвигает его метку на
+    1 / weight, так что клиент, заваливший сервис запросами, ждёт свою
+    очередь, а остальные клиенты получают места пропорционально весам.
+    Без fair_queue очередь обычная, по порядку прихода.
+    """
+
+    def __init__(self, name: str, settings: BulkheadSettings = BulkheadSettings()):
+        self.name = name
+        self.settings = settings
+        self.in_flight = 0
+        self._heap: list[tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._finish: dict[str, float] = {}
+        self.queued_now = 0
+        self.max_queued = 0
+        self.accepted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.wait_count = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def _has_room(self) -> bool:
+        return not self.settings.max_in_flight or self.in_flight < self.settings.max_in_flight
+
+    async def acquire(self, client: str | None = None):
+        if self._has_room() and not self.queued_now:
+            self.in_flight += 1
+            self.accepted += 1
+            return
+        if self.queued_now >= self.settings.queue_size:
+            self.rejected_full += 1
+            raise BulkheadFull(self.name, self.settings.retry_after_s, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (self._tag(client), next(self._sequence), waiter)
+        heapq.heappush(self._heap, entry)
+        self.queued_now += 1
+        self.max_queued = max(self.max_queued, self.queued_now)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.settings.queue_timeout_s)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Место передали в последний момент: возвращаем его
+                self.release()
+            else:
+                waiter.cancel()
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                self.queued_now -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise BulkheadFull(self.name, self.settings.retry_after_s, "queue_timeout") from None
+            raise
+        waited = time.perf_counter() - started
+        self.accepted += 1
+        self.wait_count += 1
+        self.wait_total_s += waited
+        self.wait_max_s = max(self.wait_max_s, waited)
+
+    def _tag(self, client: str | None) -> float:
+        if not self.settings.fair_queue:
+            return 0.0  # порядок задаёт номер в очереди
+        key = client or ""
+        weight = self.settings.client_weights.get(key, 1.0)
+        tag = max(self._virtual_time, self._finish.get(key, 0.0)) + 1 / weight
+        self._finish[key] = tag
+        return tag
+
+    def release(self):
+        self.in_flight -= 1
+        while self._heap and self._has_room():
+            tag, _, waiter = heapq.heappop(self._heap)
+            self._virtual_time = max(self._virtual_time, tag)
+            self.queued_now -= 1
+            self.in_flight += 1
+            waiter.set_result(None)
+        if not self._heap:
+            # Очередь пуста: метки клиентов не больше виртуального времени и больше не нужны
+            self._finish.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_in_flight": self.settings.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued_now": self.queued_now,
+            "max_queued": self.max_queued,
+            "fair_queue": self.settings.fair_queue,
+            "accepted": self.accepted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_queue_timeout": self.rejected_timeout,
+            "wait_avg_ms": round(self.wait_total_s / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+            "wait_max_ms": round(self.wait_max_s * 1000, 3),
+        }
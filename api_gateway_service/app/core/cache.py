@@ -0,0 +1,155 @@
+import base64
+import json
+from dataclasses import asdict, dataclass
+from typing import Mapping
+from urllib.parse import urlencode
+
+import redis.asyncio as redis
+from starlette.datastructures import QueryParams
+
+from app.core.logging import get_logger
+
+logger = get_logger("api_gateway")
+
+# Ответы с этими заголовками нельзя отдавать другим клиентам
+PRIVATE_RESPONSE_HEADERS = ("set-cookie",)
+
+
+@dataclass
+class CachedResponse:
+    """Ответ upstream, сохранённый в кэше."""
+    status_code: int
+    headers: dict[str, str]
+    body: bytes
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "status_code": self.status_code,
+            "headers": self.headers,
+            "body": base64.b64encode(self.body).decode("ascii"),
+        })
+
+    @classmethod
+    def loads(cls, raw: str) -> "CachedResponse":
+        data = json.loads(raw)
+        return cls(status_code=data["status_code"], headers=data["headers"],
+                   body=base64.b64decode(data["body"]))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypasses: int = 0
+    stores: int = 0
+    invalidations: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        lookups = self.hits + self.misses
+        data["hit_ratio"] = round(self.hits / lookups, 4) if lookups else 0.0
+        return data
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """Разбирает Cache-Control в словарь директив: {"max-age": "0", "no-cache": None}."""
+    directives: dict[str, str | None] = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def is_cache_bypassed(headers: Mapping[str, str]) -> bool:
+    """Клиент просит не отдавать ответ из кэша."""
+    if "authorization" in headers:
+        return True
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-cache" in directives or "no-store" in directives:
+        return True
+    return directives.get("max-age") == "0" or "no-cache" in headers.get("pragma", "").lower()
+
+
+def is_cacheable(status_code: int, headers: Mapping[str, str]) -> bool:
+    """Можно ли сохранить ответ upstream в общий кэш."""
+    if status_code != 200:
+        return False
+    if any(name in headers for name in PRIVATE_RESPONSE_HEADERS):
+        return False
+    directives = parse_cache_control(headers.get("cache-control"))
+    return not ("no-store" in directives or "private" in directives)
+
+
+def parse_ttls(value: str) -> dict[str, int]:
+    """Разбирает строку вида "categories=60,posts=10" в словарь TTL по префиксам."""
+    ttls = {}
+    for item in value.split(","):
+        prefix, _, ttl = item.strip().partition("=")
+        if prefix and ttl:
+            ttls[prefix.strip()] = int(ttl)
+    return ttls
+
+
+class ResponseCache:
+    """Кэш ответов upstream в Redis; TTL задаётся маршрутом.
+
+    Для каждого префикса ведётся множество сохранённых ключей, чтобы запись
+    через тот же префикс могла сбросить все его ответы одним пайплайном.
+    """
+
+    def __init__(self, client: redis.Redis, max_body_bytes: int, namespace: str = "gw:cache"):
+        self.client = client
+        self.max_body_bytes = max_body_bytes
+        self.namespace = namespace
+        self.stats = CacheStats()
+
+    def build_key(self, prefix: str, path: str, query_params: QueryParams) -> str:
+        # Порядок query-параметров не должен влиять на попадание в кэш
+        query = urlencode(sorted(query_params.multi_items()))
+        return f"{self.namespace}:{prefix}:{path}?{query}"
+
+    def _index_key(self, prefix: str) -> str:
+        return f"{self.namespace}:index:{prefix}"
+
+    async def get(self, key: str) -> CachedResponse | None:
+        try:
+            raw = await self.client.get(key)
+        except redis.RedisError as e:
+            self._on_error("cache_get_failed", e)
+            return None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return CachedResponse.loads(raw)
+
+    async def set(self, prefix: str, key: str, response: CachedResponse, ttl: int):
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(key, response.dumps(), ex=ttl)
+                pipe.sadd(self._index_key(prefix), key)
+                pipe.expire(self._index_key(prefix), ttl)
+                await pipe.execute()
+            self.stats.stores += 1
+        except redis.RedisError as e:
+            self._on_error("cache_set_failed", e)
+
+    async def invalidate(self, prefix: str):
+        """Удаляет все сохранённые ответы префикса."""
+        index_key = self._index_key(prefix)
+        try:
+            keys = await self.client.smembers(index_key)
+            await self.client.delete(index_key, *keys)
+            self.stats.invalidations += 1
+            logger.info({"event": "cache_invalidated", "prefix": prefix, "keys": len(keys)})
+        except redis.RedisError as e:
+            self._on_error("cache_invalidate_failed", e)
+
+    def _on_error(self, event: str, error: Exception):
+        # Недоступный Redis не должен ломать проксирование: работаем как без кэша
+        self.stats.errors += 1
+        logger.warning({"event": event, "error_type": type(error).__name__, "error_message": str(error)})
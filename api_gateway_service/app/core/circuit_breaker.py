@@ -0,0 +1,159 @@
+import time
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Callable
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class BreakerSettings:
+    failure_rate: float = 0.5  # доля ошибок в окне, после которой цепь размыкается
+    slow_call_s: float = 5.0  # вызов дольше этого считается медленным
+    slow_call_rate: float = 0.8  # доля медленных вызовов, после которой цепь размыкается
+    min_calls: int = 20  # меньше вызовов в окне - статистике не доверяем
+    window_s: int = 10  # длина скользящего окна в секундах
+    open_s: float = 5.0  # сколько цепь остаётся разомкнутой до пробных запросов
+    half_open_calls: int = 3  # сколько пробных запросов должно пройти, чтобы замкнуть цепь
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "BreakerSettings | None" = None) -> "BreakerSettings":
+        base = defaults or cls()
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown circuit breaker settings: {sorted(unknown)}")
+        return cls(**{name: data.get(name, getattr(base, name)) for name in known})
+
+
+class _Window:
+    """Скользящее окно счётчиков по секундам без выделения памяти на вызов."""
+
+    __slots__ = ("size", "buckets")
+
+    def __init__(self, size_s: int):
+        self.size = size_s
+        # [секунда, вызовы, ошибки, медленные]
+        self.buckets = [[-1, 0, 0, 0] for _ in range(size_s)]
+
+    def add(self, now: float, failed: bool, slow: bool):
+        second = int(now)
+        bucket = self.buckets[second % self.size]
+        if bucket[0] != second:
+            bucket[0], bucket[1], bucket[2], bucket[3] = second, 0, 0, 0
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+
+    def totals(self, now: float) -> tuple[int, int, int]:
+        oldest = int(now) - self.size
+        calls = failures = slow = 0
+        for second, bucket_calls, bucket_failures, bucket_slow in self.buckets:
+            if second > oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow += bucket_slow
+        return calls, failures, slow
+
+    def reset(self):
+        for bucket in self.buckets:
+            bucket[0], bucket[1], bucket[2], bucket[3] = -1, 0, 0, 0
+
+
+class CircuitBreaker:
+    """Автомат closed -> open -> half_open для одного экземпляра upstream.
+
+    В состоянии closed вызовы проходят и учитываются в скользящем окне. Если
+    доля ошибок или медленных вызовов превышает порог, цепь размыкается и
+    запросы отклоняются без обращения к сети. Через open_s секунд цепь
+    пропускает half_open_calls пробных запросов: все успешные - цепь
+    замыкается, любой неуспешный - снова размыкается.
+    """
+
+    def __init__(self, settings: BreakerSettings = BreakerSettings(),
+                 clock: Callable[[], float] = time.monotonic):
+        self.settings = settings
+        self._clock = clock
+        self._window = _Window(settings.window_s)
+        self.state = BreakerState.CLOSED
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def available(self) -> bool:
+        """Пропустит ли цепь запрос прямо сейчас (без изменения состояния)."""
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN:
+            return self._clock() - self.opened_at >= self.settings.open_s
+        return self._probes_in_flight < self.settings.half_open_calls
+
+    def acquire(self) -> bool:
+        """Регистрирует начало вызова; False - вызов делать нельзя."""
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN:
+            if self._clock() - self.opened_at < self.settings.open_s:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if self._probes_in_flight >= self.settings.half_open_calls:
+            return False
+        self._probes_in_flight += 1
+        return True
+
+    def release(self):
+        """Вызов прерван без результата (например, клиент отключился)."""
+        if self.state is BreakerState.HALF_OPEN and self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def record(self, success: bool, duration_s: float):
+        now = self._clock()
+        slow = duration_s >= self.settings.slow_call_s
+        failed = not success
+
+        if self.state is BreakerState.HALF_OPEN:
+            self.release()
+            if failed or slow:
+                self._open(now)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.settings.half_open_calls:
+                self.state = BreakerState.CLOSED
+                self._window.reset()
+            return
+
+        if self.state is BreakerState.OPEN:
+            # Ответ на запрос, начатый до размыкания цепи
+            return
+
+        self._window.add(now, failed, slow)
+        calls, failures, slow_calls = self._window.totals(now)
+        if calls >= self.settings.min_calls and (
+                failures / calls >= self.settings.failure_rate
+                or slow_calls / calls >= self.settings.slow_call_rate):
+            self._open(now)
+
+    def retry_after(self) -> float:
+        """Сколько секунд осталось до пробных запросов."""
+        if self.state is not BreakerState.OPEN:
+            return 0.0
+        return max(0.0, self.settings.open_s - (self._clock() - self.opened_at))
+
+    def snapshot(self) -> dict:
+        calls, failures, slow_calls = self._window.totals(self._clock())
+        return {"state": self.state.value, "window_calls": calls, "window_failures": failures,
+                "window_slow_calls": slow_calls, "opened_count": self.opened_count}
+
+    def _open(self, now: float):
+        self.state = BreakerState.OPEN
+        self.opened_at = now
+        self.opened_count += 1
+        self._probes_in_flight = 0
+        self._window.reset()
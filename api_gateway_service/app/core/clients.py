@@ -0,0 +1,75 @@
+"""Определение клиента шлюза для лимита запросов и очереди отсеков.
+
+Клиент определяется по API-ключу, только если ключ известен шлюзу, иначе -
+по IP адресу. X-Forwarded-For учитывается, только если запрос пришёл от
+доверенного прокси. Иначе клиент мог бы назваться чужим адресом или
+присылать новый ключ в каждом запросе и каждый раз получать новую корзину
+лимита.
+"""
+import ipaddress
+import json
+
+from starlette.datastructures import Headers
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def parse_api_keys(raw: str | None) -> dict[str, str]:
+    """Разбирает JSON вида {"<API-ключ>": "<имя клиента>"}."""
+    if not raw:
+        return {}
+    keys = json.loads(raw)
+    if not isinstance(keys, dict) or not all(isinstance(key, str) and key and isinstance(name, str) and name
+                                             for key, name in keys.items()):
+        raise ValueError("API keys must be a JSON object of non-empty strings")
+    return keys
+
+
+def parse_networks(raw: str | None) -> list[Network]:
+    """Разбирает список IP адресов и подсетей через запятую: "10.0.0.0/8, 127.0.0.1"."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in (raw or "").split(",") if part.strip()]
+
+
+class ClientResolver:
+    """Имя клиента по известному API-ключу или IP адрес клиента."""
+
+    def __init__(self, api_keys: dict[str, str], trusted_proxies: list[Network] = (),
+                 key_header: str = "x-api-key"):
+        self.api_keys = api_keys
+        self.trusted_proxies = list(trusted_proxies)
+        self.key_header = key_header.lower()
+
+    def resolve(self, headers: Headers, peer: str | None) -> str:
+        api_key = headers.get(self.key_header)
+        if api_key:
+            name = self.api_keys.get(api_key)
+            if name is not None:
+                return name
+        return self.client_ip(peer, ",".join(headers.getlist("x-forwarded-for")))
+
+    def client_ip(self, peer: str | None, forwarded: str | None) -> str:
+        """Адрес клиента: X-Forwarded-For читается справа налево, пока адрес - доверенный прокси."""
+        if not peer:
+            return "unknown"
+        address = peer
+        hops = [hop.strip() for hop in (forwarded or "").split(",")]
+        for hop in reversed(hops):
+            if not self.is_trusted(address) or not _is_ip(hop):
+                break
+            address = hop
+        return address
+
+    def is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
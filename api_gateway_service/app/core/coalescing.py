@@ -0,0 +1,94 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Mapping, TypeVar
+from urllib.parse import urlencode
+
+from starlette.datastructures import QueryParams
+
+T = TypeVar("T")
+
+
+@dataclass
+class CoalescingStats:
+    upstream_calls: int = 0
+    collapsed: int = 0
+    cancelled: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("task", "waiters", "delivered")
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+        self.delivered = 0
+
+
+def build_flight_key(method: str, path: str, query_params: QueryParams,
+                     headers: Mapping[str, str], vary_headers: Iterable[str]) -> tuple:
+    """Ключ одинаковых запросов: метод, путь, query и значения vary-заголовков."""
+    query = urlencode(sorted(query_params.multi_items()))
+    return (method, path, query, tuple(headers.get(name, "") for name in vary_headers))
+
+
+class SingleFlight(Generic[T]):
+    """Объединяет одновременные одинаковые вызовы в один.
+
+    Первый вызов с данным ключом запускает fn() в отдельной задаче, остальные
+    ждут её результат. Отмена одного ожидающего не отменяет общий вызов;
+    вызов отменяется, только когда его перестали ждать все. Исключение fn()
+    получают все ожидающие.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight[T]] = {}
+        self.stats = CoalescingStats()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]],
+                 discard: Callable[[T], Awaitable[None]] | None = None) -> tuple[T, bool]:
+        """Возвращает результат и признак того, что вызов выполнил именно этот запрос.
+
+        discard(result) вызывается, если результат готов, но все ожидающие
+        были отменены, не успев его получить (например, открытый ответ upstream).
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.stats.upstream_calls += 1
+        else:
+            self.stats.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+            flight.delivered += 1
+            return result, leader
+        except Exception:
+            if leader:
+                self.stats.errors += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Результат больше никому не нужен; новые запросы начнут свой вызов
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.stats.cancelled += 1
+            elif flight.waiters == 0 and not flight.delivered and discard is not None \
+                    and not flight.task.cancelled() and flight.task.exception() is None:
+                await discard(flight.task.result())
+
+    def _forget(self, key: Hashable, flight: _Flight[T]):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
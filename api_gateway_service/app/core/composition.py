@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+
+@dataclass(frozen=True)
+class Expansion:
+    """Связь, которую шлюз подставляет в ответ по ?expand=<имя>.
+
+    Например, для постов: поле category_id ссылается на объект из
+    маршрута categories, который запрашивается пачкой ?ids=1&ids=2.
+    """
+    field: str  # поле основного объекта с id связанного
+    target: str  # префикс маршрута связанного сервиса
+    batch_param: str = "ids"
+    batch_size: int = 100
+    target_key: str = "id"
+
+
+class UnknownExpansion(ValueError):
+    def __init__(self, name: str, known: Iterable[str]):
+        super().__init__(f"Unknown expand {name!r}, expected one of {sorted(known)}")
+
+
+def parse_expand(raw: str, expansions: dict[str, Expansion]) -> dict[str, Expansion]:
+    """Разбирает "category,author" в связи маршрута; неизвестное имя - ошибка."""
+    requested = {}
+    for name in raw.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in expansions:
+            raise UnknownExpansion(name, expansions)
+        requested[name] = expansions[name]
+    return requested
+
+
+def related_ids(items: list[dict], field: str) -> list:
+    """Уникальные id связанных объектов в порядке первого появления."""
+    seen = {}
+    for item in items:
+        value = item.get(field) if isinstance(item, dict) else None
+        if value is not None:
+            seen.setdefault(value, None)
+    return list(seen)
+
+
+def batches(ids: list, size: int) -> list[list]:
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def merge_related(items: list[dict], name: str, field: str, related: dict[Any, dict]):
+    """Подставляет связанный объект под ключом name; не найденный - None."""
+    for item in items:
+        if isinstance(item, dict):
+            item[name] = related.get(item.get(field))
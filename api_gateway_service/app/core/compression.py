@@ -0,0 +1,236 @@
+import asyncio
+import zlib
+from dataclasses import dataclass
+
+from app.core import metrics
+
+try:
+    import brotli
+except ImportError:  # без brotli клиентам предлагаются остальные кодировки
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # без zstandard клиентам предлагаются остальные кодировки
+    zstandard = None
+
+# Типы содержимого, которые имеет смысл сжимать (изображения и архивы уже сжаты)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/problem+json", "image/svg+xml")
+
+COMPRESSION_BYTES_IN = metrics.registry.counter(
+    "gateway_compression_bytes_in", "Байты ответов до сжатия", ("encoding",))
+COMPRESSION_BYTES_OUT = metrics.registry.counter(
+    "gateway_compression_bytes_out", "Байты ответов после сжатия", ("encoding",))
+COMPRESSION_BYTES_SAVED = metrics.registry.counter(
+    "gateway_compression_bytes_saved", "Сэкономленные сжатием байты", ("encoding",))
+
+
+@dataclass(frozen=True)
+class CompressionSettings:
+    encodings: tuple[str, ...] = ("zstd", "br", "gzip")  # предпочтение сервера при равных q
+    min_size: int = 1024  # ответы меньше этого не сжимаются
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+    # Куски больше этого сжимаются в пуле потоков, чтобы не останавливать event loop
+    thread_min_size: int = 64 * 1024
+
+    def available(self) -> tuple[str, ...]:
+        supported = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+        return tuple(encoding for encoding in self.encodings if supported.get(encoding))
+
+
+def parse_encodings(raw: str) -> tuple[str, ...]:
+    return tuple(name.strip().lower() for name in raw.split(",") if name.strip())
+
+
+def negotiate(accept_encoding: str, available: tuple[str, ...]) -> str | None:
+    """Выбирает кодировку по Accept-Encoding с учётом q; None - без сжатия."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Потоковый компрессор: каждый compress() отдаёт всё, что уже можно отправить клиенту."""
+
+    def __init__(self, encoding: str, settings: CompressionSettings):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.brotli_quality)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=settings.zstd_level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush()
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.finish()
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _compressible(status: int, headers: list[tuple[bytes, bytes]]) -> bool:
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if _header(headers, b"content-encoding") is not None:
+        return False
+    if b"no-transform" in (_header(headers, b"cache-control") or b"").lower():
+        return False
+    content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware: сжимает ответы кодировкой из Accept-Encoding клиента.
+
+    Ответ копится, пока не наберётся min_size байт; если он закончился
+    раньше, уходит как есть. Дальше каждый кусок сжимается и сразу
+    отправляется, так что потоковые ответы остаются потоковыми. Большие куски
+    сжимаются в пуле потоков. ETag сжатого ответа становится слабым: байты
+    другие, а смысл тот же.
+    """
+
+    def __init__(self, app, settings: CompressionSettings = CompressionSettings()):
+        self.app = app
+        self.settings = settings
+        self._available = settings.available()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._available:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), self._available) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.settings))
+
+
+class _CompressingSend:
+    def __init__(self, send, encoding: str, settings: CompressionSettings):
+        self._send = send
+        self._encoding = encoding
+        self._settings = settings
+        self._start: dict | None = None
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._compressor: _Compressor | None = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    async def __call__(self, message: dict):
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers", []))
+            if not _compressible(message["status"], headers):
+                self._passthrough = True
+                await self._send(message)
+                return
+            headers.append((b"vary", b"Accept-Encoding"))
+            length = _header(headers, b"content-length")
+            if length is not None and length.isdigit() and int(length) < self._settings.min_size:
+                self._passthrough = True
+                await self._send({**message, "headers": headers})
+                return
+            self._start = {**message, "headers": headers}
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compressor is None:
+            self._buffer.append(body)
+            self._buffered += len(body)
+            if self._buffered < self._settings.min_size:
+                if more_body:
+                    return
+                # Весь ответ меньше порога: отправляется без сжатия
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": b"".join(self._buffer)})
+                return
+            body, self._buffer = b"".join(self._buffer), []
+            self._compressor = _Compressor(self._encoding, self._settings)
+            if not more_body:
+                # Ответ целиком в памяти: длина сжатого тела известна заранее
+                data = await self._run(self._compressor.finish, body)
+                await self._send({**self._start, "headers": self._compressed_headers(self._start["headers"], data)})
+                await self._send({"type": "http.response.body", "body": data})
+                self._record(len(body), len(data))
+                return
+            await self._send({**self._start, "headers": self._compressed_headers(self._start["headers"])})
+
+        self._bytes_in += len(body)
+        if more_body:
+            data = await self._run(self._compressor.compress, body) if body else b""
+        else:
+            data = await self._run(self._compressor.finish, body)
+        self._bytes_out += len(data)
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            self._record(self._bytes_in, self._bytes_out)
+
+    def _record(self, bytes_in: int, bytes_out: int):
+        COMPRESSION_BYTES_IN.labels(self._encoding).inc(bytes_in)
+        COMPRESSION_BYTES_OUT.labels(self._encoding).inc(bytes_out)
+        COMPRESSION_BYTES_SAVED.labels(self._encoding).inc(bytes_in - bytes_out)
+
+    def _compressed_headers(self, headers: list[tuple[bytes, bytes]],
+                            body: bytes | None = None) -> list[tuple[bytes, bytes]]:
+        result = []
+        for key, value in headers:
+            name = key.lower()
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            result.append((key, value))
+        result.append((b"content-encoding", self._encoding.encode()))
+        if body is not None:
+            result.append((b"content-length", str(len(body)).encode()))
+        return result
+
+    async def _run(self, fn, data: bytes) -> bytes:
+        if len(data) >= self._settings.thread_min_size:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, data)
+        return fn(data)
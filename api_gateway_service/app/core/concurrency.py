@@ -0,0 +1,184 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Callable
+
+ALGORITHMS = ("gradient", "aimd")
+
+
+@dataclass(frozen=True)
+class LimiterSettings:
+    enabled: bool = True
+    algorithm: str = "gradient"
+    initial_limit: int = 20
+    min_limit: int = 4
+    max_limit: int = 1000
+    queue_size: int = 50  # сколько запросов может ждать освобождения места
+    queue_timeout_s: float = 0.05  # сколько запрос ждёт в очереди, прежде чем получить 503
+    retry_after_s: int = 1
+    backoff_ratio: float = 0.9  # во сколько раз лимит уменьшается после ошибки или таймаута
+    # gradient: задержка выше минимальной в rtt_tolerance раз уже означает очередь в upstream
+    rtt_tolerance: float = 1.5
+    smoothing: float = 0.2
+    rtt_window: int = 500  # минимальная задержка берётся по двум последним окнам из стольких замеров
+    # aimd: ответ медленнее этого считается признаком перегрузки
+    latency_threshold_s: float = 0.5
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "LimiterSettings | None" = None) -> "LimiterSettings":
+        base = defaults or cls()
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown concurrency settings: {sorted(unknown)}")
+        settings = cls(**{name: data.get(name, getattr(base, name)) for name in known})
+        if settings.algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown concurrency algorithm {settings.algorithm!r}, expected one of {ALGORITHMS}")
+        if not 0 < settings.min_limit <= settings.initial_limit <= settings.max_limit:
+            raise ValueError(f"Concurrency limits must satisfy 0 < min <= initial <= max: {data}")
+        return settings
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Места нет, а очередь полна или ожидание истекло: запрос нужно отклонить сразу."""
+
+    def __init__(self, name: str, retry_after_s: int):
+        super().__init__(f"Concurrency limit exceeded for {name}")
+        self.retry_after_s = retry_after_s
+
+
+class AdaptiveLimiter:
+    """Адаптивный лимит одновременных запросов к одному upstream.
+
+    Лимит подстраивается по задержке ответов upstream. gradient сравнивает
+    текущую задержку с минимальной за последние окна (задержкой без
+    очереди): пока они близки, лимит растёт на sqrt(limit), а когда текущая
+    заметно выше (в upstream копится очередь), лимит уменьшается
+    пропорционально. Минимум берётся по окнам, чтобы лимит подстроился,
+    если upstream стал медленнее сам по себе. aimd прибавляет единицу на
+    быстрый ответ и умножает на backoff_ratio на медленный. Ошибки и
+    таймауты в обоих случаях уменьшают лимит.
+
+    Запрос сверх лимита ждёт в короткой очереди; если она полна или место
+    не освободилось за queue_timeout_s, запрос отклоняется сразу, а не
+    копится в httpx и upstream.
+    """
+
+    def __init__(self, name: str, settings: LimiterSettings = LimiterSettings(),
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.settings = settings
+        self._clock = clock
+        self.limit = float(settings.initial_limit)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._window_min_s = math.inf
+        self._previous_min_s = math.inf
+        self._window_samples = 0
+        self.last_rtt_s = 0.0
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self) -> float:
+        """Занимает место; возвращает момент начала для release()."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.accepted += 1
+            return self._clock()
+        if len(self._waiters) >= self.settings.queue_size:
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(self.name, self.settings.retry_after_s)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.settings.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Место передали в последний момент: возвращаем его
+                self._release_slot()
+            else:
+                waiter.cancel()
+            self._discard(waiter)
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(self.name, self.settings.retry_after_s)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                waiter.cancel()
+            self._discard(waiter)
+            raise
+        self.accepted += 1
+        return self._clock()
+
+    def release(self, started_at: float, dropped: bool = False, sample: bool = True):
+        """Освобождает место и учитывает задержку запроса.
+
+        dropped - ошибка или таймаут upstream; sample=False - запрос прерван
+        (например, клиент ушёл) и его задержка ничего не говорит об upstream.
+        """
+        if sample:
+            self._update(self._clock() - started_at, dropped, self.in_flight)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        """Передаёт освободившиеся места ожидающим по порядку очереди."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _update(self, rtt_s: float, dropped: bool, in_flight: int):
+        settings = self.settings
+        self.last_rtt_s = rtt_s
+        if dropped:
+            self._set_limit(self.limit * settings.backoff_ratio)
+            return
+        if settings.algorithm == "aimd":
+            if rtt_s > settings.latency_threshold_s:
+                self._set_limit(self.limit * settings.backoff_ratio)
+            elif in_flight * 2 >= self.limit:
+                self._set_limit(self.limit + 1)
+            return
+
+        self._window_min_s = min(self._window_min_s, rtt_s)
+        self._window_samples += 1
+        if self._window_samples >= settings.rtt_window:
+            self._previous_min_s, self._window_min_s, self._window_samples = self._window_min_s, math.inf, 0
+        if in_flight * 2 < self.limit:
+            # Запросов мало, лимит не упирается: расти ему не с чего
+            return
+        gradient = max(0.5, min(1.0, settings.rtt_tolerance * self.min_rtt_s / rtt_s)) if rtt_s > 0 else 1.0
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        self._set_limit(self.limit * (1 - settings.smoothing) + new_limit * settings.smoothing)
+
+    @property
+    def min_rtt_s(self) -> float:
+        value = min(self._window_min_s, self._previous_min_s)
+        return 0.0 if value == math.inf else value
+
+    def _set_limit(self, value: float):
+        self.limit = max(float(self.settings.min_limit), min(float(self.settings.max_limit), value))
+        self._wake()
+
+    def snapshot(self) -> dict:
+        return {"algorithm": self.settings.algorithm, "limit": int(self.limit), "in_flight": self.in_flight,
+                "queued_now": len(self._waiters), "accepted": self.accepted, "queued": self.queued,
+                "rejected": self.rejected, "min_rtt_ms": round(self.min_rtt_s * 1000, 2),
+                "last_rtt_ms": round(self.last_rtt_s * 1000, 2)}
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Mapping
+
+# Условные заголовки GET, которые шлюз проверяет сам и не передаёт upstream:
+# иначе 304 одного клиента мог бы попасть в кэш или в объединённый запрос других
+GATEWAY_CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+# Заголовки, которые повторяются в 304 (RFC 9110, 15.4.5), и X-Cache шлюза
+NOT_MODIFIED_HEADERS = ("etag", "cache-control", "content-location", "date", "expires", "vary", "last-modified",
+                        "x-cache")
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def with_etag(status_code: int, headers: dict[str, str], body: bytes) -> dict[str, str]:
+    """Заголовки ответа с ETag: свой у upstream сохраняется, иначе считается по телу."""
+    if status_code != 200 or "etag" in headers:
+        return headers
+    return {**headers, "etag": strong_etag(body)}
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def if_none_match(request_headers: Mapping[str, str], etag: str | None) -> bool:
+    """Совпадает ли If-None-Match клиента с ETag ответа (слабое сравнение, как требует RFC)."""
+    header = request_headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def not_modified_headers(headers: Mapping[str, str]) -> dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() in NOT_MODIFIED_HEADERS}
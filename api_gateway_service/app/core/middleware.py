@@ -0,0 +1,84 @@
+import time
+from typing import Callable
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+
+class RequestLoggingMiddleware:
+    """Логирование, время и метрики каждого HTTP-запроса на уровне ASGI.
+
+    В отличие от @app.middleware("http") (BaseHTTPMiddleware), запрос не
+    выполняется в отдельной задаче, а ответ не перекладывается через поток в
+    памяти: сообщения приложения уходят серверу как есть, и потоковый ответ
+    остаётся потоковым. Запрос считается завершённым, когда ответ отправлен
+    целиком.
+
+    extra_headers(scope) возвращает заголовки, которые добавляются к ответу
+    (например, X-RateLimit-* шлюза).
+    """
+
+    def __init__(self, app: ASGIApp, logger, started_event: str = "request_started",
+                 completed_event: str = "request_completed",
+                 route_label: Callable[[Scope], str] = metrics.route_label,
+                 extra_headers: Callable[[Scope], dict[str, str] | None] | None = None):
+        self.app = app
+        self.logger = logger
+        self.started_event = started_event
+        self.completed_event = completed_event
+        self.route_label = route_label
+        self.extra_headers = extra_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        method, path = scope["method"], scope["path"]
+        client = scope.get("client")
+        self.logger.info({
+            "event": self.started_event,
+            "method": method,
+            "path": path,
+            "client_ip": client[0] if client else None
+        })
+
+        # Если приложение упало до ответа, клиент получит 500 от ServerErrorMiddleware
+        status_code = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                extra = self.extra_headers(scope) if self.extra_headers is not None else None
+                if extra:
+                    headers = MutableHeaders(raw=list(message.get("headers", [])))
+                    headers.update(extra)
+                    message = {**message, "headers": headers.raw}
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+            duration_ms = (time.time() - start_time) * 1000
+            metrics.HTTP_REQUEST_DURATION.labels(method, self.route_label(scope),
+                                                 status_code).observe(duration_ms / 1000)
+
+            log_data = {
+                "event": self.completed_event,
+                "method": method,
+                "path": path,
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 2)
+            }
+            if status_code >= 500:
+                self.logger.error(log_data)
+            elif status_code >= 400:
+                self.logger.warning(log_data)
+            else:
+                self.logger.info(log_data)
@@ -0,0 +1,157 @@
+import time
+from dataclasses import dataclass, fields
+
+import httpx
+
+from app.core.logging import get_logger
+
+logger = get_logger("api_gateway")
+
+# Первое событие httpcore после того, как запрос получил соединение из пула
+_CONNECTION_ACQUIRED_EVENTS = frozenset({
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+})
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    http2: bool = False
+    # None - используется таймаут маршрута
+    connect_timeout: float | None = 5.0
+    read_timeout: float | None = None
+    write_timeout: float | None = None
+    pool_timeout: float | None = 5.0
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "PoolSettings | None" = None) -> "PoolSettings":
+        base = defaults or cls()
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown pool settings: {sorted(unknown)}")
+        return cls(**{name: data.get(name, getattr(base, name)) for name in known})
+
+    def timeout(self, default: float) -> httpx.Timeout:
+        return httpx.Timeout(
+            default,
+            connect=self.connect_timeout if self.connect_timeout is not None else default,
+            read=self.read_timeout if self.read_timeout is not None else default,
+            write=self.write_timeout if self.write_timeout is not None else default,
+            pool=self.pool_timeout if self.pool_timeout is not None else default,
+        )
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Отдельный httpx-клиент с собственным пулом соединений для одного маршрута.
+
+    Кроме самого клиента считает, сколько запросов сейчас ждут свободное
+    соединение и сколько времени они его ждали. Момент получения соединения
+    определяется по trace-событиям httpcore.
+    """
+
+    def __init__(self, name: str, settings: PoolSettings, timeout: float,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.name = name
+        self.settings = settings
+        http2 = settings.http2
+        if http2 and not _http2_available():
+            logger.warning({"event": "pool_http2_unavailable", "pool": name,
+                            "reason": "package h2 is not installed"})
+            http2 = False
+        self.http2 = http2
+        self.client = httpx.AsyncClient(
+            timeout=settings.timeout(timeout),
+            limits=httpx.Limits(max_connections=settings.max_connections,
+                                max_keepalive_connections=settings.max_keepalive_connections,
+                                keepalive_expiry=settings.keepalive_expiry),
+            http2=http2,
+            transport=transport,
+        )
+        self.requests_in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_count = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.pool_timeouts = 0
+
+    def build_request(self, **kwargs) -> httpx.Request:
+        return self.client.build_request(**kwargs)
+
+    async def send(self, request: httpx.Request) -> httpx.Response:
+        """Отправляет запрос с stream=True и учитывает ожидание соединения."""
+        start = time.perf_counter()
+        acquired = False
+
+        def on_acquired():
+            nonlocal acquired
+            if acquired:
+                return
+            acquired = True
+            self.waiting -= 1
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_total_s += waited
+            if waited > self.wait_max_s:
+                self.wait_max_s = waited
+
+        async def trace(event_name: str, info: dict):
+            if event_name in _CONNECTION_ACQUIRED_EVENTS:
+                on_acquired()
+
+        request.extensions["trace"] = trace
+        self.requests_in_flight += 1
+        self.waiting += 1
+        if self.waiting > self.max_waiting:
+            self.max_waiting = self.waiting
+        try:
+            return await self.client.send(request, stream=True)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        finally:
+            self.requests_in_flight -= 1
+            # Транспорты без trace-событий (например, в тестах)
+            if not acquired:
+                acquired = True
+                self.waiting -= 1
+
+    def connections(self) -> tuple[int, int] | None:
+        """Число открытых соединений и из них занятых; None, если транспорт не пул httpcore."""
+        pool = getattr(self.client._transport, "_pool", None)
+        if pool is None:
+            return None
+        connections = pool.connections
+        return len(connections), sum(1 for connection in connections if not connection.is_idle())
+
+    def snapshot(self) -> dict:
+        connections = self.connections()
+        return {
+            "max_connections": self.settings.max_connections,
+            "http2": self.http2,
+            "connections_open": connections[0] if connections else None,
+            "connections_in_use": connections[1] if connections else None,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "wait_count": self.wait_count,
+            "wait_avg_ms": round(self.wait_total_s / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+            "wait_max_ms": round(self.wait_max_s * 1000, 3),
+            "pool_timeouts": self.pool_timeouts,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import redis.asyncio as redis
+
+from app.core.logging import get_logger
+
+logger = get_logger("api_gateway")
+
+
+@dataclass(frozen=True)
+class RateLimitTier:
+    """Не больше limit запросов за window_s секунд, limit же - допустимый всплеск."""
+    limit: int = 100
+    window_s: float = 300.0
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.window_s
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "RateLimitTier | None" = None) -> "RateLimitTier":
+        base = defaults or cls()
+        unknown = set(data) - {"limit", "window_s"}
+        if unknown:
+            raise ValueError(f"Unknown rate limit settings: {sorted(unknown)}")
+        tier = cls(limit=int(data.get("limit", base.limit)), window_s=float(data.get("window_s", base.window_s)))
+        if tier.limit <= 0 or tier.window_s <= 0:
+            raise ValueError(f"Rate limit must be positive: {data}")
+        return tier
+
+
+def parse_client_tiers(raw: str | None) -> dict[str, RateLimitTier]:
+    """Разбирает JSON вида {"<ключ клиента>": {"limit": 1000, "window_s": 60}}."""
+    if not raw:
+        return {}
+    return {client: RateLimitTier.from_dict(settings) for client, settings in json.loads(raw).items()}
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_s: int  # через сколько секунд корзина снова будет полной
+    retry_after_s: int  # через сколько секунд появится следующий токен (0 - запрос пропущен)
+
+    def headers(self) -> dict[str, str]:
+        headers = {"X-RateLimit-Limit": str(self.limit),
+                   "X-RateLimit-Remaining": str(self.remaining),
+                   "X-RateLimit-Reset": str(self.reset_s)}
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_s)
+        return headers
+
+
+class _Bucket:
+    __slots__ = ("tier", "tokens", "updated_at", "pending", "window", "own", "others")
+
+    def __init__(self, tier: RateLimitTier, now: float):
+        self.tier = tier
+        self.tokens = float(tier.limit)
+        self.updated_at = now
+        self.pending = 0  # запросы, ещё не отправленные в Redis
+        self.window = -1  # номер окна синхронизации в Redis
+        self.own = 0  # наши запросы в этом окне, уже учтённые в Redis
+        self.others = 0  # запросы других реплик в этом окне, уже вычтенные из корзины
+
+    def refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(float(self.tier.limit), self.tokens + elapsed * self.tier.rate)
+            self.updated_at = now
+
+
+def _decision(bucket: _Bucket, cost: int, allowed: bool) -> RateLimitDecision:
+    tier = bucket.tier
+    return RateLimitDecision(
+        allowed=allowed,
+        limit=tier.limit,
+        remaining=max(0, int(bucket.tokens)),
+        reset_s=math.ceil((tier.limit - bucket.tokens) / tier.rate),
+        retry_after_s=0 if allowed else max(1, math.ceil((cost - bucket.tokens) / tier.rate)),
+    )
+
+
+class RateLimiter:
+    """Ограничитель частоты запросов с решением в памяти процесса.
+
+    На каждый ключ (маршрут и клиент) заводится корзина токенов, так что
+    запрос не ждёт Redis. Раз в sync_interval_s секунд накопленные запросы
+    одним pipeline прибавляются к общим счётчикам в Redis, а в ответ шлюз
+    узнаёт, сколько запросов за то же окно пропустили другие реплики, и
+    вычитает их из своих корзин. Так лимит остаётся примерно общим для всех
+    реплик; между синхронизациями каждая реплика может пропустить лишнее не
+    больше, чем наберётся за sync_interval_s.
+    """
+
+    def __init__(self, client: redis.Redis | None, sync_interval_s: float = 1.0,
+                 namespace: str = "gw:ratelimit", clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        self._client = client
+        self.sync_interval_s = sync_interval_s
+        self.namespace = namespace
+        self._clock = clock
+        # Окна в Redis должны совпадать у всех реплик, поэтому по настенным часам
+        self._wall_clock = wall_clock
+        self._buckets: dict[str, _Bucket] = {}
+        self._task: asyncio.Task | None = None
+        self._closing = asyncio.Event()
+        self.allowed = 0
+        self.rejected = 0
+        self.syncs = 0
+        self.sync_errors = 0
+
+    def _bucket(self, key: str, tier: RateLimitTier) -> _Bucket:
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.tier != tier:
+            bucket = self._buckets[key] = _Bucket(tier, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def hit(self, key: str, tier: RateLimitTier, cost: int = 1) -> RateLimitDecision:
+        bucket = self._bucket(key, tier)
+        allowed = bucket.tokens >= cost
+        if allowed:
+            bucket.tokens -= cost
+            bucket.pending += cost
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return _decision(bucket, cost, allowed)
+
+    def check(self, key: str, tier: RateLimitTier, cost: int = 1) -> RateLimitDecision:
+        """Пройдёт ли запрос стоимостью cost - без списания токенов и без учёта в статистике."""
+        bucket = self._bucket(key, tier)
+        return _decision(bucket, cost, bucket.tokens >= cost)
+
+    async def sync(self):
+        """Отправляет накопленные запросы в Redis и учитывает запросы других реплик."""
+        if self._client is None or not self._buckets:
+            return
+        now = self._clock()
+        wall_now = self._wall_clock()
+        batch = []
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if not bucket.pending and bucket.tokens >= bucket.tier.limit:
+                # Корзина полна и давно не используется - состояние не нужно
+                del self._buckets[key]
+                continue
+            batch.append((key, bucket, bucket.pending, int(wall_now // bucket.tier.window_s)))
+            bucket.pending = 0
+
+        if not batch:
+            return
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for key, bucket, sent, window in batch:
+                    redis_key = f"{self.namespace}:{key}:{window}"
+                    pipe.incrby(redis_key, sent)
+                    pipe.expire(redis_key, math.ceil(bucket.tier.window_s * 2))
+                results = await pipe.execute()
+        except Exception as e:
+            # Неотправленное уйдёт со следующей синхронизацией
+            for key, bucket, sent, window in batch:
+                bucket.pending += sent
+            self.sync_errors += 1
+            logger.warning({"event": "rate_limit_sync_error", "error": str(e), "keys": len(batch)})
+            return
+
+        self.syncs += 1
+        for (key, bucket, sent, window), total in zip(batch, results[::2]):
+            if bucket.window != window:
+                bucket.window, bucket.own, bucket.others = window, 0, 0
+            bucket.own += sent
+            others = max(0, int(total) - bucket.own)
+            bucket.tokens = max(0.0, bucket.tokens - (others - bucket.others))
+            bucket.others = others
+
+    async def run(self):
+        # Остановка ждёт конца текущей синхронизации: отмена посреди pipeline
+        # потеряла бы уже снятые с корзин pending и оставила соединение на полпути
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self.sync_interval_s)
+            except asyncio.TimeoutError:
+                await self.sync()
+
+    def start(self):
+        if self._client is not None and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+        # Не теряем запросы последнего интервала
+        await self.sync()
+
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "rejected": self.rejected, "keys": len(self._buckets),
+                "syncs": self.syncs, "sync_errors": self.sync_errors}
@@ -0,0 +1,119 @@
+import random
+import time
+from dataclasses import dataclass, fields
+from typing import Callable
+
+# Методы, которые можно повторить или продублировать без побочных эффектов
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+
+@dataclass(frozen=True)
+class RetrySettings:
+    hedge_percentile: float = 0.95  # дублирующий запрос уходит, если ответа нет дольше этого перцентиля; 0 - выкл.
+    hedge_min_delay_s: float = 0.01  # раньше этого дублировать не имеет смысла
+    hedge_min_samples: int = 20  # меньше замеров - перцентилю не доверяем и не дублируем
+    max_retries: int = 2  # повторы при ошибке соединения
+    backoff_base_s: float = 0.05
+    backoff_max_s: float = 1.0
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "RetrySettings | None" = None) -> "RetrySettings":
+        base = defaults or cls()
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown retry settings: {sorted(unknown)}")
+        settings = cls(**{name: data.get(name, getattr(base, name)) for name in known})
+        if not 0 <= settings.hedge_percentile < 1:
+            raise ValueError(f"hedge_percentile must be in [0, 1): {settings.hedge_percentile}")
+        return settings
+
+    def backoff(self, attempt: int, rng: random.Random = random) -> float:
+        """Пауза перед повтором attempt (1, 2, ...): full jitter от экспоненты."""
+        return rng.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Время ответа последних size запросов маршрута и перцентили по нему.
+
+    Перцентили пересчитываются не чаще раза в refresh_every замеров, так что
+    на горячем пути остаётся запись в кольцевой буфер.
+    """
+
+    def __init__(self, size: int = 1024, refresh_every: int = 64):
+        self._samples = [0.0] * size
+        self._size = size
+        self._refresh_every = refresh_every
+        self.count = 0
+        self._since_refresh = 0
+        self._percentiles: dict[float, float] = {}
+
+    def observe(self, value_s: float):
+        self._samples[self.count % self._size] = value_s
+        self.count += 1
+        self._since_refresh += 1
+        if self._since_refresh >= self._refresh_every:
+            self._since_refresh = 0
+            self._percentiles.clear()
+
+    def percentile(self, q: float) -> float | None:
+        n = min(self.count, self._size)
+        if n == 0:
+            return None
+        value = self._percentiles.get(q)
+        if value is None:
+            value = self._percentiles[q] = sorted(self._samples[:n])[min(n - 1, int(q * n))]
+        return value
+
+    def hedge_delay(self, settings: RetrySettings) -> float | None:
+        """Через сколько секунд отправлять дублирующий запрос; None - не дублировать."""
+        if not settings.hedge_percentile or self.count < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay_s, self.percentile(settings.hedge_percentile))
+
+
+class RetryBudget:
+    """Общий для шлюза бюджет повторов и дублирующих запросов.
+
+    Каждый исходный запрос добавляет ratio токена, кроме того бюджет
+    пополняется на min_per_s токенов в секунду; повтор или дубль тратит
+    один токен. Так дополнительных запросов не больше ratio от основного
+    потока (плюс небольшой постоянный запас), и при перегрузке upstream,
+    когда ошибок и медленных ответов много, шлюз не умножает нагрузку.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_s: float = 5.0, max_tokens: float = 20.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._tokens = max_tokens
+        self._updated_at = clock()
+        self.withdrawn = 0
+        self.denied = 0
+
+    def _refill(self, amount: float = 0.0):
+        now = self._clock()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.min_per_s + amount)
+        self._updated_at = now
+
+    def deposit(self):
+        self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            self.denied += 1
+            return False
+        self._tokens -= 1
+        self.withdrawn += 1
+        return True
+
+    def refund(self):
+        self.withdrawn -= 1
+        self._refill(1)
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"tokens": round(self._tokens, 2), "withdrawn": self.withdrawn, "denied": self.denied}
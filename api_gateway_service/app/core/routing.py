@@ -0,0 +1,218 @@
+import itertools
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from app.core.bulkhead import BulkheadSettings
+from app.core.circuit_breaker import BreakerSettings, CircuitBreaker
+from app.core.concurrency import LimiterSettings
+from app.core.pools import PoolSettings
+from app.core.rate_limit import RateLimitTier
+from app.core.retries import LatencyTracker, RetrySettings
+
+
+@dataclass(eq=False)
+class Upstream:
+    """Один экземпляр сервиса за шлюзом."""
+    url: str
+    in_flight: int = 0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+
+class NoHealthyUpstream(Exception):
+    """У всех экземпляров маршрута разомкнута цепь."""
+
+    def __init__(self, route: "Route"):
+        super().__init__(f"No healthy upstream for {route.service}")
+        self.route = route
+        self.retry_after = min(instance.breaker.retry_after() for instance in route.instances)
+
+
+class Balancer(Protocol):
+    def pick(self, instances: list[Upstream]) -> Upstream:
+        ...
+
+
+class RoundRobinBalancer:
+    """Экземпляры выбираются по очереди."""
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def pick(self, instances: list[Upstream]) -> Upstream:
+        return instances[next(self._counter) % len(instances)]
+
+
+class LeastInFlightBalancer:
+    """Выбирается экземпляр с наименьшим числом незавершённых запросов."""
+
+    def pick(self, instances: list[Upstream]) -> Upstream:
+        return min(instances, key=lambda instance: instance.in_flight)
+
+
+class PowerOfTwoChoicesBalancer:
+    """Из двух случайных экземпляров выбирается менее загруженный.
+
+    Почти так же хорошо, как least-in-flight, но без полного перебора и без
+    «стада», когда все одновременно выбирают один и тот же свободный экземпляр.
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self._rng = rng or random.Random()
+
+    def pick(self, instances: list[Upstream]) -> Upstream:
+        if len(instances) == 1:
+            return instances[0]
+        first, second = self._rng.sample(instances, 2)
+        return first if first.in_flight <= second.in_flight else second
+
+
+BALANCERS = {
+    "round_robin": RoundRobinBalancer,
+    "least_in_flight": LeastInFlightBalancer,
+    "power_of_two": PowerOfTwoChoicesBalancer,
+}
+
+
+@dataclass(eq=False)
+class Route:
+    """Маршрут шлюза: префикс пути и пул экземпляров сервиса."""
+    prefix: str
+    service: str
+    instances: list[Upstream]
+    balancer: Balancer = field(default_factory=RoundRobinBalancer)
+    cache_ttl: int = 0
+    timeout: float = 30.0
+    pool: PoolSettings = field(default_factory=PoolSettings)
+    rate_limit: RateLimitTier = field(default_factory=RateLimitTier)
+    retry: RetrySettings = field(default_factory=RetrySettings)
+    concurrency: LimiterSettings = field(default_factory=LimiterSettings)
+    bulkhead: BulkheadSettings = field(default_factory=BulkheadSettings)
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def pick(self, exclude: Upstream | None = None) -> Upstream:
+        """Выбирает экземпляр среди тех, чья цепь пропускает запросы.
+
+        Экземпляры с разомкнутой цепью (медленные или с ошибками) исключаются
+        из балансировки, пока не пройдут пробные запросы. exclude - экземпляр,
+        которому уже отправлен запрос (для дублирующего запроса).
+        """
+        candidates = [instance for instance in self.instances
+                      if instance is not exclude and instance.breaker.available()]
+        if candidates:
+            instance = self.balancer.pick(candidates)
+            if instance.breaker.acquire():
+                return instance
+        raise NoHealthyUpstream(self)
+
+
+class _Node:
+    __slots__ = ("children", "route")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.route: Route | None = None
+
+
+class RouteTable:
+    """Префиксное дерево маршрутов по сегментам пути.
+
+    Поиск проходит путь один раз и возвращает маршрут с самым длинным
+    совпавшим префиксом, поэтому его стоимость зависит только от длины пути,
+    а не от числа маршрутов.
+    """
+
+    def __init__(self, routes: list[Route] = ()):
+        self._root = _Node()
+        self.routes: list[Route] = []
+        for route in routes:
+            self.add(route)
+
+    def add(self, route: Route):
+        node = self._root
+        for segment in _segments(route.prefix):
+            node = node.children.setdefault(segment, _Node())
+        if node.route is not None:
+            raise ValueError(f"Duplicate route prefix: {route.prefix}")
+        node.route = route
+        self.routes.append(route)
+
+    def match(self, path: str) -> Route | None:
+        node = self._root
+        matched = node.route
+        for segment in path.split("/"):
+            if not segment:
+                continue
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.route is not None:
+                matched = node.route
+        return matched
+
+
+def _segments(path: str) -> list[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+@dataclass(frozen=True)
+class RouteDefaults:
+    """Значения для полей, которые не указаны в записи маршрута."""
+    balancer: str = "round_robin"
+    cache_ttls: dict[str, int] = field(default_factory=dict)
+    timeout: float = 30.0
+    breaker: BreakerSettings = field(default_factory=BreakerSettings)
+    pool: PoolSettings = field(default_factory=PoolSettings)
+    rate_limit: RateLimitTier = field(default_factory=RateLimitTier)
+    retry: RetrySettings = field(default_factory=RetrySettings)
+    concurrency: LimiterSettings = field(default_factory=LimiterSettings)
+    bulkhead: BulkheadSettings = field(default_factory=BulkheadSettings)
+
+
+def build_route(config: dict, defaults: RouteDefaults = RouteDefaults()) -> Route:
+    """Создаёт маршрут из записи конфигурации.
+
+    Формат записи: {"prefix": "posts", "service": "posts_service",
+    "upstreams": ["http://posts_service:8000"], "balancer": "round_robin",
+    "cache_ttl": 10, "timeout": 5.0, "circuit_breaker": {"failure_rate": 0.5},
+    "pool": {"max_connections": 50, "http2": true}, "rate_limit": {"limit": 100, "window_s": 300},
+    "retry": {"hedge_percentile": 0.95, "max_retries": 2},
+    "concurrency": {"algorithm": "gradient", "initial_limit": 20, "queue_size": 50},
+    "bulkhead": {"max_in_flight": 100, "fair_queue": true, "client_weights": {"partner": 4}}}.
+    Необязательные поля берутся из defaults.
+    """
+    prefix = "/".join(_segments(config["prefix"]))
+    upstreams = config["upstreams"]
+    if isinstance(upstreams, str):
+        upstreams = upstreams.split(",")
+    breaker_settings = BreakerSettings.from_dict(config.get("circuit_breaker", {}), defaults.breaker)
+    instances = [Upstream(url=url.strip().rstrip("/"), breaker=CircuitBreaker(breaker_settings))
+                 for url in upstreams if url.strip()]
+    if not instances:
+        raise ValueError(f"Route {prefix!r} has no upstreams")
+
+    strategy = config.get("balancer", defaults.balancer)
+    if strategy not in BALANCERS:
+        raise ValueError(f"Unknown balancer {strategy!r}, expected one of {sorted(BALANCERS)}")
+
+    return Route(
+        prefix=prefix,
+        service=config.get("service", f"{prefix}_service"),
+        instances=instances,
+        balancer=BALANCERS[strategy](),
+        cache_ttl=config.get("cache_ttl", defaults.cache_ttls.get(prefix, 0)),
+        timeout=config.get("timeout", defaults.timeout),
+        pool=PoolSettings.from_dict(config.get("pool", {}), defaults.pool),
+        rate_limit=RateLimitTier.from_dict(config.get("rate_limit", {}), defaults.rate_limit),
+        retry=RetrySettings.from_dict(config.get("retry", {}), defaults.retry),
+        concurrency=LimiterSettings.from_dict(config.get("concurrency", {}), defaults.concurrency),
+        bulkhead=BulkheadSettings.from_dict(config.get("bulkhead", {}), defaults.bulkhead),
+    )
+
+
+def load_route_table(raw_config: str | None, default_routes: list[dict],
+                     defaults: RouteDefaults = RouteDefaults()) -> RouteTable:
+    """Загружает таблицу маршрутов из JSON-списка или из маршрутов по умолчанию."""
+    configs = json.loads(raw_config) if raw_config else default_routes
+    return RouteTable([build_route(config, defaults) for config in configs])
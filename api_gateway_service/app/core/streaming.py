@@ -0,0 +1,118 @@
+from typing import AsyncIterator, Awaitable, Callable
+
+import httpx
+from fastapi import Request
+
+from app.core.logging import get_logger
+
+logger = get_logger("api_gateway")
+
+# Заголовки, которые относятся к конкретному соединению и не должны проксироваться
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+})
+
+
+class BodyTooLarge(Exception):
+    """Тело запроса превышает допустимый размер."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Request body exceeds {limit} bytes")
+        self.limit = limit
+
+
+def has_request_body(request: Request) -> bool:
+    """Есть ли у входящего запроса тело, которое нужно передать дальше."""
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+
+async def iter_request_body(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """Отдаёт тело запроса по частям, не накапливая его в памяти.
+
+    Следующий кусок читается из сокета клиента только после того, как httpx
+    отправил предыдущий в upstream, поэтому медленный upstream притормаживает
+    и клиента (backpressure).
+    """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise BodyTooLarge(max_bytes)
+        if chunk:
+            yield chunk
+
+
+async def aiter_raw_chunks(response: httpx.Response, chunk_size: int) -> AsyncIterator[bytes]:
+    """Сырые (не декодированные) байты ответа кусками не больше chunk_size."""
+    async for chunk in response.aiter_raw(chunk_size):
+        yield chunk
+
+
+async def read_raw_body(response: httpx.Response, chunk_size: int) -> bytes:
+    """Читает тело ответа целиком без декодирования Content-Encoding."""
+    return b"".join([chunk async for chunk in aiter_raw_chunks(response, chunk_size)])
+
+
+async def read_limited(response: httpx.Response, limit: int,
+                       chunk_size: int) -> tuple[list[bytes], AsyncIterator[bytes] | None]:
+    """Читает тело ответа, пока оно не превысит limit.
+
+    Возвращает прочитанные куски и None, если тело прочитано целиком. Если
+    тело оказалось больше лимита, вместо None возвращается итератор остатка:
+    поток ответа можно начать читать только один раз, поэтому дочитывать
+    нужно через iter_response_body(..., head=chunks, rest=rest).
+    """
+    rest = aiter_raw_chunks(response, chunk_size)
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return [], rest
+    chunks = []
+    received = 0
+    async for chunk in rest:
+        chunks.append(chunk)
+        received += len(chunk)
+        if received > limit:
+            return chunks, rest
+    return chunks, None
+
+
+async def iter_response_body(response: httpx.Response, chunk_size: int, target_service: str,
+                             head: list[bytes] = (), rest: AsyncIterator[bytes] | None = None,
+                             release: Callable[[], Awaitable[None]] | None = None) -> AsyncIterator[bytes]:
+    """Отдаёт тело ответа upstream кусками не больше chunk_size.
+
+    head и rest - уже прочитанные куски и итератор остатка тела из
+    read_limited; head отдаётся первым. release вызывается, когда тело
+    закончилось, оборвалось или его перестали читать: фоновую задачу ответа
+    Starlette после ошибки в теле не запускает.
+    """
+    try:
+        for chunk in head:
+            yield chunk
+        async for chunk in rest if rest is not None else aiter_raw_chunks(response, chunk_size):
+            yield chunk
+    except httpx.HTTPError as e:
+        # Заголовки уже отправлены клиенту, поэтому остаётся только оборвать ответ
+        logger.error({
+            "event": "proxy_stream_error",
+            "target_service": target_service,
+            "error_type": type(e).__name__,
+            "error_message": str(e)
+        })
+        raise
+    finally:
+        if release is not None:
+            await release()
+
+
+def filter_response_headers(headers: httpx.Headers) -> dict[str, str]:
+    """Убирает из ответа upstream hop-by-hop заголовки и Location."""
+    return {k: v for k, v in headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() != "location"}
@@ -1,136 +1,572 @@
+import asyncio
+import functools
+import json
+import math
 import os
 import httpx
 import time
 import redis.asyncio as redis
 
-from fastapi import FastAPI, Request, Response, Depends
+from fastapi import FastAPI, HTTPException, Request, Response, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
+from dataclasses import dataclass
+from typing import AsyncIterator
+from starlette.background import BackgroundTask
+from starlette.datastructures import QueryParams
 
-from app.core.logging import get_logger
+from app.core.batch import BatchItem, BatchItemTooLarge, BatchRequest, InvalidBatchItem, body_receiver, build_scope, \
+    decode_body, read_response, split_path
+from app.core.conditional import GATEWAY_CONDITIONAL_HEADERS, if_none_match, not_modified_headers, with_etag
+from app.core.bulkhead import Bulkhead, BulkheadFull, BulkheadSettings
+from app.core.coalescing import SingleFlight, build_flight_key
+from app.core.concurrency import AdaptiveLimiter, ConcurrencyLimitExceeded, LimiterSettings
+from app.core.compression import CompressionMiddleware, CompressionSettings, parse_encodings
+from app.core.composition import Expansion, UnknownExpansion, batches, merge_related, parse_expand, related_ids
+from app.core.cache import CachedResponse, ResponseCache, is_cache_bypassed, is_cacheable, parse_ttls
+from app.core.clients import ClientResolver, parse_api_keys, parse_networks
+from app.core.logging import get_logger, writer as log_writer
+from app.core.middleware import RequestLoggingMiddleware
+from app.core import metrics
+from app.core.circuit_breaker import BreakerSettings
+from app.core.pools import ConnectionPool, PoolSettings
+from app.core.rate_limit import RateLimitDecision, RateLimiter, RateLimitTier, parse_client_tiers
+from app.core.retries import IDEMPOTENT_METHODS, RetryBudget, RetrySettings
+from app.core.routing import NoHealthyUpstream, Route, RouteDefaults, Upstream, load_route_table
+from app.core.streaming import (HOP_BY_HOP_HEADERS, BodyTooLarge, filter_response_headers, has_request_body,
+                                iter_request_body, iter_response_body, read_limited, read_raw_body)
 
 
 logger = get_logger("api_gateway")
 
+async def init_gateway_state(app: FastAPI, redis_client: redis.Redis,
+                             transport: httpx.AsyncBaseTransport | None = None):
+    """Создаёт состояние шлюза, живущее всё время работы процесса.
+
+    transport позволяет бенчмаркам и тестам подменить сеть до upstream.
+    """
+    app.state.redis = redis_client
+    app.state.response_cache = ResponseCache(redis_client, max_body_bytes=CACHE_MAX_BODY_BYTES)
+    # У каждого маршрута свой пул соединений, чтобы сервисы не делили соединения
+    app.state.pools = {route.prefix: ConnectionPool(route.service, route.pool, route.timeout, transport)
+                       for route in route_table.routes}
+    # Отсек каждого upstream: жёсткий предел запросов и своя очередь
+    app.state.bulkheads = {route.prefix: Bulkhead(route.service, route.bulkhead) for route in route_table.routes}
+    # Адаптивный лимит одновременных запросов к каждому upstream
+    app.state.limiters = {route.prefix: AdaptiveLimiter(route.service, route.concurrency)
+                          for route in route_table.routes if route.concurrency.enabled}
+    app.state.single_flight = SingleFlight()
+    app.state.rate_limiter = RateLimiter(redis_client, sync_interval_s=RATE_LIMIT_SYNC_INTERVAL_S)
+    app.state.rate_limiter.start()
+    app.state.retry_budget = RetryBudget(ratio=RETRY_BUDGET_RATIO, min_per_s=RETRY_BUDGET_MIN_PER_S,
+                                         max_tokens=RETRY_BUDGET_MAX_TOKENS)
+
+
+async def close_gateway_state(app: FastAPI):
+    await app.state.rate_limiter.aclose()
+    await app.state.redis.close()
+    for pool in app.state.pools.values():
+        await pool.aclose()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info({"event": "gateway_startup"})
-    app.state.redis = redis.from_url("redis://redis:6379", encoding = "utf-8", decode_responses = True)
-    await FastAPILimiter.init(app.state.redis)
-    app.state.http_client = httpx.AsyncClient(timeout=30.0)
+    redis_client = redis.from_url(REDIS_URL, encoding = "utf-8", decode_responses = True)
+    await init_gateway_state(app, redis_client)
     logger.info({"event": "gateway_ready"})
     try:
         yield
     finally:
         logger.info({"event": "gateway_shutdown"})
-        await app.state.redis.close()
-        await app.state.http_client.aclose()
+        await close_gateway_state(app)
 
 app = FastAPI(title="API Gateway", lifespan=lifespan)
 
 POSTS_SERVICE_URL = os.getenv("POSTS_SERVICE_URL")
 CATEGORIES_SERVICE_URL = os.getenv("CATEGORIES_SERVICE_URL")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+
+# Потоковое проксирование: тело запроса и ответа не накапливается в памяти шлюза
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", 64 * 1024))
+PROXY_MAX_BODY_BYTES = int(os.getenv("PROXY_MAX_BODY_BYTES", 10 * 1024 * 1024))
+
+# Кэш GET-ответов: TTL в секундах по префиксу маршрута, 0 или отсутствие префикса - без кэша
+CACHE_TTLS = parse_ttls(os.getenv("CACHE_TTLS", "categories=60,posts=10"))
+CACHE_MAX_BODY_BYTES = int(os.getenv("CACHE_MAX_BODY_BYTES", 1024 * 1024))
+
+# Объединение одинаковых одновременных GET-запросов в один запрос к upstream
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+COALESCE_VARY_HEADERS = [name.strip().lower() for name in
+                         os.getenv("COALESCE_VARY_HEADERS", "accept,accept-encoding,authorization").split(",")
+                         if name.strip()]
+
+# Максимальный размер ответа, который шлюз читает в память целиком (для кэша и объединения)
+PROXY_MAX_BUFFERED_BYTES = int(os.getenv("PROXY_MAX_BUFFERED_BYTES", 1024 * 1024))
+
+# Методы, после успешного выполнения которых кэш префикса сбрасывается
+CACHE_INVALIDATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Пул экземпляров сервиса можно задать списком через запятую в *_SERVICE_URL
+DEFAULT_ROUTES = [
+    {"prefix": "posts", "service": "posts_service", "upstreams": POSTS_SERVICE_URL},
+    {"prefix": "categories", "service": "categories_service", "upstreams": CATEGORIES_SERVICE_URL},
+]
+
+# Таблица маршрутов: JSON-список в GATEWAY_ROUTES или в файле GATEWAY_ROUTES_FILE
+GATEWAY_BALANCER = os.getenv("GATEWAY_BALANCER", "round_robin")
+
+
+def _read_routes_config() -> str | None:
+    routes_file = os.getenv("GATEWAY_ROUTES_FILE")
+    if routes_file:
+        with open(routes_file, encoding="utf-8") as f:
+            return f.read()
+    return os.getenv("GATEWAY_ROUTES")
+
+
+# Таймаут запроса к upstream по умолчанию, маршрут может задать свой ("timeout")
+PROXY_TIMEOUT = float(os.getenv("PROXY_TIMEOUT", 30.0))
+
+# Circuit breaker каждого экземпляра upstream, маршрут может переопределить ("circuit_breaker")
+BREAKER_SETTINGS = BreakerSettings(
+    failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", 0.5)),
+    slow_call_s=float(os.getenv("BREAKER_SLOW_CALL_S", 5.0)),
+    slow_call_rate=float(os.getenv("BREAKER_SLOW_CALL_RATE", 0.8)),
+    min_calls=int(os.getenv("BREAKER_MIN_CALLS", 20)),
+    window_s=int(os.getenv("BREAKER_WINDOW_S", 10)),
+    open_s=float(os.getenv("BREAKER_OPEN_S", 5.0)),
+    half_open_calls=int(os.getenv("BREAKER_HALF_OPEN_CALLS", 3)),
+)
+
+# Связи, которые шлюз подставляет в ответ по ?expand=: {префикс маршрута: {имя: связь}}
+EXPANSIONS = {
+    "posts": {"category": Expansion(field="category_id", target="categories")},
+}
+
+# Дублирующие запросы (hedging) и повторы при ошибке соединения для GET/HEAD,
+# маршрут может переопределить ("retry")
+RETRY_SETTINGS = RetrySettings(
+    hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", 0.95)),
+    hedge_min_delay_s=float(os.getenv("HEDGE_MIN_DELAY_S", 0.01)),
+    hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", 20)),
+    max_retries=int(os.getenv("RETRY_MAX_RETRIES", 2)),
+    backoff_base_s=float(os.getenv("RETRY_BACKOFF_BASE_S", 0.05)),
+    backoff_max_s=float(os.getenv("RETRY_BACKOFF_MAX_S", 1.0)),
+)
+# Общий бюджет: дополнительных запросов не больше RETRY_BUDGET_RATIO от исходных
+# плюс RETRY_BUDGET_MIN_PER_S в секунду, накопить можно не больше RETRY_BUDGET_MAX_TOKENS
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", 0.1))
+RETRY_BUDGET_MIN_PER_S = float(os.getenv("RETRY_BUDGET_MIN_PER_S", 5.0))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", 20.0))
+
+# Адаптивный лимит одновременных запросов к upstream, маршрут может переопределить ("concurrency")
+CONCURRENCY_SETTINGS = LimiterSettings(
+    enabled=os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true",
+    algorithm=os.getenv("CONCURRENCY_ALGORITHM", "gradient"),
+    initial_limit=int(os.getenv("CONCURRENCY_INITIAL_LIMIT", 20)),
+    min_limit=int(os.getenv("CONCURRENCY_MIN_LIMIT", 4)),
+    max_limit=int(os.getenv("CONCURRENCY_MAX_LIMIT", 1000)),
+    queue_size=int(os.getenv("CONCURRENCY_QUEUE_SIZE", 50)),
+    queue_timeout_s=float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_S", 0.05)),
+    latency_threshold_s=float(os.getenv("CONCURRENCY_LATENCY_THRESHOLD_S", 0.5)),
+)
+
+# Отсек upstream: не больше BULKHEAD_MAX_IN_FLIGHT запросов к маршруту (вместе с
+# недочитанными ответами), маршрут может переопределить ("bulkhead"). BULKHEAD_CLIENT_WEIGHTS -
+# JSON вида {"<имя клиента>": 4} для справедливой очереди (BULKHEAD_FAIR_QUEUE); клиент - тот же,
+# что у лимита запросов: имя по ключу из GATEWAY_API_KEYS или IP
+BULKHEAD_SETTINGS = BulkheadSettings.from_dict({
+    "max_in_flight": int(os.getenv("BULKHEAD_MAX_IN_FLIGHT", 100)),
+    "queue_size": int(os.getenv("BULKHEAD_QUEUE_SIZE", 100)),
+    "queue_timeout_s": float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_S", 0.5)),
+    "fair_queue": os.getenv("BULKHEAD_FAIR_QUEUE", "false").lower() == "true",
+    "client_weights": json.loads(os.getenv("BULKHEAD_CLIENT_WEIGHTS") or "{}"),
+})
+
+# POST /batch: сколько подзапросов принимается и сколько из них выполняется одновременно
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 10))
+# Сколько токенов лимита стоит один подзапрос (1.0 - как отдельный запрос)
+BATCH_ITEM_WEIGHT = float(os.getenv("BATCH_ITEM_WEIGHT", 1.0))
+
+# Сжатие ответов шлюза по Accept-Encoding клиента (zstd и br - если установлены zstandard и brotli)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_SETTINGS = CompressionSettings(
+    encodings=parse_encodings(os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip")),
+    min_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4)),
+    zstd_level=int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3)),
+    thread_min_size=int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", 64 * 1024)),
+)
+
+# Пул соединений к upstream, маршрут может переопределить ("pool")
+POOL_SETTINGS = PoolSettings(
+    max_connections=int(os.getenv("POOL_MAX_CONNECTIONS", 100)),
+    max_keepalive_connections=int(os.getenv("POOL_MAX_KEEPALIVE_CONNECTIONS", 20)),
+    keepalive_expiry=float(os.getenv("POOL_KEEPALIVE_EXPIRY", 5.0)),
+    http2=os.getenv("POOL_HTTP2", "false").lower() == "true",
+    connect_timeout=float(os.getenv("POOL_CONNECT_TIMEOUT", 5.0)),
+    pool_timeout=float(os.getenv("POOL_ACQUIRE_TIMEOUT", 5.0)),
+)
+
+# Лимит запросов: по умолчанию 100 за 5 минут на клиента и маршрут, маршрут может
+# переопределить ("rate_limit"), отдельные клиенты - через RATE_LIMIT_CLIENT_TIERS по имени клиента
+RATE_LIMIT_DEFAULT = RateLimitTier(limit=int(os.getenv("RATE_LIMIT_TIMES", 100)),
+                                   window_s=float(os.getenv("RATE_LIMIT_WINDOW_S", 300)))
+RATE_LIMIT_CLIENT_TIERS = parse_client_tiers(os.getenv("RATE_LIMIT_CLIENT_TIERS"))
+# Заголовок с API-ключом; ключ из GATEWAY_API_KEYS ({"<ключ>": "<имя клиента>"}) задаёт имя клиента,
+# неизвестный ключ и запрос без ключа определяются по IP
+RATE_LIMIT_KEY_HEADER = os.getenv("RATE_LIMIT_KEY_HEADER", "x-api-key").lower()
+GATEWAY_API_KEYS = parse_api_keys(os.getenv("GATEWAY_API_KEYS"))
+# Прокси перед шлюзом (IP и подсети через запятую), которым можно верить в X-Forwarded-For
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES"))
+RATE_LIMIT_SYNC_INTERVAL_S = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL_S", 1.0))
+
+client_resolver = ClientResolver(GATEWAY_API_KEYS, TRUSTED_PROXIES, RATE_LIMIT_KEY_HEADER)
+
+route_table = load_route_table(
+    _read_routes_config(),
+    [route for route in DEFAULT_ROUTES if route["upstreams"]],
+    RouteDefaults(balancer=GATEWAY_BALANCER, cache_ttls=CACHE_TTLS, timeout=PROXY_TIMEOUT,
+                  breaker=BREAKER_SETTINGS, pool=POOL_SETTINGS, rate_limit=RATE_LIMIT_DEFAULT,
+                  retry=RETRY_SETTINGS, concurrency=CONCURRENCY_SETTINGS, bulkhead=BULKHEAD_SETTINGS),
+)
+
+
+def _client_key(request: Request) -> str:
+    return client_resolver.resolve(request.headers, request.client.host if request.client else None)
+
+
+def _charge(client: str, route: Route | None, cost: int = 1, check_only: bool = False) -> RateLimitDecision:
+    tier = RATE_LIMIT_CLIENT_TIERS.get(client) or (route.rate_limit if route else RATE_LIMIT_DEFAULT)
+    limiter: RateLimiter = app.state.rate_limiter
+    return (limiter.check if check_only else limiter.hit)(f"{route.prefix if route else '*'}:{client}", tier, cost)
+
+
+async def rate_limiter(request: Request, path: str):
+    """Проверяет лимит запросов клиента к маршруту без обращения к Redis."""
+    client = _client_key(request)
+    decision = _charge(client, route_table.match(path))
+    request.state.rate_limit = decision
+    if not decision.allowed:
+        logger.warning({"event": "rate_limit_exceeded", "path": path, "client": client,
+                        "retry_after_s": decision.retry_after_s})
+        raise HTTPException(status_code=429, detail="Too Many Requests", headers=decision.headers())
+
+
+UPSTREAM_EXTRA_ATTEMPTS = metrics.registry.counter(
+    "gateway_upstream_extra_attempts", "Дублирующие запросы и повторы: отправлено, выиграло, отклонено бюджетом",
+    ("service", "kind", "result"))
+LOAD_SHED = metrics.registry.counter(
+    "gateway_load_shed", "Запросы, отклонённые адаптивным лимитом (503)", ("service",))
+metrics.registry.callback_gauge(
+    "gateway_concurrency_limit", "Текущий адаптивный лимит одновременных запросов", ("service",),
+    lambda: [((limiter.name,), int(limiter.limit)) for limiter in getattr(app.state, "limiters", {}).values()])
+BULKHEAD_REJECTED = metrics.registry.counter(
+    "gateway_bulkhead_rejected", "Запросы, не получившие места в отсеке upstream (503)", ("service", "reason"))
+metrics.registry.callback_gauge(
+    "gateway_bulkhead_in_flight", "Занятые места отсека upstream", ("service",),
+    lambda: [((bulkhead.name,), bulkhead.in_flight) for bulkhead in getattr(app.state, "bulkheads", {}).values()])
+metrics.registry.callback_gauge(
+    "gateway_bulkhead_queued", "Запросы, ждущие места в отсеке upstream", ("service",),
+    lambda: [((bulkhead.name,), bulkhead.queued_now) for bulkhead in getattr(app.state, "bulkheads", {}).values()])
+NOT_MODIFIED = metrics.registry.counter(
+    "gateway_not_modified", "Ответы 304 на If-None-Match по источнику ETag", ("source",))
+BATCH_ITEMS = metrics.registry.counter(
+    "gateway_batch_items", "Подзапросы POST /batch по коду ответа", ("status_code",))
+
+UPSTREAM_DURATION = metrics.registry.histogram(
+    "gateway_upstream_duration_seconds", "Время до заголовков ответа upstream", ("service", "status_code"))
+UPSTREAM_ERRORS = metrics.registry.counter(
+    "gateway_upstream_errors", "Запросы к upstream, завершившиеся ошибкой сети", ("service", "error"))
+metrics.registry.callback_gauge(
+    "gateway_upstream_in_flight", "Незавершённые запросы к экземпляру upstream", ("service", "url"),
+    lambda: [((route.service, instance.url), instance.in_flight)
+             for route in route_table.routes for instance in route.instances])
+
+
+def _metrics_route(scope) -> str:
+    """Метка маршрута: для проксируемых запросов - префикс из таблицы маршрутов."""
+    label = metrics.route_label(scope)
+    if label == "/{path:path}":
+        route = route_table.match(scope.get("path_params", {}).get("path", ""))
+        return f"/{route.prefix}" if route else "unmatched"
+    return label
+
+
+def _rate_limit_headers(scope) -> dict[str, str] | None:
+    """X-RateLimit-* для пропущенного запроса; отказ (429) несёт их сам."""
+    decision = scope.get("state", {}).get("rate_limit")
+    if decision is not None and decision.allowed:
+        return decision.headers()
+    return None
 
-@app.middleware("http")
-async def log_gateway_requests(request: Request, call_next):
-    """Middleware для логирования через Gateway"""
-    start_time = time.time()
-    
-    logger.info({
-        "event": "gateway_request_received",
-        "method": request.method,
-        "path": str(request.url.path),
-        "client_ip": request.client.host if request.client else None
-    })
-    
-    response = await call_next(request)
-    duration_ms = (time.time() - start_time) * 1000
-    
-    log_data = {
-        "event": "gateway_request_completed",
-        "method": request.method,
-        "path": str(request.url.path),
-        "status_code": response.status_code,
-        "duration_ms": round(duration_ms, 2)
-    }
-    
-    if response.status_code >= 500:
-        logger.error(log_data)
-    elif response.status_code >= 400:
-        logger.warning(log_data)
-    else:
-        logger.info(log_data)
-    
-    response.headers["X-RateLimit-Limit"] = "100"
-    
-    return response
+
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, settings=COMPRESSION_SETTINGS)
+
+# Логирование и метрики запросов - чистое ASGI-middleware, без BaseHTTPMiddleware
+app.add_middleware(RequestLoggingMiddleware, logger=logger, started_event="gateway_request_received",
+                   completed_event="gateway_request_completed", route_label=_metrics_route,
+                   extra_headers=_rate_limit_headers)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "api_gateway"}
 
 
+@app.get("/stats")
+async def gateway_stats():
+    """Счётчики внутренних компонентов шлюза."""
+    return {"cache": app.state.response_cache.stats.as_dict(),
+            "coalescing": app.state.single_flight.stats.as_dict(),
+            "rate_limit": app.state.rate_limiter.stats(),
+            "retry_budget": app.state.retry_budget.stats(),
+            "concurrency": {prefix: limiter.snapshot() for prefix, limiter in app.state.limiters.items()},
+            "bulkheads": {prefix: bulkhead.snapshot() for prefix, bulkhead in app.state.bulkheads.items()},
+            "logging": log_writer.stats(),
+            "pools": {prefix: pool.snapshot() for prefix, pool in app.state.pools.items()},
+            "upstreams": [{"route": route.prefix, "url": instance.url, "in_flight": instance.in_flight,
+                           **instance.breaker.snapshot()}
+                          for route in route_table.routes for instance in route.instances]}
+
+
+@app.get("/metrics")
+async def gateway_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/batch")
+async def batch_request(request: Request, batch: BatchRequest):
+    """Выполняет несколько запросов к сервисам за один HTTP-обмен.
+
+    Подзапросы проходят через proxy_request (маршруты, кэш, объединение,
+    circuit breaker), не больше BATCH_CONCURRENCY одновременно. Лимит
+    списывается заранее, одним списанием на маршрут весом в число его
+    подзапросов, и только если его хватает на все маршруты пакета: при
+    отказе по одному маршруту остальные не списываются. Ошибка подзапроса
+    попадает в его элемент ответа и не влияет на остальные; сам /batch
+    отвечает 200.
+    """
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} requests per batch")
+
+    groups: dict[str | None, list] = {}
+    for item in batch.requests:
+        route = route_table.match(split_path(item.path)[0])
+        groups.setdefault(route.prefix if route else None, [route, 0])[1] += 1
+    client = _client_key(request)
+    charges = [(route, max(1, math.ceil(count * BATCH_ITEM_WEIGHT))) for route, count in groups.values()]
+    for route, cost in charges:
+        if not _charge(client, route, cost, check_only=True).allowed:
+            # Отказ учитывается в статистике лимитера, токены не списываются
+            denied = _charge(client, route, cost)
+            logger.warning({"event": "rate_limit_exceeded", "path": "batch", "client": client,
+                            "items": len(batch.requests), "retry_after_s": denied.retry_after_s})
+            raise HTTPException(status_code=429, detail="Too Many Requests", headers=denied.headers())
+    decisions = [_charge(client, route, cost) for route, cost in charges]
+    request.state.rate_limit = min(decisions, key=lambda decision: decision.remaining)
+
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item: BatchItem) -> dict:
+        async with semaphore:
+            return await _run_batch_item(request, item)
+
+    results = await asyncio.gather(*[run(item) for item in batch.requests])
+    logger.info({"event": "batch_completed", "items": len(results),
+                 "failed": sum(1 for result in results if result["status"] >= 500),
+                 "duration_ms": round((time.time() - start_time) * 1000, 2)})
+    return Response(content=json.dumps({"responses": results}), media_type="application/json")
+
+
+async def _run_batch_item(request: Request, item: BatchItem) -> dict:
+    try:
+        scope, body = build_scope(request.scope, item)
+        response = await proxy_request(Request(scope, body_receiver(body)), scope["path_params"]["path"])
+        content = await read_response(response, PROXY_MAX_BUFFERED_BYTES)
+        status_code = response.status_code
+        headers = {key: value for key, value in response.headers.items()
+                   if key not in ("content-length", "transfer-encoding")}
+    except InvalidBatchItem as e:
+        status_code, headers = 400, {"content-type": "application/json"}
+        content = json.dumps({"detail": str(e)}).encode()
+    except BatchItemTooLarge:
+        status_code, headers = 502, {"content-type": "application/json"}
+        content = b'{"detail": "Response too large for batch"}'
+    except Exception as e:
+        logger.error({"event": "batch_item_error", "path": item.path,
+                      "error_type": type(e).__name__, "error_message": str(e)})
+        status_code, headers = 500, {"content-type": "application/json"}
+        content = b'{"detail": "Internal gateway error"}'
+    BATCH_ITEMS.labels(status_code).inc()
+    return {"id": item.id, "status": status_code, "headers": headers, "body": decode_body(headers, content)}
+
+
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
-               dependencies=[Depends(RateLimiter(times=100, minutes=5))])
+               dependencies=[Depends(rate_limiter)])
 async def proxy_request(request: Request, path: str):
     """Функция определяет, какому сервису перенаправить запрос, основываясь на начальной части URL пути."""
-    target_url = None
-    target_service = None
-    
-    if path.startswith("posts"):
-        target_url = f"{POSTS_SERVICE_URL}/{path}"
-        target_service = "posts_service"
-    elif path.startswith("categories"):
-        target_service = "categories_service"
-        target_url = f"{CATEGORIES_SERVICE_URL}/{path}"
-
-    if not target_url:
+    route = route_table.match(path)
+
+    if route is None:
         logger.warning({"event": "proxy_route_not_found", "path": path})
         return Response(content="Not Found", status_code=404)
 
-    logger.info({"event": "proxy_forwarding", "target_service": target_service,
-                 "target_url": target_url, "method": request.method})
+    target_service = route.service
+
+    cache: ResponseCache = app.state.response_cache
+    # Составные ответы (?expand=) не кэшируются: кэшируются их части
+    compose = request.method == "GET" and "expand" in request.query_params
+    cache_ttl = route.cache_ttl if request.method == "GET" and not compose else 0
+    cache_key = None
+    if cache_ttl:
+        if is_cache_bypassed(request.headers):
+            # Ответ на запрос с Authorization или no-cache/no-store не читается из кэша и не пишется в него
+            cache.stats.bypasses += 1
+        else:
+            cache_key = cache.build_key(route.prefix, path, request.query_params)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info({"event": "proxy_cache_hit", "target_service": target_service, "path": path})
+                cached_headers = {**with_etag(cached.status_code, cached.headers, cached.body), "X-Cache": "HIT"}
+                # 304 из кэша: upstream не трогается, тело не передаётся
+                return _not_modified(request, cached_headers, "cache") or \
+                    Response(content=cached.body, status_code=cached.status_code, headers=cached_headers)
 
-    # тело запроса
-    body = await request.body()
-    
     headers = {key: value for key, value in request.headers.items()
-               if key.lower() not in ['host', 'content-length']}
-    
-    
-    # Формируем запрос к целевому сервису
-    proxied_req = app.state.http_client.build_request(
-        method=request.method,
-        url=target_url,
-        headers=headers,
-        params=request.query_params,
-        content=body
-    )
-    
-    start_time = time.time()    
+               if key.lower() != 'host' and key.lower() not in HOP_BY_HOP_HEADERS}
+    if request.method == "GET":
+        for name in GATEWAY_CONDITIONAL_HEADERS:
+            headers.pop(name, None)
+
+    client = _client_key(request)
+    start_time = time.time()
+    response = instance = rest = None
+    head = ()
     try:
-        # Отправляем запрос
-        response = await app.state.http_client.send(proxied_req)
-        
-        duration_ms = (time.time() - start_time) * 1000
-        
-        logger.info({
-            "event": "proxy_response_received",
-            "target_service": target_service,
-            "status_code": response.status_code,
-            "duration_ms": round(duration_ms, 2)
-        })
-        
+        if compose:
+            return await _compose(request, route, path, headers, client)
+
+        if COALESCE_ENABLED and request.method == "GET" and not has_request_body(request):
+            # Одинаковые одновременные GET разделяют один запрос к upstream
+            flight_key = build_flight_key(request.method, path, request.query_params,
+                                          request.headers, COALESCE_VARY_HEADERS)
+            entry, leader = await app.state.single_flight.do(
+                flight_key, lambda: _fetch_buffered(route, request.method, path, headers, request.query_params,
+                                                    client), discard=_discard_unbuffered)
+            if isinstance(entry, CachedResponse):
+                response_headers = dict(entry.headers)
+                background = None
+                if cache_key:
+                    response_headers["X-Cache"] = "MISS"
+                    if leader and is_cacheable(entry.status_code, entry.headers) \
+                            and len(entry.body) <= cache.max_body_bytes:
+                        # Запись в Redis выполняется уже после отправки ответа клиенту
+                        background = BackgroundTask(cache.set, route.prefix, cache_key, entry, cache_ttl)
+                return _not_modified(request, response_headers, "upstream", background) or \
+                    Response(content=entry.body, status_code=entry.status_code,
+                             headers=response_headers, background=background)
+            if entry.take():
+                # Ответ больше лимита буферизации: этот запрос дочитывает его потоком с уже прочитанного места
+                response, instance, head, rest = entry.response, entry.instance, entry.head, entry.rest
+            # Иначе открытый ответ уже забрал другой запрос, этот получает свою копию потоком
+
+        if response is None:
+            if PROXY_STREAMING:
+                content_length = request.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > PROXY_MAX_BODY_BYTES:
+                    return _payload_too_large(target_service)
+                # Тело передаётся upstream по мере чтения от клиента
+                body = iter_request_body(request, PROXY_MAX_BODY_BYTES) if has_request_body(request) else None
+            else:
+                # тело запроса
+                body = await request.body()
+                headers.pop("content-length", None)
+
+            response, instance = await _send(route, request.method, path, headers,
+                                             request.query_params, content=body, client=client)
+
         # Возвращаем ответ клиенту
-        response_headers = {
-        k: v for k, v in response.headers.items()
-        if k.lower() not in ["location"]}
-        
+        response_headers = filter_response_headers(response.headers)
+        if cache_key:
+            response_headers["X-Cache"] = "MISS"
+
+        if request.method in CACHE_INVALIDATING_METHODS and response.status_code < 400:
+            await cache.invalidate(route.prefix)
+
+        if request.method == "GET" and response.status_code == 200 \
+                and if_none_match(request.headers, response_headers.get("etag")):
+            # Тело не читается целиком, поэтому 304 возможен только по ETag самого upstream
+            await _release_upstream(route, response, instance)
+            return _not_modified(request, response_headers, "upstream")
+
+        if PROXY_STREAMING:
+            release = functools.partial(_release_upstream, route, response, instance)
+            return StreamingResponse(
+                iter_response_body(response, PROXY_CHUNK_SIZE, target_service, head=head, rest=rest,
+                                   release=release),
+                status_code=response.status_code,
+                headers=response_headers,
+                # Если тело так и не начали читать, освобождает фоновая задача
+                background=BackgroundTask(release)
+            )
+
+        try:
+            content = b"".join([*head, *[chunk async for chunk in rest]]) if rest is not None \
+                else await read_raw_body(response, PROXY_CHUNK_SIZE)
+        finally:
+            await _release_upstream(route, response, instance)
+
+        if request.method == "GET":
+            response_headers = with_etag(response.status_code, response_headers, content)
+            not_modified = _not_modified(request, response_headers, "upstream")
+            if not_modified is not None:
+                return not_modified
+
         return Response(
-            content=response.content,
+            content=content,
             status_code=response.status_code,
-            headers=dict(response_headers)
+            headers=response_headers
+        )
+    except BodyTooLarge:
+        return _payload_too_large(target_service)
+    except ConcurrencyLimitExceeded as e:
+        # Upstream уже загружен до предела: быстрый отказ вместо очереди в httpx и upstream
+        LOAD_SHED.labels(target_service).inc()
+        logger.warning({"event": "proxy_load_shed", "target_service": target_service,
+                        "limit": int(app.state.limiters[route.prefix].limit)})
+        return Response(
+            content='{"detail": "Service overloaded, retry later"}',
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after_s)},
+            media_type="application/json"
+        )
+    except BulkheadFull as e:
+        # Отсек сервиса занят медленными запросами: остальные сервисы этого не ждут
+        BULKHEAD_REJECTED.labels(target_service, e.reason).inc()
+        logger.warning({"event": "proxy_bulkhead_full", "target_service": target_service, "reason": e.reason,
+                        "client": client})
+        return Response(
+            content='{"detail": "Service overloaded, retry later"}',
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after_s)},
+            media_type="application/json"
+        )
+    except NoHealthyUpstream as e:
+        # Запрос отклонён без обращения к сети: все экземпляры исключены
+        logger.warning({"event": "proxy_circuit_open", "target_service": target_service,
+                        "retry_after_s": round(e.retry_after, 2)})
+        return Response(
+            content='{"detail": "Service unavailable: circuit open"}',
+            status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            media_type="application/json"
         )
     except httpx.RequestError as e:
         duration_ms = (time.time() - start_time) * 1000
@@ -163,4 +599,416 @@ async def proxy_request(request: Request, path: str):
             content=f'{{"detail": "Internal gateway error"}}',
             status_code=500,
             media_type="application/json"
-            )
\ No newline at end of file
+            )
+
+
+async def _send(route: Route, method: str, path: str, headers: dict[str, str],
+                params, content=None, client: str | None = None) -> tuple[httpx.Response, Upstream]:
+    """Отправляет запрос upstream в пределах адаптивного лимита маршрута.
+
+    Лимит держится до получения заголовков ответа: именно это время растёт,
+    когда в upstream копится очередь.
+    """
+    limiter: AdaptiveLimiter | None = app.state.limiters.get(route.prefix)
+    if limiter is None:
+        return await _send_with_retries(route, method, path, headers, params, content, client)
+    started_at = await limiter.acquire()
+    try:
+        response, instance = await _send_with_retries(route, method, path, headers, params, content, client)
+    except NoHealthyUpstream:
+        limiter.release(started_at, sample=False)
+        raise
+    except Exception:
+        limiter.release(started_at, dropped=True)
+        raise
+    except BaseException:
+        limiter.release(started_at, sample=False)
+        raise
+    limiter.release(started_at, dropped=response.status_code >= 500)
+    return response, instance
+
+
+async def _send_with_retries(route: Route, method: str, path: str, headers: dict[str, str],
+                             params, content=None, client: str | None = None) -> tuple[httpx.Response, Upstream]:
+    """GET/HEAD без тела - с дублированием и повторами, остальное - одной попыткой."""
+    if method not in IDEMPOTENT_METHODS or content is not None:
+        return await _send_upstream(route, method, path, headers, params, content, client=client)
+
+    budget: RetryBudget = app.state.retry_budget
+    budget.deposit()
+    attempt = 0
+    while True:
+        try:
+            return await _send_hedged(route, method, path, headers, params, client)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            # Соединение не установлено - запрос до upstream не дошёл, повтор безопасен
+            if attempt >= route.retry.max_retries:
+                raise
+            if not budget.withdraw():
+                UPSTREAM_EXTRA_ATTEMPTS.labels(route.service, "retry", "budget_denied").inc()
+                raise
+            attempt += 1
+            delay = route.retry.backoff(attempt)
+            UPSTREAM_EXTRA_ATTEMPTS.labels(route.service, "retry", "sent").inc()
+            logger.warning({"event": "proxy_retry", "target_service": route.service, "attempt": attempt,
+                            "error_type": type(e).__name__, "delay_ms": round(delay * 1000, 2)})
+            await asyncio.sleep(delay)
+
+
+async def _send_hedged(route: Route, method: str, path: str, headers: dict[str, str],
+                       params, client: str | None = None) -> tuple[httpx.Response, Upstream]:
+    """Если ответа нет дольше перцентиля hedge_percentile, тот же запрос уходит другому
+    экземпляру; берётся первый полученный ответ, второй запрос отменяется."""
+    delay = route.latency.hedge_delay(route.retry)
+    if delay is None:
+        return await _send_upstream(route, method, path, headers, params, client=client)
+    first_instance = route.pick()
+    first = asyncio.create_task(_send_upstream(route, method, path, headers, params,
+                                               instance=first_instance, client=client))
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            # Ответ отдаётся вызывающему: finally не должен его закрыть
+            tasks.discard(first)
+            return first.result()
+
+        budget: RetryBudget = app.state.retry_budget
+        if not budget.withdraw():
+            UPSTREAM_EXTRA_ATTEMPTS.labels(route.service, "hedge", "budget_denied").inc()
+            return await _keep(tasks, first)
+        try:
+            instance = route.pick(exclude=first_instance)
+        except NoHealthyUpstream:
+            # Другого доступного экземпляра нет: ждём первый запрос
+            budget.refund()
+            return await _keep(tasks, first)
+        hedge = asyncio.create_task(_send_upstream(route, method, path, headers, params,
+                                                   instance=instance, client=client))
+        tasks.add(hedge)
+        UPSTREAM_EXTRA_ATTEMPTS.labels(route.service, "hedge", "sent").inc()
+
+        error = None
+        pending = tasks
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        UPSTREAM_EXTRA_ATTEMPTS.labels(route.service, "hedge", "won").inc()
+                    tasks.discard(task)
+                    return task.result()
+                error = task.exception()
+            tasks = pending
+        raise error
+    finally:
+        for task in tasks:
+            await _discard_attempt(route, task)
+
+
+async def _keep(tasks: set[asyncio.Task], task: asyncio.Task) -> tuple[httpx.Response, Upstream]:
+    """Дожидается запроса и забирает его ответ из tasks, чтобы _send_hedged его не освободил."""
+    result = await task
+    tasks.discard(task)
+    return result
+
+
+async def _discard_attempt(route: Route, task: asyncio.Task):
+    """Отменяет проигравший запрос; если он уже получил ответ, освобождает соединение."""
+    task.cancel()
+    try:
+        response, instance = await task
+    except BaseException:
+        return
+    await _release_upstream(route, response, instance)
+
+
+async def _send_upstream(route: Route, method: str, path: str, headers: dict[str, str],
+                         params, content=None, instance: Upstream | None = None,
+                         client: str | None = None) -> tuple[httpx.Response, Upstream]:
+    """Отправляет запрос выбранному экземпляру маршрута; тело ответа остаётся непрочитанным.
+
+    Экземпляр и место в отсеке маршрута считаются занятыми, пока ответ не
+    освобождён через _release_upstream. Результат (5xx и сетевые ошибки -
+    неуспех) учитывается circuit breaker'ом экземпляра.
+    """
+    bulkhead: Bulkhead = app.state.bulkheads[route.prefix]
+    try:
+        await bulkhead.acquire(client)
+    except BaseException:
+        if instance is not None:
+            # Экземпляр выбран заранее (дублирующий запрос), но запрос до него не дошёл
+            instance.breaker.release()
+        raise
+    try:
+        return await _exchange(route, method, path, headers, params, content, instance)
+    except BaseException:
+        bulkhead.release()
+        raise
+
+
+async def _exchange(route: Route, method: str, path: str, headers: dict[str, str],
+                    params, content, instance: Upstream | None) -> tuple[httpx.Response, Upstream]:
+    if instance is None:
+        instance = route.pick()
+    target_url = f"{instance.url}/{path}"
+
+    logger.info({"event": "proxy_forwarding", "target_service": route.service,
+                 "target_url": target_url, "method": method})
+
+    pool: ConnectionPool = app.state.pools[route.prefix]
+    # Формируем запрос к целевому сервису
+    proxied_req = pool.build_request(
+        method=method,
+        url=target_url,
+        headers=headers,
+        # Повторяющиеся параметры (?ids=1&ids=2) передаются все, а не последний
+        params=params.multi_items() if isinstance(params, QueryParams) else params,
+        content=content
+    )
+
+    start_time = time.time()
+    instance.in_flight += 1
+    try:
+        response = await pool.send(proxied_req)
+    except httpx.PoolTimeout:
+        # Нехватка соединений в шлюзе - не вина экземпляра upstream
+        instance.in_flight -= 1
+        instance.breaker.release()
+        UPSTREAM_ERRORS.labels(route.service, "PoolTimeout").inc()
+        raise
+    except httpx.RequestError as e:
+        instance.in_flight -= 1
+        instance.breaker.record(success=False, duration_s=time.time() - start_time)
+        UPSTREAM_ERRORS.labels(route.service, type(e).__name__).inc()
+        raise
+    except BaseException:
+        instance.in_flight -= 1
+        instance.breaker.release()
+        raise
+
+    duration_ms = (time.time() - start_time) * 1000
+    instance.breaker.record(success=response.status_code < 500, duration_s=duration_ms / 1000)
+    if response.status_code < 500:
+        route.latency.observe(duration_ms / 1000)
+    UPSTREAM_DURATION.labels(route.service, response.status_code).observe(duration_ms / 1000)
+
+    logger.info({
+        "event": "proxy_response_received",
+        "target_service": route.service,
+        "status_code": response.status_code,
+        "duration_ms": round(duration_ms, 2)
+    })
+    return response, instance
+
+
+# Отметка в response.extensions: экземпляр и место в отсеке уже освобождены
+_RELEASED = "gateway_released"
+
+
+async def _release_upstream(route: Route, response: httpx.Response, instance: Upstream):
+    """Закрывает ответ и освобождает экземпляр и место в отсеке; повторный вызов ничего не делает."""
+    if response.extensions.get(_RELEASED):
+        return
+    response.extensions[_RELEASED] = True
+    try:
+        await response.aclose()
+    finally:
+        instance.in_flight -= 1
+        app.state.bulkheads[route.prefix].release()
+
+
+@dataclass
+class _UnbufferedResponse:
+    """Ответ больше PROXY_MAX_BUFFERED_BYTES: открытый ответ upstream, прочитанные куски и остаток тела.
+
+    Дочитать поток может только один из объединённых запросов - первый,
+    вызвавший take(); остальные отправляют свой запрос.
+    """
+    route: Route
+    response: httpx.Response
+    instance: Upstream
+    head: list[bytes]
+    rest: AsyncIterator[bytes]
+    taken: bool = False
+
+    def take(self) -> bool:
+        if self.taken:
+            return False
+        self.taken = True
+        return True
+
+    async def discard(self):
+        if self.take():
+            await _release_upstream(self.route, self.response, self.instance)
+
+
+async def _discard_unbuffered(entry: CachedResponse | _UnbufferedResponse):
+    """Освобождает открытый ответ, который не получил ни один из объединённых запросов."""
+    if isinstance(entry, _UnbufferedResponse):
+        await entry.discard()
+
+
+async def _fetch_buffered(route: Route, method: str, path: str, headers: dict[str, str],
+                          params, client: str | None = None) -> CachedResponse | _UnbufferedResponse:
+    """Выполняет запрос и читает ответ целиком, если он не больше PROXY_MAX_BUFFERED_BYTES.
+
+    Больший ответ не закрывается: его дочитывает потоком тот, кто заберёт
+    _UnbufferedResponse, так что upstream не получает тот же запрос второй раз.
+    """
+    response, instance = await _send(route, method, path, headers, params, client=client)
+    try:
+        chunks, rest = await read_limited(response, PROXY_MAX_BUFFERED_BYTES, PROXY_CHUNK_SIZE)
+    except BaseException:
+        await _release_upstream(route, response, instance)
+        raise
+    if rest is not None:
+        return _UnbufferedResponse(route, response, instance, chunks, rest)
+    await _release_upstream(route, response, instance)
+    body = b"".join(chunks)
+    headers = filter_response_headers(response.headers)
+    if method == "GET":
+        headers = with_etag(response.status_code, headers, body)
+    return CachedResponse(status_code=response.status_code, headers=headers, body=body)
+
+
+def _not_modified(request: Request, headers: dict[str, str], source: str,
+                  background: BackgroundTask | None = None) -> Response | None:
+    """304 Not Modified, если If-None-Match клиента совпал с ETag ответа; иначе None."""
+    if request.method != "GET" or not if_none_match(request.headers, headers.get("etag")):
+        return None
+    NOT_MODIFIED.labels(source).inc()
+    return Response(status_code=304, headers=not_modified_headers(headers), background=background)
+
+
+async def _fetch_cached(route: Route, path: str, headers: dict[str, str], params: QueryParams,
+                        request_headers, client: str | None = None) -> CachedResponse | None:
+    """GET через кэш маршрута (если он включён) и объединение одинаковых запросов."""
+    cache: ResponseCache = app.state.response_cache
+    cache_key = None
+    if route.cache_ttl and not is_cache_bypassed(request_headers):
+        cache_key = cache.build_key(route.prefix, path, params)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    flight_key = build_flight_key("GET", path, params, request_headers, COALESCE_VARY_HEADERS)
+    entry, leader = await app.state.single_flight.do(
+        flight_key, lambda: _fetch_buffered(route, "GET", path, headers, params, client),
+        discard=_discard_unbuffered)
+    if isinstance(entry, _UnbufferedResponse):
+        # Слишком большой ответ для сборки составного: соединение освобождается сразу
+        await entry.discard()
+        return None
+    if cache_key and leader and is_cacheable(entry.status_code, entry.headers) \
+            and len(entry.body) <= cache.max_body_bytes:
+        await cache.set(route.prefix, cache_key, entry, route.cache_ttl)
+    return entry
+
+
+class RelatedFetchFailed(Exception):
+    pass
+
+
+async def _fetch_related(expansion: Expansion, ids: list, headers: dict[str, str],
+                         request_headers, client: str | None = None) -> dict:
+    """Загружает связанные объекты пачками по batch_size, пачки - параллельно."""
+    target = route_table.match(expansion.target)
+    if target is None:
+        raise RelatedFetchFailed(f"No route for {expansion.target}")
+    path = f"{target.prefix}/"
+    entries = await asyncio.gather(*[
+        _fetch_cached(target, path, headers,
+                      QueryParams([(expansion.batch_param, str(value)) for value in sorted(batch, key=str)]),
+                      request_headers, client)
+        for batch in batches(ids, expansion.batch_size)])
+
+    related = {}
+    for entry in entries:
+        if entry is None or entry.status_code != 200:
+            raise RelatedFetchFailed(f"{target.service} answered {entry.status_code if entry else 'too large'}")
+        for obj in json.loads(entry.body):
+            related[obj[expansion.target_key]] = obj
+    return related
+
+
+def _parse_id(value: str):
+    return int(value) if value.isdigit() else value
+
+
+async def _compose(request: Request, route: Route, path: str, headers: dict[str, str],
+                   client: str | None = None) -> Response:
+    """Ответ основного сервиса со связанными объектами (?expand=category).
+
+    id связанных объектов собираются по всему списку без повторов и
+    запрашиваются одной пачкой. Если id известен заранее (например,
+    ?category_id=3), связанный запрос идёт параллельно с основным. Если
+    связанный сервис недоступен, основной ответ всё равно отдаётся, поле
+    связи равно null, а имя связи попадает в X-Expand-Failed.
+    """
+    try:
+        requested = parse_expand(request.query_params["expand"], EXPANSIONS.get(route.prefix, {}))
+    except UnknownExpansion as e:
+        return Response(content=json.dumps({"detail": str(e)}), status_code=400, media_type="application/json")
+
+    params = QueryParams([(key, value) for key, value in request.query_params.multi_items() if key != "expand"])
+    # Тело разбирается как JSON, поэтому upstream не должен его сжимать
+    headers = {**headers, "accept-encoding": "identity"}
+
+    known = {name: [_parse_id(params[expansion.field])]
+             for name, expansion in requested.items() if expansion.field in params}
+    primary, *prefetched = await asyncio.gather(
+        _fetch_cached(route, path, headers, params, request.headers, client),
+        *[_fetch_related(requested[name], ids, headers, request.headers, client) for name, ids in known.items()],
+        return_exceptions=True)
+    if isinstance(primary, BaseException):
+        raise primary
+    if primary is None:
+        return Response(content='{"detail": "Upstream response too large to expand"}', status_code=502,
+                        media_type="application/json")
+    if primary.status_code != 200:
+        return Response(content=primary.body, status_code=primary.status_code, headers=primary.headers)
+
+    data = json.loads(primary.body)
+    items = data if isinstance(data, list) else [data]
+    related_by_name = {name: result for name, result in zip(known, prefetched)}
+    failed = []
+    for name, expansion in requested.items():
+        related = related_by_name.get(name)
+        if isinstance(related, BaseException):
+            related = None
+        else:
+            related = related or {}
+            missing = [value for value in related_ids(items, expansion.field) if value not in related]
+            if missing:
+                try:
+                    related.update(await _fetch_related(expansion, missing, headers, request.headers, client))
+                except (RelatedFetchFailed, NoHealthyUpstream, ConcurrencyLimitExceeded, BulkheadFull,
+                        httpx.RequestError) as e:
+                    related = None
+                    logger.warning({"event": "compose_related_failed", "expand": name,
+                                    "error_type": type(e).__name__, "error_message": str(e)})
+        if related is None:
+            failed.append(name)
+        merge_related(items, name, expansion.field, related or {})
+
+    content = json.dumps(data).encode()
+    extra_headers = {"X-Expand-Failed": ",".join(failed)} if failed else {}
+    # Курсор следующей страницы относится к основному списку и не меняется от expand
+    if "x-next-cursor" in primary.headers:
+        extra_headers["X-Next-Cursor"] = primary.headers["x-next-cursor"]
+    response_headers = with_etag(200, extra_headers, content)
+    logger.info({"event": "compose_completed", "target_service": route.service,
+                 "expand": list(requested), "items": len(items), "failed": failed})
+    return _not_modified(request, response_headers, "upstream") or \
+        Response(content=content, status_code=200, headers=response_headers, media_type="application/json")
+
+
+def _payload_too_large(target_service: str) -> Response:
+    logger.warning({"event": "proxy_body_too_large", "target_service": target_service,
+                    "limit_bytes": PROXY_MAX_BODY_BYTES})
+    return Response(
+        content='{"detail": "Request body too large"}',
+        status_code=413,
+        media_type="application/json"
+    )
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Production-запуск сервиса: несколько процессов uvicorn, uvloop и httptools.
+
+    python -m app.serve
+
+Каждый процесс-воркер заново импортирует app.main (uvicorn запускает
+воркеры через spawn), поэтому всё состояние процесса - движок БД,
+RPC-клиенты, пулы соединений шлюза, фоновые задачи - создаётся в самом
+воркере при импорте и в lifespan.
+
+Настройки:
+    WEB_CONCURRENCY    число процессов; 0 - по числу ядер (по умолчанию 1)
+    SERVER_HOST        адрес (0.0.0.0)
+    SERVER_PORT        порт (8000)
+    SERVER_LOOP        event loop: auto - uvloop, если установлен, иначе asyncio
+    SERVER_HTTP        парсер HTTP: auto - httptools, если установлен, иначе h11
+    SERVER_ACCESS_LOG  true - access-лог uvicorn (запросы и так логирует middleware сервиса)
+"""
+import os
+
+import uvicorn
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+
+
+def worker_count(configured: int = WEB_CONCURRENCY) -> int:
+    return configured if configured > 0 else os.cpu_count() or 1
+
+
+def main():
+    uvicorn.run("app.main:app", host=SERVER_HOST, port=SERVER_PORT, workers=worker_count(),
+                loop=SERVER_LOOP, http=SERVER_HTTP, access_log=SERVER_ACCESS_LOG)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Бенчмарк POST /batch: время загрузки "экрана" из N GET-запросов.
+
+Сравниваются:
+    unbatched - N отдельных запросов, клиент держит не больше --client-connections
+                одновременно (как браузер или мобильный HTTP/1.1-клиент)
+    batched   - один POST /batch с теми же N подзапросами
+
+Шлюз вызывается напрямую как ASGI-приложение, upstream подменяется
+httpx.MockTransport с задержкой --upstream-ms. Сеть между клиентом и
+шлюзом моделируется задержкой --rtt-ms на каждый HTTP-обмен.
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_batch --items 20 --rtt-ms 40 --upstream-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.loadgen import StreamingMockTransport
+
+os.environ.setdefault("POSTS_SERVICE_URL", "http://posts_service:8000")
+# Каждый подзапрос должен дойти до upstream
+os.environ.setdefault("CACHE_TTLS", "")
+os.environ.setdefault("COALESCE_ENABLED", "false")
+os.environ.setdefault("LOG_ENABLED", "false")
+# Лимит не должен срабатывать ни в одном из режимов
+os.environ.setdefault("RATE_LIMIT_TIMES", str(10**9))
+
+
+async def _unbatched(client: httpx.AsyncClient, paths: list[str], connections: int, rtt_s: float):
+    semaphore = asyncio.Semaphore(connections)
+
+    async def one(path: str):
+        async with semaphore:
+            await asyncio.sleep(rtt_s)
+            response = await client.get(path)
+            assert response.status_code == 200, response.status_code
+
+    await asyncio.gather(*[one(path) for path in paths])
+
+
+async def _batched(client: httpx.AsyncClient, paths: list[str], rtt_s: float):
+    await asyncio.sleep(rtt_s)
+    response = await client.post("/batch", json={"requests": [{"path": path} for path in paths]})
+    assert response.status_code == 200, response.status_code
+    assert all(item["status"] == 200 for item in response.json()["responses"])
+
+
+async def _run(args) -> dict:
+    import fakeredis
+    from app.main import app, close_gateway_state, init_gateway_state
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(args.upstream_ms / 1000)
+        return httpx.Response(200, json={"id": 1, "title": "post", "content": "x" * 200, "category_id": 1})
+
+    await init_gateway_state(app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                             transport=StreamingMockTransport(handler))
+
+    paths = [f"/posts/{i}" for i in range(args.items)]
+    rtt_s = args.rtt_ms / 1000
+    result = {"items": args.items, "rtt_ms": args.rtt_ms, "upstream_ms": args.upstream_ms,
+              "client_connections": args.client_connections}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+        for name, screen in (("unbatched", lambda: _unbatched(client, paths, args.client_connections, rtt_s)),
+                             ("batched", lambda: _batched(client, paths, rtt_s))):
+            await screen()  # прогрев
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await screen()
+                timings.append((time.perf_counter() - started) * 1000)
+            result[f"{name}_ms_median"] = round(statistics.median(timings), 1)
+    await close_gateway_state(app)
+    result["speedup"] = round(result["unbatched_ms_median"] / result["batched_ms_median"], 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20, help="запросов на экран")
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="задержка сети клиент-шлюз на обмен")
+    parser.add_argument("--upstream-ms", type=float, default=5.0, help="время ответа upstream")
+    parser.add_argument("--client-connections", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_run(args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Нагрузочный тест адаптивного лимита: goodput шлюза до и после насыщения upstream.
+
+Upstream моделируется как сервис с --workers обработчиками и временем
+обработки --service-ms (ёмкость workers / service_ms запросов в секунду);
+всё сверх этого ждёт в его очереди. Клиенты приходят с фиксированной
+частотой (открытая модель нагрузки), поэтому медленные ответы не снижают
+поток новых запросов.
+
+goodput - успешные ответы, уложившиеся в --slo-ms, в секунду. Без лимита
+после насыщения очередь в upstream и в пуле httpx растёт, задержка всех
+запросов уходит за SLO, и goodput падает. С лимитом лишние запросы сразу
+получают 503, а принятые обслуживаются быстро.
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_concurrency --rates 40,80,120,160,240 --duration 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.loadgen import StreamingMockTransport
+
+os.environ.setdefault("POSTS_SERVICE_URL", "http://posts_service:8000")
+os.environ.setdefault("CACHE_TTLS", "")
+os.environ.setdefault("COALESCE_ENABLED", "false")
+os.environ.setdefault("LOG_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_TIMES", str(10**9))
+# Повторы и дубли здесь только исказили бы нагрузку на upstream
+os.environ.setdefault("HEDGE_PERCENTILE", "0")
+os.environ.setdefault("RETRY_MAX_RETRIES", "0")
+
+
+async def _run_rate(client: httpx.AsyncClient, rate: float, duration: float, slo_s: float,
+                    client_timeout_s: float) -> dict:
+    latencies, statuses = [], []
+
+    async def one(i: int):
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"/posts/{i}", timeout=client_timeout_s)
+            status = response.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        statuses.append(status)
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+
+    good = sum(1 for latency in latencies if latency <= slo_s)
+    return {
+        "offered_rps": rate,
+        "goodput_rps": round(good / duration),
+        "ok": len(latencies),
+        "shed_503": statuses.count(503),
+        "errors": sum(1 for status in statuses if status not in (200, 503)),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p99_ms": round(sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else None,
+    }
+
+
+async def _run(args) -> list[dict]:
+    import fakeredis
+    from app.main import app, close_gateway_state, init_gateway_state
+
+    upstream = asyncio.Semaphore(args.workers)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        async with upstream:
+            await asyncio.sleep(args.service_ms / 1000)
+        return httpx.Response(200, json={"id": 1, "title": "post"})
+
+    results = []
+    for mode in ("off", "adaptive"):
+        await init_gateway_state(app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                                 transport=StreamingMockTransport(handler))
+        if mode == "off":
+            app.state.limiters = {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+            for rate in args.rates:
+                result = await _run_rate(client, rate, args.duration, args.slo_ms / 1000, args.client_timeout_s)
+                if mode == "adaptive":
+                    result["limit"] = app.state.limiters["posts"].snapshot()["limit"]
+                results.append({"mode": mode, **result})
+                print(json.dumps(results[-1]), flush=True)
+                # Очередь прошлого шага не должна влиять на следующий
+                await asyncio.sleep(args.client_timeout_s)
+        await close_gateway_state(app)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=lambda raw: [float(r) for r in raw.split(",")],
+                        default=[40, 80, 120, 160, 240], help="частоты запросов в секунду через запятую")
+    parser.add_argument("--duration", type=float, default=3.0, help="длительность каждой ступени, секунды")
+    parser.add_argument("--workers", type=int, default=4, help="обработчиков в upstream")
+    parser.add_argument("--service-ms", type=float, default=50.0, help="время обработки запроса upstream")
+    parser.add_argument("--slo-ms", type=float, default=250.0)
+    parser.add_argument("--client-timeout-s", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
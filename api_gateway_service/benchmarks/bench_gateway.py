@@ -0,0 +1,197 @@
+"""Набор нагрузочных сценариев шлюза: пропускная способность и p50/p95/p99.
+
+Каждый сценарий поднимает настоящее приложение шлюза (app.main) с fakeredis
+вместо Redis и upstream-заглушками в том же процессе (httpx.MockTransport)
+с заданной задержкой и размером ответа. Нагрузка - фиксированная частота
+запросов (benchmarks/loadgen.py), задержка считается от запланированного
+момента отправки. Генератор нагрузки работает в том же процессе и event
+loop, что и шлюз, поэтому частоты по умолчанию заметно ниже предела одного
+процесса: отчёт показывает задержку в установившемся режиме, а не при
+перегрузке.
+
+Отчёт - JSON с одним объектом на сценарий, его удобно сохранять для
+каждого коммита и сравнивать:
+
+    python -m benchmarks.bench_gateway --output before.json
+    python -m benchmarks.bench_gateway --output after.json --compare before.json
+
+Запуск из каталога api_gateway_service. --scenarios выбирает сценарии,
+--rate-scale умножает их частоты, --latency-ms и --payload-bytes
+переопределяют параметры заглушек во всех сценариях.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+
+import httpx
+
+os.environ.setdefault("POSTS_SERVICE_URL", "http://posts_service:8000")
+os.environ.setdefault("CATEGORIES_SERVICE_URL", "http://categories_service:8000")
+os.environ.setdefault("LOG_ENABLED", "false")
+
+from benchmarks.loadgen import StreamingMockTransport, asgi_request, run_fixed_rate  # noqa: E402
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+    rate: float  # запросов в секунду
+    method: str = "GET"
+    body: bytes = b""
+    latency_ms: float = 5.0  # задержка ответа upstream-заглушки
+    payload_bytes: int = 1024  # размер тела ответа заглушки
+    cache_ttl: int = 0  # TTL кэша шлюза для маршрутов сценария
+    coalesce: bool = False
+
+
+SCENARIOS = [
+    Scenario("health", "/health", rate=500, latency_ms=0),
+    Scenario("proxy_get_small", "/posts/1", rate=300),
+    Scenario("proxy_get_large", "/posts/", rate=100, payload_bytes=256 * 1024),
+    Scenario("proxy_post", "/posts/", rate=200, method="POST",
+             body=b'{"title": "post", "content": "text", "category_id": 1}'),
+    # Кэш заполняется на пути объединения запросов (буферизованный ответ). Чтение из
+    # fakeredis стоит около 1 мс процессора, поэтому частота ниже, чем у health
+    Scenario("cache_hit", "/categories/", rate=300, cache_ttl=60, coalesce=True),
+    Scenario("coalesced_get", "/categories/", rate=300, latency_ms=20, coalesce=True),
+    Scenario("expand", "/posts/?expand=category", rate=100, payload_bytes=8 * 1024),
+]
+
+
+def _stub_body(path: str, params: httpx.QueryParams, payload_bytes: int) -> bytes:
+    """Тело ответа заглушки примерно заданного размера; для ?ids= - по объекту на id."""
+    if "ids" in params:
+        return json.dumps([{"id": int(i), "name": f"category {i}"} for i in params.get_list("ids")]).encode()
+    item = {"id": 1, "title": "post", "content": "", "category_id": 1}
+    if path.rstrip("/").count("/") >= 2:
+        # /posts/1 - один объект
+        item["content"] = "x" * max(0, payload_bytes - len(json.dumps(item)))
+        return json.dumps(item).encode()
+    size = len(json.dumps(item)) + 2
+    items = [{**item, "id": i, "category_id": i % 10 + 1} for i in range(max(1, payload_bytes // size))]
+    return json.dumps(items).encode()
+
+
+async def _run_scenario(scenario: Scenario, duration_s: float) -> dict:
+    import fakeredis
+    from app import main
+    from app.core.routing import load_route_table
+
+    bodies: dict[tuple, bytes] = {}
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        if scenario.latency_ms:
+            await asyncio.sleep(scenario.latency_ms / 1000)
+        if request.method != "GET":
+            return httpx.Response(201, json={"id": 1})
+        key = (request.url.path, str(request.url.query))
+        body = bodies.get(key)
+        if body is None:
+            body = bodies[key] = _stub_body(request.url.path, request.url.params, scenario.payload_bytes)
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+    # Лимит запросов остаётся в работе, но не должен отвечать 429
+    route_config = {"cache_ttl": scenario.cache_ttl, "rate_limit": {"limit": 10 ** 9, "window_s": 1}}
+    original = main.route_table, main.COALESCE_ENABLED
+    main.route_table = load_route_table(None, [
+        {"prefix": "posts", "service": "posts_service", "upstreams": "http://posts_service:8000", **route_config},
+        {"prefix": "categories", "service": "categories_service", "upstreams": "http://categories_service:8000",
+         **route_config},
+    ])
+    main.COALESCE_ENABLED = scenario.coalesce
+    await main.init_gateway_state(main.app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                                  transport=StreamingMockTransport(upstream))
+    headers = ((b"content-type", b"application/json"),) if scenario.body else ()
+    try:
+        async def request(i: int) -> int:
+            return await asgi_request(main.app, scenario.method, scenario.path, scenario.body, headers)
+
+        # Прогрев: первые соединения, заполнение кэша и трекеров задержки
+        await run_fixed_rate(request, min(scenario.rate, 200), 0.2)
+        result = await run_fixed_rate(request, scenario.rate, duration_s)
+    finally:
+        await main.close_gateway_state(main.app)
+        main.route_table, main.COALESCE_ENABLED = original
+    summary = result.summary()
+    return {"scenario": scenario.name, **{key: value for key, value in asdict(scenario).items()
+                                          if key not in ("name", "body")}, **summary}
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _compare(report: dict, baseline: dict) -> list[dict]:
+    """Изменение пропускной способности и перцентилей относительно прошлого отчёта, в процентах."""
+    before = {result["scenario"]: result for result in baseline["scenarios"]}
+    changes = []
+    for result in report["scenarios"]:
+        old = before.get(result["scenario"])
+        if old is None:
+            continue
+        change = {"scenario": result["scenario"]}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old.get(key) and result.get(key) is not None:
+                change[f"{key}_change_pct"] = round((result[key] - old[key]) / old[key] * 100, 1)
+        changes.append(change)
+    return changes
+
+
+async def _run(args) -> dict:
+    selected = [scenario for scenario in SCENARIOS if not args.scenarios or scenario.name in args.scenarios]
+    report = {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(),
+                 "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "duration_s": args.duration,
+                 "rate_scale": args.rate_scale},
+        "scenarios": [],
+    }
+    for scenario in selected:
+        overrides = {"rate": scenario.rate * args.rate_scale}
+        if args.latency_ms is not None:
+            overrides["latency_ms"] = args.latency_ms
+        if args.payload_bytes is not None:
+            overrides["payload_bytes"] = args.payload_bytes
+        result = await _run_scenario(replace(scenario, **overrides), args.duration)
+        report["scenarios"].append(result)
+        print(json.dumps(result), file=sys.stderr, flush=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda raw: raw.split(","),
+                        help=f"сценарии через запятую: {','.join(s.name for s in SCENARIOS)}")
+    parser.add_argument("--duration", type=float, default=5.0, help="длительность сценария, секунды")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="множитель частот сценариев")
+    parser.add_argument("--latency-ms", type=float, help="задержка upstream-заглушек во всех сценариях")
+    parser.add_argument("--payload-bytes", type=int, help="размер ответа заглушек во всех сценариях")
+    parser.add_argument("--output", help="файл отчёта (по умолчанию stdout)")
+    parser.add_argument("--compare", help="прошлый отчёт: добавить изменения в процентах")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = {"baseline_commit": (baseline := json.load(f))["meta"].get("commit"),
+                                 "scenarios": _compare(report, baseline)}
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Бенчмарк стоимости логирования: запросы в секунду шлюза с разными режимами логов.
+
+Режимы:
+    off      - логи выключены (LOG_ENABLED=false)
+    sync     - прежнее поведение: loguru сериализует и пишет в stdout в месте вызова
+    async    - запись в очередь, JSON и stdout в потоке-писателе
+    sampled  - async и выборка 10% для событий, которые пишутся на каждый запрос
+
+Шлюз вызывается напрямую как ASGI-приложение, upstream подменяется
+httpx.MockTransport. Логи каждого режима пишутся в настоящий файл, чтобы
+учитывалась стоимость системных вызовов. Измеряются /health (две строки
+лога на запрос) и проксируемый /posts/ (четыре строки).
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_logging --concurrency 20 --duration 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_streaming import _one_request
+from benchmarks.loadgen import StreamingMockTransport
+
+MODES = {
+    "off": {"LOG_ENABLED": "false"},
+    "sync": {"LOG_ASYNC": "false"},
+    "async": {"LOG_ASYNC": "true"},
+    "sampled": {"LOG_ASYNC": "true",
+                "LOG_SAMPLING": "gateway_request_received=0.1,gateway_request_completed=0.1,"
+                                "proxy_forwarding=0.1,proxy_response_received=0.1"},
+}
+
+
+async def _measure(app, path: str, concurrency: int, duration: float) -> float:
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await _one_request(app, path)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return done / (time.perf_counter() - started)
+
+
+async def _run_mode(args) -> dict:
+    import fakeredis
+    from app.core.logging import writer
+    from app.main import app, close_gateway_state, init_gateway_state, rate_limiter
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[{"id": 1, "title": "post"}])
+
+    app.dependency_overrides[rate_limiter] = lambda: None
+    await init_gateway_state(app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                             transport=StreamingMockTransport(handler))
+    # Прогрев: импорты, первые соединения
+    await _measure(app, "/health", args.concurrency, 0.2)
+
+    result = {"mode": args.mode}
+    for name, path in (("health", "/health"), ("proxy", "/posts/")):
+        result[f"{name}_rps"] = round(await _measure(app, path, args.concurrency, args.duration))
+    await close_gateway_state(app)
+    writer.close()
+    result["log_dropped"] = writer.dropped
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=3.0, help="длительность замера, секунды")
+    parser.add_argument("--mode", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # stdout занят логами, результат отдаётся через stderr
+        print(json.dumps(asyncio.run(_run_mode(args))), file=sys.stderr)
+        return
+
+    for mode, mode_env in MODES.items():
+        env = dict(os.environ, POSTS_SERVICE_URL="http://posts_service:8000",
+                   # Каждый запрос должен дойти до upstream
+                   CACHE_TTLS="", COALESCE_ENABLED="false", **mode_env)
+        with tempfile.TemporaryFile() as log_file:
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_logging", "--mode", mode,
+                                  "--concurrency", str(args.concurrency), "--duration", str(args.duration)],
+                                 env=env, stdout=log_file, stderr=subprocess.PIPE, text=True, check=True)
+            result = json.loads(out.stderr.strip().splitlines()[-1])
+            result["log_mb"] = round(log_file.seek(0, os.SEEK_END) / 1024 / 1024, 1)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
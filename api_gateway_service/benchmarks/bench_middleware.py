@@ -0,0 +1,110 @@
+"""Бенчмарк middleware логирования: BaseHTTPMiddleware против чистого ASGI.
+
+Режимы:
+    base_http  - прежнее @app.middleware("http") (BaseHTTPMiddleware) с той же логикой
+    asgi       - RequestLoggingMiddleware из app/core/middleware.py
+
+Шлюз вызывается напрямую как ASGI-приложение, upstream подменяется
+httpx.MockTransport. Логи выключены, чтобы сравнивалась стоимость самого
+middleware, а не записи строк. Измеряются /health и проксируемый /posts/.
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_middleware --concurrency 20 --duration 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+os.environ.setdefault("POSTS_SERVICE_URL", "http://posts_service:8000")
+os.environ.setdefault("LOG_ENABLED", "false")
+# Каждый запрос должен дойти до upstream
+os.environ.setdefault("CACHE_TTLS", "")
+os.environ.setdefault("COALESCE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_TIMES", str(10**9))
+# Фоновая синхронизация лимита с Redis не должна попадать в замер
+os.environ.setdefault("RATE_LIMIT_SYNC_INTERVAL_S", "3600")
+
+from benchmarks.bench_logging import _measure  # noqa: E402
+from benchmarks.loadgen import StreamingMockTransport  # noqa: E402
+
+
+def _base_http_middleware(main):
+    """Middleware в прежнем виде: та же логика поверх BaseHTTPMiddleware."""
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from app.core import metrics
+
+    async def log_gateway_requests(request, call_next):
+        start_time = time.time()
+        main.logger.info({"event": "gateway_request_received", "method": request.method,
+                          "path": str(request.url.path),
+                          "client_ip": request.client.host if request.client else None})
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = await call_next(request)
+        finally:
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+        duration_ms = (time.time() - start_time) * 1000
+        metrics.HTTP_REQUEST_DURATION.labels(request.method, main._metrics_route(request.scope),
+                                             response.status_code).observe(duration_ms / 1000)
+        main.logger.info({"event": "gateway_request_completed", "method": request.method,
+                          "path": str(request.url.path), "status_code": response.status_code,
+                          "duration_ms": round(duration_ms, 2)})
+        headers = main._rate_limit_headers(request.scope)
+        if headers:
+            response.headers.update(headers)
+        return response
+
+    return Middleware(BaseHTTPMiddleware, dispatch=log_gateway_requests)
+
+
+async def _run(args) -> list[dict]:
+    import fakeredis
+    from app import main
+    from app.core.middleware import RequestLoggingMiddleware
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[{"id": 1, "title": "post"}])
+
+    app = main.app
+    original = list(app.user_middleware)
+    index = next(i for i, middleware in enumerate(original) if middleware.cls is RequestLoggingMiddleware)
+
+    results = []
+    for mode in ("base_http", "asgi"):
+        middleware = list(original)
+        if mode == "base_http":
+            middleware[index] = _base_http_middleware(main)
+        app.user_middleware = middleware
+        app.middleware_stack = None  # стек пересобирается при следующем запросе
+
+        await main.init_gateway_state(app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                                      transport=StreamingMockTransport(handler))
+        # Прогрев: импорты, сборка стека middleware
+        await _measure(app, "/health", args.concurrency, 0.2)
+        result = {"mode": mode}
+        for name, path in (("health", "/health"), ("proxy", "/posts/")):
+            result[f"{name}_rps"] = round(await _measure(app, path, args.concurrency, args.duration))
+        await main.close_gateway_state(app)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+    app.user_middleware = original
+    app.middleware_stack = None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=3.0, help="длительность замера, секунды")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Микробенчмарк стоимости маршрутизации в зависимости от числа маршрутов.
+
+Сравнивает префиксное дерево RouteTable с линейным перебором префиксов
+через startswith, как это делалось цепочкой if/elif.
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_routing
+"""
+import argparse
+import random
+import timeit
+
+from app.core.routing import Route, RouteTable, Upstream
+
+
+def _make_routes(count: int, rng: random.Random) -> list[Route]:
+    prefixes = set()
+    while len(prefixes) < count:
+        depth = rng.randint(1, 3)
+        prefixes.add("/".join(f"s{rng.randrange(count * 4)}" for _ in range(depth)))
+    return [Route(prefix=prefix, service=f"svc{i}", instances=[Upstream(url=f"http://svc{i}:8000")])
+            for i, prefix in enumerate(sorted(prefixes))]
+
+
+def _linear_match(routes: list[Route], path: str) -> Route | None:
+    matched = None
+    for route in routes:
+        if (path == route.prefix or path.startswith(route.prefix + "/")) \
+                and (matched is None or len(route.prefix) > len(matched.prefix)):
+            matched = route
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'routes':>8} {'trie, ns/lookup':>16} {'linear, ns/lookup':>18}")
+    for count in (2, 10, 100, 1000, 10000):
+        routes = _make_routes(count, rng)
+        table = RouteTable(routes)
+        paths = [f"{rng.choice(routes).prefix}/123/comments" for _ in range(1000)]
+        for path in paths:
+            assert table.match(path) is _linear_match(routes, path)
+
+        trie_s = timeit.timeit(lambda: [table.match(p) for p in paths], number=max(1, args.lookups // 1000))
+        linear_number = max(1, args.lookups // 1000 // max(1, count // 100))
+        linear_s = timeit.timeit(lambda: [_linear_match(routes, p) for p in paths], number=linear_number)
+        trie_ns = trie_s / (len(paths) * max(1, args.lookups // 1000)) * 1e9
+        linear_ns = linear_s / (len(paths) * linear_number) * 1e9
+        print(f"{count:>8} {trie_ns:>16.0f} {linear_ns:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
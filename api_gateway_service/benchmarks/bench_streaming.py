@@ -0,0 +1,153 @@
+"""Бенчмарк потокового проксирования: RSS шлюза и time-to-first-byte.
+
+Шлюз вызывается напрямую как ASGI-приложение, upstream подменяется
+httpx.MockTransport, который отдаёт большой ответ кусками с задержкой.
+Каждый режим запускается в отдельном процессе, чтобы пиковый RSS
+одного режима не влиял на другой.
+
+Запуск из каталога api_gateway_service:
+
+    python -m benchmarks.bench_streaming --concurrency 50 --size-mb 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в Linux измеряется в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _upstream_handler(size: int, chunk: int, delay: float):
+    async def body():
+        sent = 0
+        while sent < size:
+            part = min(chunk, size - sent)
+            await asyncio.sleep(delay)
+            sent += part
+            yield b"x" * part
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "application/json",
+                                            "content-length": str(size)},
+                              stream=_AsyncStream(body()))
+    return handler
+
+
+class _AsyncStream(httpx.AsyncByteStream):
+    def __init__(self, iterator):
+        self._iterator = iterator
+
+    async def __aiter__(self):
+        async for chunk in self._iterator:
+            yield chunk
+
+    async def aclose(self):
+        await self._iterator.aclose()
+
+
+async def _one_request(app, path: str) -> tuple[float, int]:
+    """Выполняет запрос к ASGI-приложению, возвращает TTFB и число байт."""
+    start = time.perf_counter()
+    ttfb = None
+    received = 0
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"gateway")],
+        "client": ("127.0.0.1", 12345), "server": ("gateway", 80),
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Как настоящий сервер: disconnect приходит только после конца ответа
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal ttfb, received
+        if message["type"] == "http.response.body" and message.get("body"):
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            # Тело не сохраняется: клиент читает и сразу выбрасывает байты
+            received += len(message["body"])
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            response_done.set()
+
+    await app(scope, receive, send)
+    return ttfb or (time.perf_counter() - start), received
+
+
+async def _run_mode(args) -> dict:
+    from loguru import logger
+    logger.remove()
+
+    import fakeredis
+    from app.main import app, close_gateway_state, init_gateway_state, rate_limiter
+
+    app.dependency_overrides[rate_limiter] = lambda: None
+    handler = _upstream_handler(args.size_mb * 1024 * 1024, 64 * 1024, args.chunk_delay)
+    await init_gateway_state(app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                             transport=httpx.MockTransport(handler))
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    results = await asyncio.gather(*[_one_request(app, "/posts/") for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - started
+    await close_gateway_state(app)
+
+    ttfbs = sorted(r[0] * 1000 for r in results)
+    return {
+        "mode": "streaming" if os.environ["PROXY_STREAMING"] == "true" else "buffered",
+        "concurrency": args.concurrency,
+        "size_mb": args.size_mb,
+        "ttfb_p50_ms": round(statistics.median(ttfbs), 2),
+        "ttfb_p99_ms": round(ttfbs[min(len(ttfbs) - 1, int(len(ttfbs) * 0.99))], 2),
+        "total_s": round(elapsed, 2),
+        "bytes": sum(r[1] for r in results),
+        "rss_growth_mb": round(_peak_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--chunk-delay", type=float, default=0.001,
+                        help="задержка upstream между кусками по 64 КБ, секунды")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_run_mode(args))))
+        return
+
+    for mode in ("buffered", "streaming"):
+        env = dict(os.environ, PROXY_STREAMING="true" if mode == "streaming" else "false",
+                   POSTS_SERVICE_URL="http://posts_service:8000",
+                   # Сравнивается только передача тела: кэш и объединение запросов выключены
+                   CACHE_TTLS="", COALESCE_ENABLED="false")
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_streaming", "--child",
+                              "--concurrency", str(args.concurrency), "--size-mb", str(args.size_mb),
+                              "--chunk-delay", str(args.chunk_delay)],
+                             env=env, capture_output=True, text=True, check=True)
+        print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Масштабирование шлюза по числу процессов-воркеров.
+
+Для каждого значения --workers запускает настоящий сервер
+(python -m app.serve, WEB_CONCURRENCY=N) на свободном порту и нагружает
+/health по сети из нескольких процессов-клиентов с замкнутым циклом
+(каждый клиент держит --connections запросов в работе). Отчёт - JSON с
+пропускной способностью и p50/p99 для каждого числа воркеров.
+
+    python -m benchmarks.bench_workers --workers 1,2,4 --loop uvloop --http httptools
+
+Клиенты работают на той же машине, что и сервер, и делят с ним ядра:
+прирост от воркеров заметен, только если ядер больше, чем воркеров плюс
+клиентов. Запуск из каталога api_gateway_service.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.loadgen import percentile
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, port: int, loop: str, http: str) -> subprocess.Popen:
+    env = {
+        **os.environ, "WEB_CONCURRENCY": str(workers), "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port),
+        "SERVER_LOOP": loop, "SERVER_HTTP": http, "LOG_ENABLED": "false",
+        "POSTS_SERVICE_URL": "http://posts_service:8000", "CATEGORIES_SERVICE_URL": "http://categories_service:8000",
+    }
+    return subprocess.Popen([sys.executable, "-m", "app.serve"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(url: str, timeout_s: float = 30.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not start: {url}")
+
+
+async def _client(url: str, connections: int, duration_s: float) -> tuple[int, int, list[float]]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration_s
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(limits=limits, timeout=5.0) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(connections)))
+    return len(latencies), errors, latencies
+
+
+def _client_process(args: tuple[str, int, float]) -> tuple[int, int, list[float]]:
+    return asyncio.run(_client(*args))
+
+
+def _measure(workers: int, args) -> dict:
+    port = _free_port()
+    server = _start_server(workers, port, args.loop, args.http)
+    url = f"http://127.0.0.1:{port}/health"
+    try:
+        _wait_ready(url)
+        # Прогрев: соединения и первые запросы каждого воркера
+        _client_process((url, args.connections, 1.0))
+        started = time.perf_counter()
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.map(_client_process, [(url, args.connections, args.duration)] * args.clients)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    latencies = sorted(latency for _, _, chunk in results for latency in chunk)
+    return {
+        "workers": workers,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "ok": len(latencies),
+        "errors": sum(errors for _, errors, _ in results),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda raw: [int(n) for n in raw.split(",")], default=[1, 2, 4],
+                        help="числа воркеров через запятую")
+    parser.add_argument("--clients", type=int, default=2, help="процессов-клиентов")
+    parser.add_argument("--connections", type=int, default=32, help="одновременных запросов на клиента")
+    parser.add_argument("--duration", type=float, default=5.0, help="длительность замера, секунды")
+    parser.add_argument("--loop", default="auto", help="SERVER_LOOP: auto, asyncio, uvloop")
+    parser.add_argument("--http", default="auto", help="SERVER_HTTP: auto, h11, httptools")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {"python": platform.python_version(), "cpu_count": os.cpu_count(), "loop": args.loop,
+                 "http": args.http, "clients": args.clients, "connections": args.connections,
+                 "duration_s": args.duration},
+        "results": [],
+    }
+    for workers in args.workers:
+        result = _measure(workers, args)
+        report["results"].append(result)
+        print(json.dumps(result), file=sys.stderr, flush=True)
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
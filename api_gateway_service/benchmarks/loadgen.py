@@ -0,0 +1,135 @@
+"""Генератор нагрузки с фиксированной частотой прихода запросов.
+
+Нагрузка открытая: запрос i отправляется в момент start + i / rate,
+независимо от того, ответили ли на предыдущие. Задержка считается от
+запланированного момента отправки, поэтому отставание самого генератора
+(или event loop шлюза) попадает в задержку, а не скрывается
+(coordinated omission).
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+
+# Результат запроса: код ответа или имя ошибки ("timeout")
+Status = int | str
+
+
+class StreamingMockTransport(httpx.MockTransport):
+    """MockTransport, ответы которого отдают тело потоком, как настоящий upstream.
+
+    httpx.Response(json=...) читает тело сразу при создании, а шлюз читает
+    сырые байты из потока ответа; ответ пересобирается вокруг того же потока.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        if not response.is_stream_consumed:
+            return response
+        return httpx.Response(response.status_code, headers=response.headers, stream=response.stream,
+                              request=request)
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"",
+                       headers: tuple[tuple[bytes, bytes], ...] = ()) -> int:
+    """Выполняет запрос к ASGI-приложению без сети, тело ответа читается и выбрасывается."""
+    path, _, query = path.partition("?")
+    if body:
+        headers = ((b"content-length", str(len(body)).encode()), *headers)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"gateway"), *headers],
+        "client": ("127.0.0.1", 12345), "server": ("gateway", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Как настоящий сервер: disconnect приходит только после конца ответа
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(scope, receive, send)
+    response_done.set()
+    return status
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(q * len(sorted_values) + 0.5) - 1))]
+
+
+@dataclass
+class LoadResult:
+    rate: float
+    duration_s: float
+    elapsed_s: float = 0.0
+    latencies_s: list[float] = field(default_factory=list)  # только успешные (2xx/3xx) ответы
+    statuses: list[Status] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies_s)
+        counts: dict[str, int] = {}
+        for status in self.statuses:
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+        def ms(value: float | None) -> float | None:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "offered_rps": self.rate,
+            "throughput_rps": round(len(latencies) / self.elapsed_s, 1) if self.elapsed_s else 0.0,
+            "requests": len(self.statuses),
+            "ok": len(latencies),
+            "errors": len(self.statuses) - len(latencies),
+            "statuses": dict(sorted(counts.items())),
+            "p50_ms": ms(percentile(latencies, 0.50)),
+            "p95_ms": ms(percentile(latencies, 0.95)),
+            "p99_ms": ms(percentile(latencies, 0.99)),
+            "max_ms": ms(latencies[-1] if latencies else None),
+        }
+
+
+async def run_fixed_rate(request: Callable[[int], Awaitable[Status]], rate: float, duration_s: float,
+                         timeout_s: float = 5.0) -> LoadResult:
+    """Отправляет rate * duration_s запросов request(i) с фиксированной частотой."""
+    result = LoadResult(rate=rate, duration_s=duration_s)
+
+    async def one(i: int, scheduled: float):
+        try:
+            status = await asyncio.wait_for(request(i), timeout_s)
+        except asyncio.TimeoutError:
+            status = "timeout"
+        result.statuses.append(status)
+        if isinstance(status, int) and 200 <= status < 400:
+            result.latencies_s.append(time.perf_counter() - scheduled)
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(int(rate * duration_s)):
+        scheduled = started + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    result.elapsed_s = time.perf_counter() - started
+    return result
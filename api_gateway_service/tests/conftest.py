@@ -1,80 +1,66 @@
 import os
-import pytest
-import pytest_asyncio
+
+import fakeredis
 import httpx
+import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
-from fastapi import FastAPI, Request, Response
 
-test_app = FastAPI(title="API Gateway Test")
+from app.core.routing import RouteDefaults, load_route_table
 
 POSTS_SERVICE_URL = os.getenv("POSTS_SERVICE_URL", "http://posts_service:8000")
 CATEGORIES_SERVICE_URL = os.getenv("CATEGORIES_SERVICE_URL", "http://categories_service:8000")
 
 
-@test_app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "api_gateway"}
+class StreamingMockTransport(httpx.MockTransport):
+    """MockTransport, ответы которого отдают тело потоком, как настоящий upstream.
+
+    httpx.Response(json=...) читает тело сразу при создании, а шлюз читает
+    сырые байты из потока ответа; ответ пересобирается вокруг того же потока.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        if not response.is_stream_consumed:
+            return response
+        return httpx.Response(response.status_code, headers=response.headers, stream=response.stream,
+                              request=request)
+
+
+@pytest_asyncio.fixture()
+async def make_gateway(monkeypatch):
+    """Фабрика HTTP клиентов к настоящему приложению шлюза.
 
+    routes - маршруты в формате GATEWAY_ROUTES, handler - обработчик
+    upstream-заглушек (без него запросы к upstream перехватывает respx).
+    Лимит запросов отключён, если не передан rate_limit=True. Состояние
+    шлюза закрывается после теста.
+    """
+    from app import main
 
-@test_app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"])
-async def proxy_request(request: Request, path: str):
-    target_url = None    
-    if path.startswith("posts"):
-        target_url = f"{POSTS_SERVICE_URL}/{path}"
-    elif path.startswith("categories"):
-        target_url = f"{CATEGORIES_SERVICE_URL}/{path}"
+    clients = []
 
-    if not target_url:
-        return Response(
-            content='{"detail": "Not Found"}',
-            status_code=404,
-            media_type="application/json"
-        )
+    async def make(routes: list[dict], handler=None, defaults: RouteDefaults = RouteDefaults(),
+                   rate_limit: bool = False, base_url: str = "http://gateway") -> AsyncClient:
+        monkeypatch.setattr(main, "route_table", load_route_table(None, routes, defaults))
+        if not rate_limit:
+            main.app.dependency_overrides[main.rate_limiter] = lambda: None
+        await main.init_gateway_state(main.app, fakeredis.FakeAsyncRedis(decode_responses=True),
+                                      transport=StreamingMockTransport(handler) if handler else None)
+        clients.append(AsyncClient(transport=ASGITransport(app=main.app), base_url=base_url))
+        return clients[-1]
 
-    body = await request.body()
-    headers = {
-        key: value for key, value in request.headers.items()
-        if key.lower() not in ['host', 'content-length']
-    }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                params=request.query_params,
-                content=body
-            )
-            
-            response_headers = {
-                k: v for k, v in response.headers.items()
-                if k.lower() not in ["location"]
-            }
-            
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response_headers)
-            )
-            
-        except httpx.RequestError as e:
-            return Response(
-                content=f'{{"detail": "Service unavailable: {str(e)}"}}',
-                status_code=503,
-                media_type="application/json"
-            )
-        except Exception as e:
-            return Response(
-                content='{"detail": "Internal gateway error"}',
-                status_code=500,
-                media_type="application/json"
-            )
+    yield make
+    for c in clients:
+        await c.aclose()
+    if clients:
+        await main.close_gateway_state(main.app)
+    main.app.dependency_overrides.clear()
 
 
 @pytest_asyncio.fixture()
-async def client():
-    """HTTP клиент"""
-    transport = ASGITransport(app=test_app)
-    async with AsyncClient(transport=transport, base_url="http://testserver") as c:
-        yield c
\ No newline at end of file
+async def client(make_gateway):
+    """HTTP клиент к настоящему приложению шлюза; upstream подменяются в тестах через respx"""
+    return await make_gateway([
+        {"prefix": "posts", "service": "posts_service", "upstreams": POSTS_SERVICE_URL},
+        {"prefix": "categories", "service": "categories_service", "upstreams": CATEGORIES_SERVICE_URL},
+    ], base_url="http://testserver")
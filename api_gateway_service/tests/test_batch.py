@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.rate_limit import RateLimitTier
+
+
+@pytest_asyncio.fixture()
+async def gateway(monkeypatch, make_gateway):
+    from app import main
+
+    active = {"now": 0, "max": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "categories":
+            raise httpx.ConnectError("connection refused", request=request)
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        if request.method == "POST":
+            return httpx.Response(201, json={"id": 10, **json.loads(request.content)})
+        return httpx.Response(200, json={"path": request.url.path, "skip": request.url.params.get("skip"),
+                                         "api_key": request.headers.get("x-api-key")})
+
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 3)
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts"},
+        {"prefix": "categories", "upstreams": "http://categories"},
+    ], handler, main.RouteDefaults(cache_ttls={}, rate_limit=RateLimitTier(limit=10, window_s=60)), rate_limit=True)
+    return client, active
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_items_concurrently_and_keeps_order(gateway):
+    """Тест: подзапросы выполняются параллельно с ограничением, ответы идут в порядке запросов"""
+    client, active = gateway
+
+    response = await client.post("/batch", headers={"x-api-key": "mobile"}, json={"requests": [
+        {"id": str(i), "path": f"/posts/{i}?skip={i}"} for i in range(6)
+    ] + [{"id": "new", "method": "POST", "path": "/posts/", "body": {"title": "t"}}]})
+
+    assert response.status_code == 200
+    items = response.json()["responses"]
+    assert [item["id"] for item in items] == ["0", "1", "2", "3", "4", "5", "new"]
+    assert items[2]["status"] == 200
+    assert items[2]["body"] == {"path": "/posts/2", "skip": "2", "api_key": "mobile"}
+    assert items[-1]["status"] == 201 and items[-1]["body"]["title"] == "t"
+    assert 1 < active["max"] <= 3
+    # Лимит списан один раз весом в 7 подзапросов
+    assert response.headers["x-ratelimit-remaining"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_batch_isolates_item_failures(gateway):
+    """Тест: ошибка одного подзапроса не влияет на остальные"""
+    client, _ = gateway
+
+    response = await client.post("/batch", json={"requests": [
+        {"path": "/posts/1"}, {"path": "/categories/1"}, {"path": "/unknown"},
+    ]})
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["responses"]] == [200, 503, 404]
+
+
+@pytest.mark.asyncio
+async def test_batch_rate_limit_and_size(gateway, monkeypatch):
+    """Тест: пакет сверх лимита отклоняется целиком, слишком большой пакет - 422"""
+    from app import main
+    client, _ = gateway
+
+    denied = await client.post("/batch", json={"requests": [{"path": f"/posts/{i}"} for i in range(11)]})
+    assert denied.status_code == 429
+    assert "retry-after" in denied.headers
+
+    monkeypatch.setattr(main, "BATCH_MAX_ITEMS", 2)
+    too_many = await client.post("/batch", json={"requests": [{"path": "/posts/1"}] * 3})
+    assert too_many.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_item_with_invalid_header_fails_alone(gateway):
+    """Тест: заголовок подзапроса не в latin-1 даёт 400 только этому подзапросу"""
+    client, _ = gateway
+
+    response = await client.post("/batch", json={"requests": [
+        {"id": "bad", "path": "/posts/1", "headers": {"x-h": "€"}}, {"id": "ok", "path": "/posts/2"},
+    ]})
+
+    assert response.status_code == 200
+    bad, ok = response.json()["responses"]
+    assert bad["status"] == 400 and "latin-1" in bad["body"]["detail"]
+    assert ok["status"] == 200
+
+
+@pytest.mark.asyncio
+async def test_batch_denied_on_one_route_charges_none(gateway):
+    """Тест: отказ по лимиту одного маршрута не списывает лимит остальных маршрутов пакета"""
+    client, _ = gateway
+
+    denied = await client.post("/batch", json={"requests": [{"path": "/posts/1"}] * 5 +
+                                               [{"path": "/categories/1"}] * 11})
+    assert denied.status_code == 429
+
+    allowed = await client.post("/batch", json={"requests": [{"path": f"/posts/{i}"} for i in range(10)]})
+    assert allowed.status_code == 200
+    assert allowed.headers["x-ratelimit-remaining"] == "0"
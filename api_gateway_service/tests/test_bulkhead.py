@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.bulkhead import Bulkhead, BulkheadFull, BulkheadSettings
+from app.core.clients import ClientResolver
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_interleaves_clients_by_weight():
+    """Тест: при занятом отсеке места достаются клиентам по очереди с учётом веса, а не по приходу"""
+    bulkhead = Bulkhead("posts", BulkheadSettings(max_in_flight=1, queue_timeout_s=1.0, fair_queue=True,
+                                                  client_weights={"partner": 2}))
+    await bulkhead.acquire("noisy")
+    order = []
+
+    async def request(client: str):
+        await bulkhead.acquire(client)
+        order.append(client)
+
+    tasks = []
+    for client in ["noisy"] * 4 + ["partner"] * 2 + ["quiet"]:
+        tasks.append(asyncio.create_task(request(client)))
+        await asyncio.sleep(0)
+    for _ in tasks:
+        bulkhead.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+    # Метки: partner 0.5, 1.0; noisy 1, 2, 3, 4; quiet 1 - при равенстве раньше тот, кто пришёл первым
+    assert order == ["partner", "noisy", "partner", "quiet", "noisy", "noisy", "noisy"]
+    assert bulkhead.snapshot()["max_queued"] == 7
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_when_queue_is_full_or_wait_expires():
+    """Тест: сверх очереди отказ сразу, по истечении ожидания - отказ, очередь освобождается"""
+    bulkhead = Bulkhead("posts", BulkheadSettings(max_in_flight=1, queue_size=1, queue_timeout_s=0.02))
+    await bulkhead.acquire()
+    waiting = asyncio.create_task(bulkhead.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(BulkheadFull) as full:
+        await bulkhead.acquire()
+    assert full.value.reason == "queue_full"
+    with pytest.raises(BulkheadFull) as expired:
+        await waiting
+    assert expired.value.reason == "queue_timeout"
+
+    snapshot = bulkhead.snapshot()
+    assert (snapshot["in_flight"], snapshot["queued_now"]) == (1, 0)
+    assert (snapshot["rejected_queue_full"], snapshot["rejected_queue_timeout"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_slow_service_does_not_starve_other_routes(monkeypatch, make_gateway):
+    """Тест: зависший сервис занимает только свой отсек, запросы к другому сервису проходят"""
+    from app import main
+
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "categories":
+            await release.wait()
+        return httpx.Response(200, json={"host": request.url.host})
+
+    monkeypatch.setattr(main, "COALESCE_ENABLED", False)
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts"},
+        {"prefix": "categories", "upstreams": "http://categories",
+         "bulkhead": {"max_in_flight": 2, "queue_size": 0}, "concurrency": {"enabled": False}},
+    ], handler)
+
+    stuck = [asyncio.create_task(client.get(f"/categories/{i}")) for i in range(2)]
+    await asyncio.sleep(0.05)
+
+    shed = await client.get("/categories/3")
+    posts = await client.get("/posts/1")
+    stats = (await client.get("/stats")).json()["bulkheads"]
+    metrics_text = (await client.get("/metrics")).text
+
+    release.set()
+    assert [(await task).status_code for task in stuck] == [200, 200]
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert posts.status_code == 200
+    assert stats["categories"]["in_flight"] == 2
+    assert stats["categories"]["rejected_queue_full"] == 1
+    assert stats["posts"]["in_flight"] == 0
+    assert 'gateway_bulkhead_rejected_total{service="categories_service",reason="queue_full"} 1' in metrics_text
+    assert main.app.state.bulkheads["categories"].in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_client_is_not_self_asserted(monkeypatch, make_gateway):
+    """Тест: в очередь отсека попадает клиент по известному ключу или IP, присланный ключ веса не даёт"""
+    from app import main
+
+    seen = []
+    acquire = Bulkhead.acquire
+
+    async def spy(self, client=None):
+        seen.append(client)
+        await acquire(self, client)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(Bulkhead, "acquire", spy)
+    monkeypatch.setattr(main, "client_resolver", ClientResolver({"secret-1": "partner"}))
+    monkeypatch.setattr(main, "COALESCE_ENABLED", False)
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts",
+         "bulkhead": {"fair_queue": True, "client_weights": {"partner": 4}}},
+    ], handler)
+
+    for key in ("rotated-1", "rotated-2", "partner", "secret-1"):
+        await client.get("/posts/1", headers={"x-api-key": key})
+
+    assert seen == ["127.0.0.1", "127.0.0.1", "127.0.0.1", "partner"]
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_mid_stream_frees_bulkhead_and_instance(make_gateway):
+    """Тест: обрыв тела upstream посреди потока освобождает место в отсеке и экземпляр"""
+    from app import main
+
+    class BrokenBody(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'{"id": 1'
+            raise httpx.ReadError("connection reset")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(201, stream=BrokenBody())
+
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts", "bulkhead": {"max_in_flight": 2}},
+    ], handler, main.RouteDefaults(cache_ttls={}))
+
+    for _ in range(3):
+        with pytest.raises(httpx.ReadError):
+            await client.post("/posts/", json={"title": "t"})
+
+    assert main.app.state.bulkheads["posts"].in_flight == 0
+    assert [instance.in_flight for instance in main.route_table.match("posts/").instances] == [0]
@@ -0,0 +1,92 @@
+import fakeredis
+import httpx
+import pytest
+import pytest_asyncio
+from starlette.datastructures import Headers, QueryParams
+
+from app.core.cache import CachedResponse, ResponseCache, is_cache_bypassed, is_cacheable, parse_ttls
+
+
+@pytest.fixture()
+def cache():
+    return ResponseCache(fakeredis.FakeAsyncRedis(decode_responses=True), max_body_bytes=1024)
+
+
+def test_cache_key_ignores_query_order(cache):
+    """Тест: порядок query-параметров не влияет на ключ кэша"""
+    first = cache.build_key("posts", "posts/", QueryParams("skip=0&limit=10"))
+    second = cache.build_key("posts", "posts/", QueryParams("limit=10&skip=0"))
+
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_cache_roundtrip_and_stats(cache):
+    """Тест: сохранённый ответ отдаётся из кэша, счётчики обновляются"""
+    key = cache.build_key("categories", "categories/", QueryParams(""))
+    assert await cache.get(key) is None
+
+    await cache.set("categories", key, CachedResponse(200, {"content-type": "application/json"}, b"[]"), ttl=60)
+    cached = await cache.get(key)
+
+    assert cached.body == b"[]"
+    assert cached.headers["content-type"] == "application/json"
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_prefix_entries(cache):
+    """Тест: сброс префикса удаляет только его ответы"""
+    categories_key = cache.build_key("categories", "categories/", QueryParams(""))
+    posts_key = cache.build_key("posts", "posts/", QueryParams(""))
+    await cache.set("categories", categories_key, CachedResponse(200, {}, b"1"), ttl=60)
+    await cache.set("posts", posts_key, CachedResponse(200, {}, b"2"), ttl=60)
+
+    await cache.invalidate("categories")
+
+    assert await cache.get(categories_key) is None
+    assert (await cache.get(posts_key)).body == b"2"
+
+
+def test_cache_control_rules():
+    """Тест: Cache-Control запроса и ответа учитывается"""
+    assert is_cache_bypassed(Headers({"cache-control": "no-cache"}))
+    assert is_cache_bypassed(Headers({"cache-control": "max-age=0"}))
+    assert not is_cache_bypassed(Headers({"accept": "application/json"}))
+    assert is_cacheable(200, Headers({}))
+    assert not is_cacheable(200, Headers({"cache-control": "private, max-age=60"}))
+    assert not is_cacheable(404, Headers({}))
+    assert parse_ttls("categories=60, posts=10") == {"categories": 60, "posts": 10}
+
+
+@pytest_asyncio.fixture()
+async def gateway(make_gateway):
+    from app import main
+
+    upstream_calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls.append(request)
+        return httpx.Response(200, json={"id": 1, "viewer": request.headers.get("authorization", "anonymous")})
+
+    client = await make_gateway([{"prefix": "posts", "upstreams": "http://posts"}], handler,
+                                main.RouteDefaults(cache_ttls={"posts": 60}))
+    return client, upstream_calls
+
+
+@pytest.mark.asyncio
+async def test_bypassed_responses_never_reach_shared_cache(gateway):
+    """Тест: ответ на запрос с Authorization или no-store не попадает в кэш и не отдаётся другому клиенту"""
+    client, upstream_calls = gateway
+
+    private = await client.get("/posts/1", headers={"authorization": "Bearer alice"})
+    no_store = await client.get("/posts/1", headers={"cache-control": "no-store"})
+    anonymous = await client.get("/posts/1")
+    cached = await client.get("/posts/1")
+
+    assert private.json()["viewer"] == "Bearer alice" and "x-cache" not in private.headers
+    assert "x-cache" not in no_store.headers
+    assert anonymous.json()["viewer"] == "anonymous" and anonymous.headers["x-cache"] == "MISS"
+    assert cached.json()["viewer"] == "anonymous" and cached.headers["x-cache"] == "HIT"
+    assert len(upstream_calls) == 3
@@ -0,0 +1,76 @@
+import pytest
+
+from app.core.circuit_breaker import BreakerSettings, BreakerState, CircuitBreaker
+from app.core.routing import NoHealthyUpstream, Route, Upstream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+SETTINGS = BreakerSettings(failure_rate=0.5, slow_call_s=1.0, slow_call_rate=0.5, min_calls=4,
+                           window_s=10, open_s=5.0, half_open_calls=2)
+
+
+def test_opens_on_error_rate():
+    """Тест: цепь размыкается, когда доля ошибок превышает порог"""
+    breaker = CircuitBreaker(SETTINGS, clock=FakeClock())
+    for success in (True, False, True, False):
+        assert breaker.acquire()
+        breaker.record(success=success, duration_s=0.01)
+
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.acquire()
+
+
+def test_opens_on_slow_calls():
+    """Тест: цепь размыкается, когда upstream стабильно отвечает медленно"""
+    breaker = CircuitBreaker(SETTINGS, clock=FakeClock())
+    for _ in range(4):
+        breaker.record(success=True, duration_s=2.0)
+
+    assert breaker.state is BreakerState.OPEN
+
+
+def test_half_open_probes_close_or_reopen():
+    """Тест: после паузы пробные запросы замыкают или снова размыкают цепь"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(SETTINGS, clock=clock)
+    for _ in range(4):
+        breaker.record(success=False, duration_s=0.01)
+
+    clock.now += 5.0
+    assert breaker.acquire()
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.acquire()
+    assert not breaker.acquire()
+    breaker.record(success=False, duration_s=0.01)
+    assert breaker.state is BreakerState.OPEN
+
+    clock.now += 5.0
+    for _ in range(2):
+        assert breaker.acquire()
+        breaker.record(success=True, duration_s=0.01)
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_open_instance_ejected_from_pool():
+    """Тест: экземпляр с разомкнутой цепью не получает запросы"""
+    clock = FakeClock()
+    healthy = Upstream("http://a", breaker=CircuitBreaker(SETTINGS, clock=clock))
+    failing = Upstream("http://b", breaker=CircuitBreaker(SETTINGS, clock=clock))
+    route = Route(prefix="posts", service="posts_service", instances=[healthy, failing])
+    for _ in range(4):
+        failing.breaker.record(success=False, duration_s=0.01)
+
+    assert {route.pick().url for _ in range(4)} == {"http://a"}
+
+    for _ in range(4):
+        healthy.breaker.record(success=False, duration_s=0.01)
+    with pytest.raises(NoHealthyUpstream) as exc_info:
+        route.pick()
+    assert exc_info.value.retry_after == 5.0
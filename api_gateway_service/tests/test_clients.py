@@ -0,0 +1,51 @@
+import httpx
+import pytest
+from starlette.datastructures import Headers
+
+from app.core.clients import ClientResolver, parse_api_keys, parse_networks
+from app.core.rate_limit import RateLimitTier
+
+
+def test_client_resolved_by_known_api_key_only():
+    """Тест: имя клиента даёт только известный ключ, неизвестный ключ не отличается от запроса без ключа"""
+    resolver = ClientResolver(parse_api_keys('{"secret-1": "partner"}'))
+
+    assert resolver.resolve(Headers({"x-api-key": "secret-1"}), "1.2.3.4") == "partner"
+    assert resolver.resolve(Headers({"x-api-key": "partner"}), "1.2.3.4") == "1.2.3.4"
+    assert resolver.resolve(Headers({"x-api-key": "random"}), "1.2.3.4") == "1.2.3.4"
+    assert resolver.resolve(Headers({}), None) == "unknown"
+    with pytest.raises(ValueError):
+        parse_api_keys('{"secret-1": ""}')
+
+
+def test_forwarded_for_trusted_only_from_proxies():
+    """Тест: X-Forwarded-For читается только от доверенного прокси и справа налево"""
+    resolver = ClientResolver({}, parse_networks("10.0.0.0/8, 192.168.1.1"))
+    forwarded = Headers({"x-forwarded-for": "6.6.6.6, 5.5.5.5, 10.1.1.1"})
+
+    assert resolver.resolve(forwarded, "1.2.3.4") == "1.2.3.4"
+    # Адрес, подставленный клиентом левее, не учитывается
+    assert resolver.resolve(forwarded, "192.168.1.1") == "5.5.5.5"
+    assert resolver.resolve(Headers({"x-forwarded-for": "garbage"}), "10.0.0.2") == "10.0.0.2"
+    assert resolver.resolve(Headers({}), "10.0.0.2") == "10.0.0.2"
+
+
+@pytest.mark.asyncio
+async def test_rotating_api_keys_share_one_bucket(monkeypatch, make_gateway):
+    """Тест: новый ключ в каждом запросе не обходит лимит и не даёт чужой тариф"""
+    from app import main
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(main, "client_resolver", ClientResolver({"secret-1": "partner"}))
+    monkeypatch.setattr(main, "RATE_LIMIT_CLIENT_TIERS", {"partner": RateLimitTier(100, 60)})
+    client = await make_gateway([{"prefix": "posts", "upstreams": "http://posts"}], handler,
+                                main.RouteDefaults(cache_ttls={}, rate_limit=RateLimitTier(3, 60)), rate_limit=True)
+
+    statuses = [(await client.get("/posts/", headers={"x-api-key": key})).status_code
+                for key in ("a", "b", "partner", "c")]
+    partner = await client.get("/posts/", headers={"x-api-key": "secret-1"})
+
+    assert statuses == [200, 200, 200, 429]
+    assert partner.status_code == 200 and partner.headers["x-ratelimit-limit"] == "100"
@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.datastructures import QueryParams
+
+from app.core.coalescing import SingleFlight, build_flight_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_upstream_call():
+    """Тест: одновременные одинаковые вызовы выполняются один раз"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(10)])
+
+    assert calls == 1
+    assert [r[0] for r in results] == ["result"] * 10
+    assert sum(1 for r in results if r[1]) == 1
+    assert flight.stats.collapsed == 9
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_error_propagates_to_all_waiters():
+    """Тест: ошибка общего вызова получают все ожидающие"""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream down")
+
+    results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert flight.stats.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    """Тест: отмена одного ожидающего не отменяет общий вызов"""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    leader = asyncio.create_task(flight.do("key", fetch))
+    follower = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == ("result", False)
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_when_nobody_waits():
+    """Тест: вызов отменяется, когда его перестали ждать все"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(10)
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert flight.stats.cancelled == 1
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_result_nobody_received_is_discarded():
+    """Тест: готовый результат, который не успел получить ни один ожидающий, передаётся в discard"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    discarded = []
+
+    async def fetch():
+        started.set()
+        return "open response"
+
+    async def discard(result):
+        discarded.append(result)
+
+    waiter = asyncio.create_task(flight.do("key", fetch, discard=discard))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert discarded == ["open response"]
+
+
+@pytest.mark.asyncio
+async def test_response_over_buffer_limit_is_fetched_once(monkeypatch, make_gateway):
+    """Тест: ответ больше лимита буферизации дочитывается потоком, а не запрашивается у upstream повторно"""
+    from app import main
+
+    calls = []
+    body = b"".join(bytes([i]) * 1024 for i in range(8))
+
+    class UpstreamBody(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(0, len(body), 1024):
+                yield body[i:i + 1024]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, headers={"content-type": "application/octet-stream"}, stream=UpstreamBody())
+
+    monkeypatch.setattr(main, "COALESCE_ENABLED", True)
+    monkeypatch.setattr(main, "PROXY_MAX_BUFFERED_BYTES", 2048)
+    monkeypatch.setattr(main, "PROXY_CHUNK_SIZE", 1024)
+    client = await make_gateway([{"prefix": "posts", "upstreams": "http://posts"}], handler,
+                                main.RouteDefaults(cache_ttls={}))
+
+    response = await client.get("/posts/", headers={"accept-encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.content == body
+    assert calls == ["/posts/"]
+    assert main.app.state.bulkheads["posts"].in_flight == 0
+
+
+def test_flight_key_depends_on_vary_headers():
+    """Тест: ключ учитывает query без учёта порядка и vary-заголовки"""
+    first = build_flight_key("GET", "posts/", QueryParams("a=1&b=2"), {"accept": "application/json"}, ["accept"])
+    second = build_flight_key("GET", "posts/", QueryParams("b=2&a=1"), {"accept": "application/json"}, ["accept"])
+    other = build_flight_key("GET", "posts/", QueryParams("a=1&b=2"), {"accept": "text/html"}, ["accept"])
+
+    assert first == second
+    assert first != other
@@ -0,0 +1,98 @@
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.composition import Expansion, UnknownExpansion, merge_related, parse_expand, related_ids
+
+
+def test_parse_expand_and_related_ids():
+    """Тест: связи разбираются по имени, id связанных объектов собираются без повторов"""
+    expansions = {"category": Expansion(field="category_id", target="categories")}
+    assert list(parse_expand("category, ", expansions)) == ["category"]
+    with pytest.raises(UnknownExpansion):
+        parse_expand("author", expansions)
+
+    items = [{"id": 1, "category_id": 2}, {"id": 2, "category_id": 1},
+             {"id": 3, "category_id": 2}, {"id": 4, "category_id": None}]
+    assert related_ids(items, "category_id") == [2, 1]
+
+    merge_related(items, "category", "category_id", {2: {"id": 2, "name": "b"}})
+    assert items[0]["category"] == {"id": 2, "name": "b"}
+    assert items[1]["category"] is None
+
+
+@pytest_asyncio.fixture()
+async def gateway(make_gateway):
+    from app import main
+
+    upstream_calls = []
+    categories = {1: {"id": 1, "name": "news"}, 2: {"id": 2, "name": "tech"}}
+    posts = [{"id": 1, "title": "a", "category_id": 1}, {"id": 2, "title": "b", "category_id": 2},
+             {"id": 3, "title": "c", "category_id": 1}]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls.append(request.url)
+        if request.url.host == "categories" and request.url.path == "/categories/":
+            ids = [int(value) for value in request.url.params.get_list("ids")]
+            return httpx.Response(200, json=[categories[i] for i in ids if i in categories])
+        if request.url.path == "/posts/":
+            category_id = request.url.params.get("category_id")
+            return httpx.Response(200, json=[post for post in posts
+                                             if category_id is None or post["category_id"] == int(category_id)],
+                                  headers={"X-Next-Cursor": "WzNd"})
+        if request.url.path == "/posts/3":
+            return httpx.Response(200, json=posts[2])
+        return httpx.Response(404, json={"detail": "Not found"})
+
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts"},
+        {"prefix": "categories", "upstreams": "http://categories"},
+    ], handler)
+    return client, upstream_calls
+
+
+@pytest.mark.asyncio
+async def test_expand_list_fetches_categories_in_one_batch(gateway):
+    """Тест: список постов дополняется категориями одним пакетным запросом"""
+    client, upstream_calls = gateway
+
+    response = await client.get("/posts/", params={"expand": "category"})
+
+    assert response.status_code == 200
+    assert [post["category"]["name"] for post in response.json()] == ["news", "tech", "news"]
+    category_calls = [url for url in upstream_calls if url.host == "categories"]
+    assert len(category_calls) == 1
+    assert category_calls[0].params.get_list("ids") == ["1", "2"]
+    # expand до upstream не доходит, курсор следующей страницы сохраняется
+    assert all("expand" not in url.params for url in upstream_calls)
+    assert response.headers["x-next-cursor"] == "WzNd"
+
+
+@pytest.mark.asyncio
+async def test_expand_single_post_and_prefetch_by_filter(gateway):
+    """Тест: один пост и фильтр по категории - категория запрашивается параллельно с постами"""
+    client, upstream_calls = gateway
+
+    single = await client.get("/posts/3", params={"expand": "category"})
+    assert single.json()["category"] == {"id": 1, "name": "news"}
+
+    upstream_calls.clear()
+    filtered = await client.get("/posts/", params={"category_id": "2", "expand": "category"})
+    assert [post["category"]["name"] for post in filtered.json()] == ["tech"]
+    assert len(upstream_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_expand_errors(gateway):
+    """Тест: неизвестная связь - 400, ошибка основного сервиса передаётся как есть"""
+    client, _ = gateway
+
+    unknown = await client.get("/posts/", params={"expand": "author"})
+    assert unknown.status_code == 400
+    assert "author" in unknown.json()["detail"]
+
+    missing = await client.get("/posts/42", params={"expand": "category"})
+    assert missing.status_code == 404
+    assert json.loads(missing.content) == {"detail": "Not found"}
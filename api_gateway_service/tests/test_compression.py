@@ -0,0 +1,127 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.compression import COMPRESSION_BYTES_SAVED, CompressionMiddleware, CompressionSettings, negotiate
+
+
+def test_negotiate_respects_q_values():
+    """Тест: кодировка выбирается по q клиента, при равных - по предпочтению сервера"""
+    available = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate, br", available) == "br"
+    assert negotiate("br;q=0.5, gzip", available) == "gzip"
+    assert negotiate("*;q=0.1, zstd;q=0", available) == "br"
+    assert negotiate("identity", available) is None
+    assert negotiate("gzip;q=0", ("gzip",)) is None
+
+
+def _app(encodings: tuple[str, ...] = ("gzip",)) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, settings=CompressionSettings(encodings=encodings, min_size=100,
+                                                                           thread_min_size=1000))
+
+    @app.get("/large")
+    async def large():
+        return Response(b'{"content": "' + b"x" * 5000 + b'"}', media_type="application/json",
+                        headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"id": 1}', media_type="application/json")
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(5):
+                yield f'{{"chunk": {i}, "data": "{"y" * 300}"}}\n'.encode()
+        return StreamingResponse(body(), media_type="application/json")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_compresses_above_threshold_only():
+    """Тест: сжимаются только сжимаемые ответы не меньше порога, ETag становится слабым"""
+    before = COMPRESSION_BYTES_SAVED.labels("gzip").value
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()), base_url="http://test",
+                                 headers={"accept-encoding": "gzip"}) as client:
+        large = await client.get("/large")
+        small = await client.get("/small")
+        image = await client.get("/image")
+
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["etag"] == 'W/"abc"'
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert large.json()["content"] == "x" * 5000
+    assert int(large.headers["content-length"]) < 200  # httpx считает по сжатым байтам
+    assert "content-encoding" not in small.headers and small.json() == {"id": 1}
+    assert "content-encoding" not in image.headers
+    assert COMPRESSION_BYTES_SAVED.labels("gzip").value - before > 4000
+
+
+async def _call(app: FastAPI, path: str, encoding: str) -> tuple[dict[bytes, bytes], list[bytes]]:
+    """Заголовки ответа и куски тела в том виде, в каком их отправило приложение."""
+    # spec_version 2.4: Starlette не слушает disconnect параллельно с отправкой ответа
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"test"), (b"accept-encoding", encoding.encode())],
+             "client": ("127.0.0.1", 1), "server": ("test", 80)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return dict(sent[0]["headers"]), [message["body"] for message in sent[1:] if message["body"]]
+
+
+def _decompress(encoding: str, data: bytes) -> bytes:
+    # Потоковые декомпрессоры: распаковывают и незаконченный поток
+    if encoding == "br":
+        return pytest.importorskip("brotli").Decompressor().process(data)
+    if encoding == "zstd":
+        return pytest.importorskip("zstandard").ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_is_compressed_chunk_by_chunk():
+    """Тест: потоковый ответ сжимается по кускам, без накопления целиком"""
+    headers, chunks = await _call(_app(), "/stream", "gzip")
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert len(chunks) > 1
+    lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+    assert [line[:11] for line in lines] == [f'{{"chunk": {i}' for i in range(5)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+async def test_brotli_and_zstd_round_trip(encoding, module):
+    """Тест: br и zstd - целый ответ и потоковый по кускам распаковываются в исходные байты"""
+    pytest.importorskip(module)
+    app = _app((encoding,))
+
+    headers, chunks = await _call(app, "/large", encoding)
+    assert headers[b"content-encoding"] == encoding.encode()
+    assert int(headers[b"content-length"]) == len(b"".join(chunks)) < 200
+    assert _decompress(encoding, b"".join(chunks)) == b'{"content": "' + b"x" * 5000 + b'"}'
+
+    headers, chunks = await _call(app, "/stream", encoding)
+    assert headers[b"content-encoding"] == encoding.encode() and b"content-length" not in headers
+    assert len(chunks) > 1
+    # Каждый кусок дописан до границы блока: уже полученное распаковывается, не дожидаясь конца
+    assert _decompress(encoding, chunks[0]).startswith(b'{"chunk": 0')
+    lines = _decompress(encoding, b"".join(chunks)).decode().splitlines()
+    assert [line[:11] for line in lines] == [f'{{"chunk": {i}' for i in range(5)]
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.concurrency import AdaptiveLimiter, ConcurrencyLimitExceeded, LimiterSettings
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_briefly_then_sheds():
+    """Тест: сверх лимита запрос ждёт в короткой очереди, при полной очереди - отказ сразу"""
+    limiter = AdaptiveLimiter("posts", LimiterSettings(initial_limit=2, min_limit=1, queue_size=1,
+                                                       queue_timeout_s=0.05))
+    first = await limiter.acquire()
+    await limiter.acquire()
+
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire()
+
+    limiter.release(first, sample=False)
+    await waiting
+    assert limiter.in_flight == 2
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire()  # место не освободилось за queue_timeout_s
+    assert limiter.snapshot()["rejected"] == 2
+    assert limiter.snapshot()["queued_now"] == 0
+
+
+def test_gradient_and_aimd_follow_latency():
+    """Тест: рост задержки уменьшает лимит, быстрые ответы под нагрузкой - увеличивают"""
+    now = [0.0]
+    gradient = AdaptiveLimiter("posts", LimiterSettings(initial_limit=20), clock=lambda: now[0])
+    gradient.in_flight = 20
+    for _ in range(50):
+        gradient._update(0.01, dropped=False, in_flight=20)
+    grown = gradient.limit
+    assert grown > 20
+    for _ in range(50):
+        gradient._update(0.05, dropped=False, in_flight=int(gradient.limit))
+    assert gradient.limit < grown / 2
+
+    aimd = AdaptiveLimiter("posts", LimiterSettings(algorithm="aimd", initial_limit=10, latency_threshold_s=0.1))
+    aimd._update(0.01, dropped=False, in_flight=10)
+    assert aimd.limit == 11
+    aimd._update(0.5, dropped=False, in_flight=10)
+    assert aimd.limit == pytest.approx(9.9)
+    aimd._update(0.01, dropped=True, in_flight=10)
+    assert aimd.limit == pytest.approx(8.91)
+
+
+@pytest.mark.asyncio
+async def test_gateway_sheds_load_with_retry_after(monkeypatch, make_gateway):
+    """Тест: когда upstream загружен до лимита, шлюз сразу отвечает 503 с Retry-After"""
+    from app import main
+
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(main, "COALESCE_ENABLED", False)
+    client = await make_gateway([{
+        "prefix": "posts", "upstreams": "http://posts",
+        "concurrency": {"initial_limit": 1, "min_limit": 1, "queue_size": 0},
+    }], handler)
+
+    busy = asyncio.create_task(client.get("/posts/1"))
+    await asyncio.sleep(0.05)
+    shed = await client.get("/posts/2")
+    release.set()
+    assert (await busy).status_code == 200
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert main.app.state.limiters["posts"].snapshot()["in_flight"] == 0
@@ -0,0 +1,69 @@
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.conditional import if_none_match, strong_etag, with_etag
+
+
+def test_if_none_match_uses_weak_comparison():
+    """Тест: If-None-Match сравнивается без учёта W/, поддерживаются список и *"""
+    etag = strong_etag(b"body")
+    assert etag == strong_etag(b"body") != strong_etag(b"other")
+    assert if_none_match({"if-none-match": f'"x", W/{etag}'}, etag)
+    assert if_none_match({"if-none-match": etag}, f"W/{etag}")
+    assert if_none_match({"if-none-match": "*"}, etag)
+    assert not if_none_match({"if-none-match": '"x"'}, etag)
+    assert not if_none_match({}, etag)
+    assert with_etag(200, {"etag": '"v1"'}, b"body") == {"etag": '"v1"'}
+    assert with_etag(404, {}, b"body") == {}
+
+
+@pytest_asyncio.fixture()
+async def gateway(make_gateway):
+    from app import main
+
+    upstream_calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls.append(request)
+        if request.url.path.startswith("/posts/"):
+            return httpx.Response(200, json={"id": 1}, headers={"etag": '"post-v1"'})
+        return httpx.Response(200, json=[{"id": 1, "name": "news"}])
+
+    client = await make_gateway([
+        {"prefix": "posts", "upstreams": "http://posts"},
+        {"prefix": "categories", "upstreams": "http://categories"},
+    ], handler, main.RouteDefaults(cache_ttls={"categories": 60}))
+    return client, upstream_calls
+
+
+@pytest.mark.asyncio
+async def test_not_modified_served_from_cache(gateway):
+    """Тест: повторный опрос с If-None-Match получает 304 из кэша без обращения к upstream"""
+    client, upstream_calls = gateway
+
+    first = await client.get("/categories/")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    second = await client.get("/categories/", headers={"if-none-match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert second.headers["x-cache"] == "HIT"
+    assert len(upstream_calls) == 1
+
+    changed = await client.get("/categories/", headers={"if-none-match": '"stale"'})
+    assert changed.status_code == 200 and changed.json() == [{"id": 1, "name": "news"}]
+
+
+@pytest.mark.asyncio
+async def test_upstream_etag_is_reused(gateway):
+    """Тест: ETag upstream отдаётся как есть, условные заголовки до upstream не доходят"""
+    client, upstream_calls = gateway
+
+    response = await client.get("/posts/1", headers={"if-none-match": '"post-v1"'})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"post-v1"'
+    assert "if-none-match" not in upstream_calls[0].headers
@@ -0,0 +1,84 @@
+import io
+import json
+import threading
+import time
+
+from loguru import logger
+
+from app.core import logging as gateway_logging
+from app.core.logging import LOG_FORMAT, EventLogger, LogWriter
+
+
+def _without_timing(line: str) -> dict:
+    data = json.loads(line)
+    data["text"] = data["text"].split(" | ", 1)[1]
+    for key in ("elapsed", "time", "line"):
+        del data["record"][key]
+    return data
+
+
+def test_writer_keeps_loguru_json_schema():
+    """Тест: поток-писатель выдаёт ту же JSON-структуру, что loguru с serialize=True"""
+    expected, actual = io.StringIO(), io.StringIO()
+    writer = LogWriter(actual, flush_interval_s=0)
+    handler_id = logger.add(expected, format=LOG_FORMAT, serialize=True)
+    try:
+        for log in (EventLogger("api_gateway"), EventLogger("api_gateway", writer)):
+            log.warning({"event": "test_event", "value": "значение"})
+    finally:
+        logger.remove(handler_id)
+    writer.close()
+
+    old, new = _without_timing(expected.getvalue()), _without_timing(actual.getvalue())
+    assert new == old
+    assert new["record"]["function"] == "test_writer_keeps_loguru_json_schema"
+    assert writer.stats()["written"] == 1
+
+
+def test_sampling_drops_events_before_formatting(monkeypatch):
+    """Тест: событие с долей выборки 0 не доходит до потока вывода"""
+    monkeypatch.setattr(gateway_logging, "LOG_SAMPLING", {"noisy_event": 0.0})
+    stream = io.StringIO()
+    writer = LogWriter(stream, flush_interval_s=0)
+    log = EventLogger("api_gateway", writer)
+    for _ in range(10):
+        log.info({"event": "noisy_event"})
+    log.info({"event": "important_event"})
+    log.debug({"event": "below_level"})
+    writer.close()
+
+    messages = [json.loads(line)["record"]["message"] for line in stream.getvalue().splitlines()]
+    assert messages == ["{'event': 'important_event'}"]
+
+
+def test_full_queue_drops_and_counts():
+    """Тест: при переполненной очереди записи отбрасываются и подсчитываются"""
+    release = threading.Event()
+
+    class SlowStream(io.StringIO):
+        def write(self, data):
+            release.wait(5)
+            return super().write(data)
+
+    stream = SlowStream()
+    writer = LogWriter(stream, max_queue=1, batch_size=1, flush_interval_s=0)
+    log = EventLogger("api_gateway", writer)
+    log.info({"event": "first"})
+    # Ждём, пока писатель заберёт первую запись и зависнет на записи в поток
+    while not writer._queue.empty():
+        time.sleep(0.001)
+    log.info({"event": "second"})
+    log.info({"event": "third"})
+    assert writer.dropped == 1
+    release.set()
+    # Писатель сообщает о потерях, когда разберёт очередь
+    while writer.written < 3:
+        time.sleep(0.001)
+    writer.close()
+
+    records = [json.loads(line)["record"] for line in stream.getvalue().splitlines()]
+    assert [record["message"] for record in records[:2]] == ["{'event': 'first'}", "{'event': 'second'}"]
+    assert records[2]["message"] == "{'event': 'log_records_dropped', 'count': 1, 'total': 1}"
+    assert records[2]["level"]["name"] == "WARNING"
+    assert records[2]["extra"] == {"service": "api_gateway"}
+    assert writer.stats() == {"written": 3, "dropped": 1, "queued": 0}
@@ -0,0 +1,49 @@
+import httpx
+import pytest
+
+from app.core.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Тест: гистограмма выдаётся в формате Prometheus с накопленными корзинами"""
+    registry = Registry()
+    histogram = registry.histogram("request_seconds", "Время запроса", ("route",), buckets=(0.1, 1.0))
+    child = histogram.labels("/posts/")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+    registry.counter("timeouts", "Таймауты").inc(2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE request_seconds histogram" in lines
+    assert 'request_seconds_bucket{route="/posts/",le="0.1"} 2' in lines
+    assert 'request_seconds_bucket{route="/posts/",le="1.0"} 3' in lines
+    assert 'request_seconds_bucket{route="/posts/",le="+Inf"} 4' in lines
+    assert 'request_seconds_sum{route="/posts/"} 3.65' in lines
+    assert 'request_seconds_count{route="/posts/"} 4' in lines
+    assert "timeouts_total 2" in lines
+
+
+def test_labels_are_validated_and_escaped():
+    """Тест: число меток проверяется, значения экранируются"""
+    registry = Registry()
+    gauge = registry.gauge("in_flight", "Запросы в работе", ("path",))
+    gauge.labels('a"b').inc()
+
+    assert 'in_flight{path="a\\"b"} 1' in registry.render()
+    with pytest.raises(ValueError):
+        gauge.labels("a", "b")
+
+
+@pytest.mark.asyncio
+async def test_gateway_metrics_endpoint():
+    """Тест: /metrics шлюза отдаёт гистограмму по шаблону маршрута"""
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+        await client.get("/health")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status_code="200"}' in response.text
+    assert "http_requests_in_flight 1" in response.text
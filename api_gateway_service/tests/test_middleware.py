@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.core.middleware import RequestLoggingMiddleware
+
+
+class _Logger:
+    def __init__(self):
+        self.records = []
+
+    def info(self, data):
+        self.records.append(("info", data))
+
+    def warning(self, data):
+        self.records.append(("warning", data))
+
+    def error(self, data):
+        self.records.append(("error", data))
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through_chunk_by_chunk():
+    """Тест: middleware не буферизует поток, добавляет заголовки и пишет оба события лога"""
+    second_chunk = asyncio.Event()
+
+    async def body():
+        yield b"first"
+        await second_chunk.wait()
+        yield b"second"
+
+    async def endpoint(request):
+        return StreamingResponse(body(), status_code=404)
+
+    logger = _Logger()
+    app = RequestLoggingMiddleware(Starlette(routes=[Route("/items/{item_id}", endpoint)]), logger,
+                                   extra_headers=lambda scope: {"X-Extra": "1"})
+    sent = []
+    first_chunk_sent = asyncio.Event()
+
+    async def receive():
+        await asyncio.Future()  # клиент не отключается
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body") == b"first":
+            first_chunk_sent.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": "/items/1", "raw_path": b"/items/1",
+             "query_string": b"", "root_path": "", "headers": [], "client": ("10.0.0.1", 1),
+             "server": ("test", 80)}
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(first_chunk_sent.wait(), 1)
+    # Первый кусок уже у клиента, хотя ответ ещё не закончен
+    assert not task.done()
+    second_chunk.set()
+    await task
+
+    assert (b"x-extra", b"1") in sent[0]["headers"]
+    assert [message.get("body") for message in sent[1:] if message.get("body")] == [b"first", b"second"]
+    started, completed = logger.records
+    assert started == ("info", {"event": "request_started", "method": "GET", "path": "/items/1",
+                                "client_ip": "10.0.0.1"})
+    assert completed[0] == "warning"
+    assert {key: value for key, value in completed[1].items() if key != "duration_ms"} == \
+        {"event": "request_completed", "method": "GET", "path": "/items/1", "status_code": 404}
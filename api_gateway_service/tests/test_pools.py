@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.bulkhead import Bulkhead
+from app.core.pools import ConnectionPool, PoolSettings
+from app.core.routing import RouteDefaults, build_route
+
+
+def test_pool_settings_from_route_config():
+    """Тест: настройки пула маршрута дополняются значениями по умолчанию"""
+    defaults = RouteDefaults(pool=PoolSettings(max_connections=10, pool_timeout=1.0))
+    route = build_route({"prefix": "posts", "upstreams": "http://a", "pool": {"max_connections": 3}}, defaults)
+
+    assert route.pool.max_connections == 3
+    assert route.pool.pool_timeout == 1.0
+    timeout = route.pool.timeout(30.0)
+    assert (timeout.connect, timeout.read, timeout.pool) == (5.0, 30.0, 1.0)
+
+    with pytest.raises(ValueError):
+        build_route({"prefix": "posts", "upstreams": "http://a", "pool": {"max_conns": 3}})
+
+
+@pytest.mark.asyncio
+async def test_pool_records_connection_wait():
+    """Тест: время ожидания соединения берётся из trace-событий транспорта"""
+    async def handler(request: httpx.Request):
+        # Имитируем ожидание свободного соединения в пуле
+        await asyncio.sleep(0.05)
+        await request.extensions["trace"]("http11.send_request_headers.started", {})
+        return httpx.Response(200, content=b"ok")
+
+    pool = ConnectionPool("posts_service", PoolSettings(), 5.0, transport=httpx.MockTransport(handler))
+    requests = [pool.send(pool.build_request(method="GET", url="http://posts/")) for _ in range(3)]
+    responses = await asyncio.gather(*requests)
+    await pool.aclose()
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    snapshot = pool.snapshot()
+    assert snapshot["max_waiting"] == 3
+    assert snapshot["waiting"] == 0
+    assert snapshot["wait_count"] == 3
+    assert snapshot["wait_max_ms"] >= 50
+
+
+@pytest.mark.asyncio
+async def test_pool_timeout_does_not_open_breaker():
+    """Тест: исчерпание пула шлюза не считается ошибкой экземпляра upstream"""
+    from app.main import _send_upstream, app
+
+    def handler(request: httpx.Request):
+        raise httpx.PoolTimeout("no free connections", request=request)
+
+    route = build_route({"prefix": "posts", "upstreams": "http://posts"})
+    original = getattr(app.state, "pools", None), getattr(app.state, "bulkheads", None)
+    app.state.pools = {route.prefix: ConnectionPool(route.service, route.pool, route.timeout,
+                                                    transport=httpx.MockTransport(handler))}
+    app.state.bulkheads = {route.prefix: Bulkhead(route.service, route.bulkhead)}
+    try:
+        for _ in range(route.instances[0].breaker.settings.min_calls):
+            with pytest.raises(httpx.PoolTimeout):
+                await _send_upstream(route, "GET", "posts/", {}, {})
+        assert app.state.pools[route.prefix].snapshot()["pool_timeouts"] == route.instances[0].breaker.settings.min_calls
+        assert all(instance.breaker.available() and instance.in_flight == 0 for instance in route.instances)
+        assert app.state.bulkheads[route.prefix].in_flight == 0
+    finally:
+        await app.state.pools[route.prefix].aclose()
+        if original[0] is not None:
+            app.state.pools, app.state.bulkheads = original
@@ -0,0 +1,123 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.core.rate_limit import RateLimiter, RateLimitTier, parse_client_tiers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+TIER = RateLimitTier(limit=10, window_s=10.0)
+
+
+def test_bucket_limits_and_refills():
+    """Тест: корзина пропускает limit запросов, затем пополняется со временем"""
+    clock = FakeClock()
+    limiter = RateLimiter(None, clock=clock)
+    decisions = [limiter.hit("posts:1.2.3.4", TIER) for _ in range(11)]
+
+    assert all(decision.allowed for decision in decisions[:10])
+    assert decisions[9].remaining == 0
+    rejected = decisions[10]
+    assert not rejected.allowed
+    assert rejected.headers()["Retry-After"] == "1"
+    assert rejected.headers()["X-RateLimit-Reset"] == "10"
+
+    clock.now += 3.0
+    decision = limiter.hit("posts:1.2.3.4", TIER)
+    assert decision.allowed and decision.remaining == 2
+    # У другого клиента своя корзина
+    assert limiter.hit("posts:5.6.7.8", TIER).remaining == 9
+
+
+@pytest.mark.asyncio
+async def test_sync_shares_budget_between_replicas():
+    """Тест: после синхронизации через Redis реплики расходуют общий лимит"""
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    clock = FakeClock()
+    first = RateLimiter(redis_client, clock=clock, wall_clock=clock)
+    second = RateLimiter(redis_client, clock=clock, wall_clock=clock)
+
+    for _ in range(6):
+        assert first.hit("posts:client", TIER).allowed
+    await first.sync()
+    assert second.hit("posts:client", TIER).allowed
+    await second.sync()
+
+    # Вторая реплика узнала о 6 запросах первой и сама потратила 1
+    assert second.hit("posts:client", TIER).remaining == 2
+    await first.sync()
+    assert first.hit("posts:client", TIER).remaining == 2
+    assert first.syncs == 2 and first.sync_errors == 0
+
+
+@pytest.mark.asyncio
+async def test_sync_error_keeps_pending_counts():
+    """Тест: при недоступном Redis лимитер работает локально и досылает счётчики позже"""
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            raise ConnectionError("redis is down")
+
+    limiter = RateLimiter(BrokenRedis(), clock=FakeClock())
+    limiter.hit("posts:client", TIER)
+    await limiter.sync()
+
+    assert limiter.sync_errors == 1
+    assert limiter.hit("posts:client", TIER).allowed
+    assert limiter._buckets["posts:client"].pending == 2
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_running_sync():
+    """Тест: остановка лимитера не обрывает идущую синхронизацию и не теряет её счётчики"""
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    started = asyncio.Event()
+
+    class SlowRedis:
+        def pipeline(self, transaction=True):
+            pipe = redis_client.pipeline(transaction=transaction)
+            execute = pipe.execute
+
+            async def slow_execute():
+                started.set()
+                await asyncio.sleep(0.05)
+                return await execute()
+
+            pipe.execute = slow_execute
+            return pipe
+
+    clock = FakeClock()
+    limiter = RateLimiter(SlowRedis(), sync_interval_s=0.01, clock=clock, wall_clock=clock)
+    for _ in range(3):
+        limiter.hit("posts:client", TIER)
+    limiter.start()
+    await started.wait()
+    await limiter.aclose()
+
+    assert await redis_client.get("gw:ratelimit:posts:client:100") == "3"
+
+
+def test_client_tiers_parsing():
+    """Тест: тарифы клиентов читаются из JSON, неизвестные поля отклоняются"""
+    tiers = parse_client_tiers('{"premium-key": {"limit": 1000, "window_s": 60}}')
+    assert tiers == {"premium-key": RateLimitTier(limit=1000, window_s=60.0)}
+
+    with pytest.raises(ValueError):
+        parse_client_tiers('{"key": {"times": 10}}')
+
+
+def test_check_does_not_consume_tokens():
+    """Тест: check отвечает, пройдёт ли запрос, не списывая токены"""
+    limiter = RateLimiter(None, clock=FakeClock())
+
+    assert limiter.check("posts:client", TIER, cost=10).allowed
+    assert not limiter.check("posts:client", TIER, cost=11).allowed
+    assert limiter.hit("posts:client", TIER, cost=10).remaining == 0
+    assert limiter.allowed == 1 and limiter.rejected == 0
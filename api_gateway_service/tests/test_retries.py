@@ -0,0 +1,123 @@
+import asyncio
+import json
+import random
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.retries import LatencyTracker, RetryBudget, RetrySettings
+
+
+def test_retry_budget_limits_extra_attempts():
+    """Тест: бюджет пополняется долей исходных запросов и временем, повтор тратит токен"""
+    now = [0.0]
+    budget = RetryBudget(ratio=0.5, min_per_s=1.0, max_tokens=2.0, clock=lambda: now[0])
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    now[0] += 1.0
+    assert budget.withdraw()
+    assert budget.stats() == {"tokens": 0.0, "withdrawn": 4, "denied": 2}
+
+
+def test_latency_percentile_and_backoff():
+    """Тест: перцентиль считается по последним замерам, пауза повтора не выходит за экспоненту"""
+    tracker = LatencyTracker(size=100, refresh_every=1)
+    settings = RetrySettings(hedge_percentile=0.9, hedge_min_samples=10, hedge_min_delay_s=0.001)
+    for i in range(5):
+        tracker.observe(i / 1000)
+    assert tracker.hedge_delay(settings) is None
+    for i in range(5, 100):
+        tracker.observe(i / 1000)
+    assert tracker.hedge_delay(settings) == 0.09
+
+    rng = random.Random(1)
+    assert all(0 <= settings.backoff(3, rng) <= 0.2 for _ in range(100))
+    with pytest.raises(ValueError):
+        RetrySettings.from_dict({"hedge_percentile": 1.5})
+
+
+@pytest_asyncio.fixture()
+async def gateway(monkeypatch, make_gateway):
+    from app import main
+
+    behaviour = {"http://posts-a": "slow", "http://posts-b": "fast"}
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        instance = f"http://{request.url.host}"
+        calls.append(instance)
+        if behaviour[instance] == "refuse":
+            raise httpx.ConnectError("connection refused", request=request)
+        if behaviour[instance] == "slow":
+            await asyncio.sleep(1.0)
+        # Тело - поток, как у настоящего upstream: шлюз должен его дочитать
+        return httpx.Response(200, headers={"content-type": "application/json"},
+                              stream=httpx.ByteStream(json.dumps({"instance": instance}).encode()))
+
+    monkeypatch.setattr(main, "COALESCE_ENABLED", False)
+    client = await make_gateway([{"prefix": "posts", "upstreams": "http://posts-a,http://posts-b"}], handler,
+                                main.RouteDefaults(retry=RetrySettings(hedge_min_samples=10, backoff_base_s=0.001)))
+    return client, main.route_table.routes[0], behaviour, calls
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_to_another_instance(gateway):
+    """Тест: после перцентиля запрос дублируется на другой экземпляр, отвечает быстрый"""
+    client, route, _, calls = gateway
+    for _ in range(20):
+        route.latency.observe(0.02)
+
+    started = time.perf_counter()
+    response = await client.get("/posts/1")
+
+    assert response.json() == {"instance": "http://posts-b"}
+    assert time.perf_counter() - started < 0.5
+    assert calls == ["http://posts-a", "http://posts-b"]
+    # Проигравший запрос отменён, экземпляр освобождён
+    assert [instance.in_flight for instance in route.instances] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_response_without_hedge_is_not_released_early(gateway):
+    """Тест: ответ, пришедший до дублирования или без бюджета на дубль, отдаётся клиенту целиком"""
+    from app import main
+    client, route, behaviour, _ = gateway
+    behaviour["http://posts-a"] = "fast"
+    for _ in range(20):
+        route.latency.observe(0.5)
+    fast = await client.get("/posts/1")
+    assert fast.status_code == 200 and "instance" in fast.json()
+
+    behaviour.update({"http://posts-a": "slow", "http://posts-b": "slow"})
+    for _ in range(100):
+        route.latency.observe(0.01)
+    main.app.state.retry_budget = RetryBudget(ratio=0, min_per_s=0, max_tokens=0)
+    slow = await client.get("/posts/1")
+    assert slow.status_code == 200 and "instance" in slow.json()
+    assert [instance.in_flight for instance in route.instances] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_connection_error_is_retried_within_budget(gateway):
+    """Тест: ошибка соединения повторяется на другом экземпляре, без бюджета - нет"""
+    from app import main
+    client, _, behaviour, calls = gateway
+    behaviour["http://posts-a"] = "refuse"
+
+    response = await client.get("/posts/1")
+    assert response.status_code == 200
+    assert calls == ["http://posts-a", "http://posts-b"]
+
+    main.app.state.retry_budget = RetryBudget(ratio=0, min_per_s=0, max_tokens=0)
+    calls.clear()
+    refused = await client.get("/posts/1")
+    assert refused.status_code == 503
+    assert calls == ["http://posts-a"]
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from app.core.routing import (LeastInFlightBalancer, PowerOfTwoChoicesBalancer, RoundRobinBalancer, Upstream,
+                              load_route_table)
+
+
+@pytest.fixture()
+def table():
+    return load_route_table(None, [
+        {"prefix": "posts", "upstreams": "http://posts-1:8000,http://posts-2:8000"},
+        {"prefix": "posts/archive", "service": "archive_service", "upstreams": ["http://archive:8000"]},
+        {"prefix": "categories", "upstreams": ["http://categories:8000"], "cache_ttl": 60},
+    ])
+
+
+def test_longest_prefix_wins(table):
+    """Тест: выбирается маршрут с самым длинным совпавшим префиксом"""
+    assert table.match("posts/1").service == "posts_service"
+    assert table.match("posts/archive/2020").service == "archive_service"
+    assert table.match("categories/").cache_ttl == 60
+
+
+def test_prefix_matches_whole_segments(table):
+    """Тест: префикс сравнивается по сегментам пути, а не по подстроке"""
+    assert table.match("postsx/1") is None
+    assert table.match("unknown/path") is None
+
+
+def test_config_from_json():
+    """Тест: маршруты загружаются из JSON-конфигурации"""
+    table = load_route_table('[{"prefix": "/posts/", "upstreams": ["http://a:8000/"], "balancer": "power_of_two"}]',
+                             default_routes=[])
+
+    route = table.match("posts/")
+    assert route.instances[0].url == "http://a:8000"
+    assert isinstance(route.balancer, PowerOfTwoChoicesBalancer)
+
+
+def test_unknown_balancer_rejected():
+    """Тест: неизвестная стратегия балансировки - ошибка конфигурации"""
+    with pytest.raises(ValueError):
+        load_route_table(None, [{"prefix": "posts", "upstreams": ["http://a"], "balancer": "random"}])
+
+
+def test_balancers():
+    """Тест: стратегии балансировки выбирают ожидаемые экземпляры"""
+    instances = [Upstream("http://a", in_flight=3), Upstream("http://b", in_flight=0), Upstream("http://c", in_flight=5)]
+
+    round_robin = RoundRobinBalancer()
+    assert [round_robin.pick(instances).url for _ in range(4)] == ["http://a", "http://b", "http://c", "http://a"]
+    assert LeastInFlightBalancer().pick(instances).url == "http://b"
+
+    power_of_two = PowerOfTwoChoicesBalancer(rng=random.Random(1))
+    picked = {power_of_two.pick(instances).url for _ in range(100)}
+    assert "http://c" not in picked
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.core.dependencies import get_category_service
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, next_cursor
 from app.schemas.category import Category, CategoryBase
 from app.services.categories import CategoryService
 from app.core.logging import get_logger
 
 logger = get_logger("categories_service")
 
+# Сколько ID можно запросить одним запросом ?ids=
+MAX_IDS_PER_REQUEST = 100
+
 router = APIRouter(
     prefix="/categories",
     tags=["categories"]
@@ -15,15 +19,40 @@ router = APIRouter(
 
 @router.get("/", response_model=list[Category])
 async def read_categories(
+        response: Response,
         skip: int = 0,
         limit: int = 100,
+        cursor: str | None = None,
+        ids: list[int] | None = Query(None, max_length=MAX_IDS_PER_REQUEST),
         category_service: CategoryService = Depends(get_category_service)  # Инъекция сервиса
 ):
-    """Получить список всех категорий."""
-    categories = await category_service.get_all_categories(skip=skip, limit=limit)
+    """Получить список всех категорий или категорий с указанными ID (?ids=1&ids=2).
+
+    Список идёт по возрастанию id; для полной страницы курсор следующей
+    приходит в заголовке X-Next-Cursor и передаётся обратно в ?cursor=...
+    """
+    if ids is not None:
+        categories = await category_service.get_categories_by_ids(category_ids=ids)
+        logger.info({"event": "categories_fetched_by_ids", "requested": len(ids), "count": len(categories)})
+        return categories
+
+    after_id = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="cursor and skip cannot be used together")
+        try:
+            after_id, = decode_cursor(cursor, int)
+        except InvalidCursor as e:
+            logger.warning({"event": "categories_invalid_cursor", "reason": str(e)})
+            raise HTTPException(status_code=400, detail=str(e))
+
+    categories = await category_service.get_all_categories(skip=skip, limit=limit, after_id=after_id)
     
-    logger.info({"event": "categories_fetched", "count": len(categories), "skip": skip, "limit": limit})
+    logger.info({"event": "categories_fetched", "count": len(categories), "skip": skip, "limit": limit,
+                 "after_id": after_id})
     
+    if (next_page := next_cursor(categories, limit, lambda category: (category.id,))) is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     return categories
 
 
@@ -1,13 +1,43 @@
 import os
+import time
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
+from app.core import metrics
+
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./data/categories.db")
 
 engine = create_async_engine(DATABASE_URL, echo=True)
 
+DB_QUERY_DURATION = metrics.registry.histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ("operation",), buckets=metrics.FAST_BUCKETS)
+
+
+def instrument_engine(async_engine: AsyncEngine):
+    """Замеряет время каждого SQL-запроса движка в db_query_duration_seconds."""
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            operation = statement.lstrip().split(None, 1)[0].upper()
+            DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+
+instrument_engine(engine)
+
+if hasattr(os, "register_at_fork"):
+    # Процесс, созданный fork после импорта (например, gunicorn --preload), не должен
+    # пользоваться соединениями родителя: пул дочернего процесса начинается пустым
+    os.register_at_fork(after_in_child=lambda: engine.sync_engine.dispose(close=False))
+
 # Base для декларативного определения моделей
 class Base(DeclarativeBase):
     pass
@@ -18,8 +48,3 @@ AsyncSessionLocal = async_sessionmaker(
     class_=AsyncSession,
     expire_on_commit=False
 )
-
-
-async def create_db_and_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
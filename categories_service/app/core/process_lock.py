@@ -0,0 +1,51 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: flock нет, каждый воркер считает блокировку своей
+    fcntl = None
+
+
+class ProcessLock:
+    """Неблокирующая файловая блокировка между процессами одного хоста.
+
+    Держится, пока открыт файл, поэтому при завершении процесса-владельца
+    (в том числе аварийном) освобождается сама. Без fcntl (Windows) блокировка
+    ничего не исключает: try_acquire всегда успешен, и consumer запускает
+    каждый воркер - как отдельные реплики, которые делят одну очередь RPC.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is None:
+            self._fd = None
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
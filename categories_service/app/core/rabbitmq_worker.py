@@ -1,5 +1,7 @@
 import asyncio
+import json
 import os
+import time
 import aio_pika
 
 from typing import Optional
@@ -9,16 +11,61 @@ from app.core.database import AsyncSessionLocal
 from app.repositories.categories import CategoryRepository
 from app.services.categories import CategoryService
 from app.core.logging import get_logger
+from app.core.process_lock import ProcessLock
+from app.core import metrics
 
 logger = get_logger("categories_service")
 
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
 
+# При нескольких процессах-воркерах consumer работает только в том, кто взял блокировку;
+# пустое значение - consumer в каждом процессе (конкурирующие потребители одной очереди)
+RPC_CONSUMER_LOCK_FILE = os.getenv("RPC_CONSUMER_LOCK_FILE", "/tmp/categories_rpc_consumer.lock")
+RPC_CONSUMER_LOCK_RETRY_S = float(os.getenv("RPC_CONSUMER_LOCK_RETRY_S", 5.0))
+
+# Пакетный запрос: {"ids": [...]} с этим content_type; больше RPC_MAX_BATCH_IDS id - некорректный запрос
+BATCH_CONTENT_TYPE = "application/json"
+RPC_MAX_BATCH_IDS = int(os.getenv("RPC_MAX_BATCH_IDS", 1000))
+
+RPC_HANDLER_DURATION = metrics.registry.histogram(
+    "rpc_server_duration_seconds", "Время обработки RPC-запроса до отправки ответа", ("queue", "result"))
+RPC_BATCH_SIZE = metrics.registry.histogram(
+    "rpc_server_batch_size", "Число id в пакетном RPC-запросе", (),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+
+def parse_batch_request(body: bytes) -> list[int]:
+    """id категорий из пакетного запроса {"ids": [1, 2, 3]}."""
+    ids = json.loads(body)["ids"]
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise TypeError("ids must be a list of integers")
+    if len(ids) > RPC_MAX_BATCH_IDS:
+        raise ValueError(f"too many ids: {len(ids)} > {RPC_MAX_BATCH_IDS}")
+    return ids
+
+
+async def check_categories_exist(category_ids: list[int]) -> dict[int, bool]:
+    """Существование каждой категории из списка - одним запросом WHERE id IN (...)."""
+    async with AsyncSessionLocal() as db:
+        service = CategoryService(category_repo=CategoryRepository(db=db))
+        found = {category.id for category in await service.get_categories_by_ids(category_ids)}
+    return {category_id: category_id in found for category_id in category_ids}
+
 
 async def process_category_check(
         message: AbstractIncomingMessage, default_exchange: AbstractExchange
 ):
-    """Обрабатывает входящий RPC-запрос на проверку категории."""
+    """Обрабатывает входящий RPC-запрос на проверку категории.
+
+    Одиночный запрос - id текстом в теле, ответ b"true" / b"false".
+    Пакетный запрос (content_type application/json) - {"ids": [...]},
+    ответ {"results": {"<id>": true|false}} на все id сразу.
+    """
+    if message.content_type == BATCH_CONTENT_TYPE:
+        await process_category_batch(message, default_exchange)
+        return
+
+    started = time.perf_counter()
     async with message.process():
         response = b"false"
         category_id = None 
@@ -78,6 +125,8 @@ async def process_category_check(
                     routing_key=message.reply_to,
                 )
                 
+                RPC_HANDLER_DURATION.labels("category_check_queue", response.decode()).observe(
+                    time.perf_counter() - started)
                 logger.info({
                     "event": "rpc_response_sent",
                     "category_id": category_id,
@@ -94,6 +143,67 @@ async def process_category_check(
                 })
 
 
+async def process_category_batch(
+        message: AbstractIncomingMessage, default_exchange: AbstractExchange
+):
+    """Обрабатывает пакетный RPC-запрос: все id проверяются одним SELECT.
+
+    На некорректный или необработанный запрос отвечает {"error": ...}:
+    клиент отличит его от ответа "категории нет" и не закэширует.
+    """
+    started = time.perf_counter()
+    async with message.process():
+        category_ids: list[int] = []
+        result = "batch"
+        try:
+            category_ids = parse_batch_request(message.body)
+            results = await check_categories_exist(category_ids)
+            payload = {"results": {str(category_id): exists for category_id, exists in results.items()}}
+            logger.info({
+                "event": "rpc_batch_processed",
+                "requested": len(category_ids),
+                "found": sum(results.values()),
+                "correlation_id": message.correlation_id
+            })
+        except (ValueError, TypeError, KeyError) as e:
+            result = "invalid"
+            payload = {"error": "invalid_request"}
+            logger.warning({
+                "event": "rpc_invalid_request",
+                "error_type": type(e).__name__,
+                "message_body": message.body[:200].decode('utf-8', errors='ignore'),
+                "reason": "Unable to parse batch request"
+            })
+        except Exception as e:
+            result = "error"
+            payload = {"error": "processing_failed"}
+            logger.error({
+                "event": "rpc_processing_error",
+                "requested": len(category_ids),
+                "error_type": type(e).__name__,
+                "error_message": str(e)
+            })
+
+        if message.reply_to and message.correlation_id:
+            try:
+                await default_exchange.publish(
+                    aio_pika.Message(
+                        body=json.dumps(payload).encode(),
+                        content_type=BATCH_CONTENT_TYPE,
+                        correlation_id=message.correlation_id),
+                    routing_key=message.reply_to,
+                )
+                RPC_HANDLER_DURATION.labels("category_check_queue", result).observe(time.perf_counter() - started)
+                RPC_BATCH_SIZE.observe(len(category_ids))
+            except Exception as e:
+                logger.error({
+                    "event": "rpc_response_failed",
+                    "requested": len(category_ids),
+                    "error_type": type(e).__name__,
+                    "error_message": str(e)
+                })
+
+
 async def run_consumer():
     """Запускает consumer'а, который слушает очередь RPC-запросов."""
     connection: Optional[AbstractRobustConnection] = None
@@ -142,4 +252,30 @@ async def run_consumer():
     finally:
         if connection and not connection.is_closed:
             await connection.close()
-            logger.info({"event": "rabbitmq_connection_closed"})
\ No newline at end of file
+            logger.info({"event": "rabbitmq_connection_closed"})
+
+
+async def run_exclusive_consumer(lock_path: str | None = RPC_CONSUMER_LOCK_FILE,
+                                 retry_s: float = RPC_CONSUMER_LOCK_RETRY_S, consumer=None):
+    """Запускает consumer в одном процессе хоста.
+
+    Воркеры uvicorn пытаются взять файловую блокировку; consumer запускает тот,
+    кто её взял, остальные проверяют её раз в retry_s и подхватывают consumer,
+    если процесс-владелец завершился.
+    """
+    consumer = consumer or run_consumer
+    if not lock_path:
+        await consumer()
+        return
+    lock = ProcessLock(lock_path)
+    waiting_logged = False
+    while not lock.try_acquire():
+        if not waiting_logged:
+            logger.info({"event": "rabbitmq_consumer_standby", "pid": os.getpid(), "lock_file": lock_path})
+            waiting_logged = True
+        await asyncio.sleep(retry_s)
+    logger.info({"event": "rabbitmq_consumer_lock_acquired", "pid": os.getpid(), "lock_file": lock_path})
+    try:
+        await consumer()
+    finally:
+        lock.release()
@@ -1,22 +1,29 @@
 import asyncio
-import time
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.api.routers import categories
-from app.core.database import create_db_and_tables
-from app.core.rabbitmq_worker import run_consumer
+from app.migrations import run_migrations
+from app.core.rabbitmq_worker import run_exclusive_consumer
 from app.core.logging import get_logger
+from app.core.middleware import RequestLoggingMiddleware
+from app.core import metrics
 
 logger = get_logger("categories_service")
 
+# Применять миграции БД при старте; false - только через python -m app.migrations upgrade
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info({"event": "service_startup"})
-    # Запускаем consumer как фоновую задачу
-    consumer_task = asyncio.create_task(run_consumer())
-    await create_db_and_tables()
+    # Запускаем consumer как фоновую задачу; при нескольких воркерах - только в одном из них
+    consumer_task = asyncio.create_task(run_exclusive_consumer())
+    if MIGRATE_ON_STARTUP:
+        await run_migrations()
     logger.info({"event": "service_ready"})
     yield
     consumer_task.cancel()
@@ -30,37 +37,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    logger.info({
-        "event": "request_started",
-        "method": request.method,
-        "path": str(request.url.path),
-        "client_ip": request.client.host if request.client else None
-    })
-    
-    response = await call_next(request)
-    
-    process_time_ms = (time.time() - start_time) * 1000
-    
-    log_data = {
-        "event": "request_completed",
-        "method": request.method,
-        "path": str(request.url.path),
-        "status_code": response.status_code,
-        "duration_ms": round(process_time_ms, 2)
-    }
-    
-    if response.status_code >= 500:
-        logger.error(log_data)
-    elif response.status_code >= 400:
-        logger.warning(log_data)
-    else:
-        logger.info(log_data)
-    
-    return response
+# Логирование и метрики запросов - чистое ASGI-middleware, без BaseHTTPMiddleware
+app.add_middleware(RequestLoggingMiddleware, logger=logger)
 
 
 
@@ -71,3 +49,9 @@ app.include_router(categories.router)
 async def health_check():
     """Healthcheck"""
     return {"status": "healthy", "service": "categories_service"}
+
+
+@app.get("/metrics")
+async def service_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
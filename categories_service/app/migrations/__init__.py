@@ -0,0 +1,25 @@
+"""Миграции схемы БД категорий, по возрастанию версии.
+
+Новая миграция добавляется в конец MIGRATIONS со следующим номером;
+применённые миграции не меняются. Модели в app/models описывают ту же
+схему, что получается после всех миграций.
+"""
+from app.core.database import engine
+from app.core.logging import get_logger
+from app.core.migrations import Migration, migrate
+
+logger = get_logger("categories_service")
+
+MIGRATIONS = [
+    # IF NOT EXISTS: базы, созданные раньше через Base.metadata.create_all, принимаются как версия 1.
+    # Поиск по имени (проверка дубликата) идёт по индексу ограничения UNIQUE (name),
+    # по id и ?ids= - по первичному ключу, отдельные индексы не нужны
+    Migration(1, "create_categories", (
+        "CREATE TABLE IF NOT EXISTS categories ("
+        "id INTEGER NOT NULL, name VARCHAR, PRIMARY KEY (id), UNIQUE (name))",
+    )),
+]
+
+
+async def run_migrations(target: int | None = None) -> list[Migration]:
+    return await migrate(engine, MIGRATIONS, target=target, logger=logger)
@@ -12,12 +12,19 @@ class CategoryRepository:
         result = await self.db.scalar(select(Category).filter(Category.id == category_id))
         return result
 
+    async def get_by_ids(self, category_ids: list[int]) -> list[Category]:
+        result = await self.db.scalars(select(Category).filter(Category.id.in_(category_ids)))
+        return result.all()
+
     async def get_by_name(self, name: str) -> Category | None:
         result = await self.db.scalar(select(Category).filter(Category.name == name))
         return result
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> list[Category]:
-        result = await self.db.scalars(select(Category).offset(skip).limit(limit))
+    async def get_all(self, skip: int = 0, limit: int = 100, after_id: int | None = None) -> list[Category]:
+        """Страница категорий по возрастанию id: после after_id (курсор) или со смещением skip."""
+        query = select(Category).order_by(Category.id).limit(limit)
+        query = query.filter(Category.id > after_id) if after_id is not None else query.offset(skip)
+        result = await self.db.scalars(query)
         return result.all()
 
     async def create(self, name: str) -> Category:
@@ -6,8 +6,13 @@ class CategoryService:
     def __init__(self, category_repo: CategoryRepository):
         self.category_repo = category_repo
 
-    async def get_all_categories(self, skip: int = 0, limit: int = 100) -> list[CategorySchema]:
-        db_categories = await self.category_repo.get_all(skip=skip, limit=limit)
+    async def get_all_categories(self, skip: int = 0, limit: int = 100,
+                                 after_id: int | None = None) -> list[CategorySchema]:
+        db_categories = await self.category_repo.get_all(skip=skip, limit=limit, after_id=after_id)
+        return [CategorySchema.model_validate(obj) for obj in db_categories]
+
+    async def get_categories_by_ids(self, category_ids: list[int]) -> list[CategorySchema]:
+        db_categories = await self.category_repo.get_by_ids(list(set(category_ids)))
         return [CategorySchema.model_validate(obj) for obj in db_categories]
 
     async def get_category_by_id(self, category_id: int) -> CategorySchema | None:
@@ -5,7 +5,9 @@ from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.main import app
-from app.core.database import Base
+from app.migrations import MIGRATIONS
+from app.core.database import instrument_engine
+from app.core.migrations import migrate
 from app.core.dependencies import get_async_db
 from app.models.category import Category
 
@@ -13,10 +15,10 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 @pytest_asyncio.fixture(scope="session")
 async def test_engine():
-    """Создаёт движок БД один раз на все тесты"""
+    """Создаёт движок БД один раз на все тесты, схема - через миграции, как в сервисе"""
     engine = create_async_engine(TEST_DATABASE_URL, echo = False, future = True)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    instrument_engine(engine)
+    await migrate(engine, MIGRATIONS)
     try:
         yield engine
     finally:
@@ -86,8 +86,56 @@ async def test_get_categories_with_pagination(client):
     assert data[1]["name"] == "Category3"
 
 
+@pytest.mark.asyncio
+async def test_get_categories_with_cursor(client):
+    """Тест: следующая страница по курсору совпадает со страницей по skip"""
+    for i in range(5):
+        await client.post("/categories/", json={"name": f"Category{i}"})
+
+    first = await client.get("/categories/?limit=2")
+    response = await client.get(f"/categories/?limit=2&cursor={first.headers['x-next-cursor']}")
+
+    assert response.status_code == 200
+    assert [c["name"] for c in response.json()] == ["Category2", "Category3"]
+
+    last = await client.get(f"/categories/?limit=2&cursor={response.headers['x-next-cursor']}")
+    assert [c["name"] for c in last.json()] == ["Category4"]
+    assert "x-next-cursor" not in last.headers
+    assert (await client.get("/categories/?cursor=e30")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_categories_by_ids(client):
+    """Тест: получение категорий по списку ID с повторами и несуществующими ID"""
+    tech = (await client.post("/categories/", json={"name": "Tech"})).json()
+    await client.post("/categories/", json={"name": "Sports"})
+    music = (await client.post("/categories/", json={"name": "Music"})).json()
+    
+    response = await client.get("/categories/", params=[("ids", tech["id"]), ("ids", music["id"]),
+                                                       ("ids", music["id"]), ("ids", 999)])
+    
+    assert response.status_code == 200
+    assert sorted(category["name"] for category in response.json()) == ["Music", "Tech"]
+    
+    response = await client.get("/categories/", params=[("ids", i) for i in range(1, 102)])
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_create_category_invalid_data(client):
     """Тест: создание категории с невалидными данными"""
     response = await client.post("/categories/", json={"name": ""})
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    """Тест: /metrics отдаёт гистограммы запросов по шаблону маршрута и SQL-запросов"""
+    await client.get("/categories/999")
+    
+    response = await client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert ('http_request_duration_seconds_count{method="GET",route="/categories/{category_id}",status_code="404"}'
+            in response.text)
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in response.text
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.core import process_lock
+from app.core.process_lock import ProcessLock
+from app.core.rabbitmq_worker import run_exclusive_consumer
+
+
+def test_process_lock_is_exclusive(tmp_path):
+    """Тест: блокировку держит один владелец, после освобождения её берёт следующий"""
+    path = str(tmp_path / "consumer.lock")
+    first, second = ProcessLock(path), ProcessLock(path)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+
+def test_process_lock_without_fcntl_never_blocks(tmp_path, monkeypatch):
+    """Тест: без fcntl (Windows) блокировку получает каждый, файл не создаётся"""
+    monkeypatch.setattr(process_lock, "fcntl", None)
+    path = tmp_path / "consumer.lock"
+    first, second = ProcessLock(str(path)), ProcessLock(str(path))
+
+    assert first.try_acquire() and second.try_acquire()
+    first.release()
+    assert not first.held and second.held
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_runs_consumer(tmp_path):
+    """Тест: из двух воркеров consumer запускает один, второй подхватывает его после остановки первого"""
+    path = str(tmp_path / "consumer.lock")
+    running = []
+    stop = asyncio.Event()
+
+    def make_consumer(name):
+        async def consumer():
+            running.append(name)
+            await stop.wait()
+        return consumer
+
+    first = asyncio.create_task(run_exclusive_consumer(path, 0.01, consumer=make_consumer("first")))
+    second = asyncio.create_task(run_exclusive_consumer(path, 0.01, consumer=make_consumer("second")))
+    await asyncio.sleep(0.05)
+    assert running == ["first"]
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    await asyncio.sleep(0.05)
+    assert running == ["first", "second"]
+
+    stop.set()
+    await second
@@ -0,0 +1,61 @@
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core import rabbitmq_worker
+from app.models.category import Category
+
+
+class FakeMessage:
+    def __init__(self, body: bytes, content_type: str | None = None):
+        self.body = body
+        self.content_type = content_type
+        self.reply_to = "reply_queue"
+        self.correlation_id = "corr-1"
+
+    @asynccontextmanager
+    async def process(self):
+        yield
+
+
+class FakeExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append(message)
+
+
+@pytest.fixture()
+def worker_db(monkeypatch, async_session_maker):
+    monkeypatch.setattr(rabbitmq_worker, "AsyncSessionLocal", async_session_maker)
+
+
+@pytest.mark.asyncio
+async def test_batch_and_single_requests(db_session, worker_db):
+    """Тест: пакетный запрос отвечает картой id -> найдена, одиночный текстовый - как раньше"""
+    db_session.add_all([Category(id=1, name="Tech"), Category(id=3, name="News")])
+    await db_session.commit()
+    exchange = FakeExchange()
+
+    await rabbitmq_worker.process_category_check(
+        FakeMessage(b'{"ids": [1, 2, 3, 1]}', rabbitmq_worker.BATCH_CONTENT_TYPE), exchange)
+    await rabbitmq_worker.process_category_check(FakeMessage(b"3"), exchange)
+    await rabbitmq_worker.process_category_check(FakeMessage(b"2"), exchange)
+
+    batch, single_found, single_missing = exchange.published
+    assert json.loads(batch.body) == {"results": {"1": True, "2": False, "3": True}}
+    assert batch.correlation_id == "corr-1"
+    assert (single_found.body, single_missing.body) == (b"true", b"false")
+
+
+@pytest.mark.asyncio
+async def test_invalid_batch_request(worker_db):
+    """Тест: некорректный пакет получает ответ с ошибкой, а не "категорий нет" """
+    exchange = FakeExchange()
+
+    await rabbitmq_worker.process_category_check(
+        FakeMessage(b'{"ids": ["1"]}', rabbitmq_worker.BATCH_CONTENT_TYPE), exchange)
+
+    assert json.loads(exchange.published[0].body) == {"error": "invalid_request"}
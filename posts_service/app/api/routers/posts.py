@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.core.dependencies import get_post_service
-from app.schemas.post import Post, PostBase
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, next_cursor
+from app.schemas.post import Post, PostBase, PostBulkCreate, PostBulkResult
 from app.services.posts import PostService
 from app.core.logging import get_logger
 
 logger = get_logger("posts_service")
 
+# Ограничения поиска: длина запроса и размер страницы
+MAX_SEARCH_QUERY_LENGTH = 200
+MAX_SEARCH_LIMIT = 100
+
 router = APIRouter(
     prefix="/posts",
     tags=["posts"],
@@ -16,19 +21,83 @@ router = APIRouter(
 
 @router.get("/", response_model=list[Post])
 async def read_posts(
+    response: Response,
     category_id: int | None = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
     post_service: PostService = Depends(get_post_service), # Инъекция сервиса поста
 ):
-    """Получить список всех постов или постов по ID категории."""
+    """Получить список всех постов или постов по ID категории.
+
+    Страницы идут по возрастанию id. Если страница полная, в заголовке
+    X-Next-Cursor приходит курсор следующей: ?cursor=... выбирает её по
+    индексу, не пропуская строки, как skip.
+    """
+    after_id = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="cursor and skip cannot be used together")
+        try:
+            if category_id is not None:
+                cursor_category_id, after_id = decode_cursor(cursor, int, int)
+                if cursor_category_id != category_id:
+                    raise InvalidCursor("Cursor belongs to another category_id")
+            else:
+                after_id, = decode_cursor(cursor, int)
+        except InvalidCursor as e:
+            logger.warning({"event": "read_posts_invalid_cursor", "category_id": category_id, "reason": str(e)})
+            raise HTTPException(status_code=400, detail=str(e))
+
     if category_id is not None:
-        posts = await post_service.get_posts_by_category(category_id=category_id, skip=skip, limit=limit)
+        posts = await post_service.get_posts_by_category(category_id=category_id, skip=skip, limit=limit,
+                                                         after_id=after_id)
         logger.info({"event": "read_posts_by_category_id", "category_id": category_id, "count": len(posts)})
+        cursor_key = lambda post: (post.category_id, post.id)
     else:
-        posts = await post_service.get_all_posts(skip=skip, limit=limit)
+        posts = await post_service.get_all_posts(skip=skip, limit=limit, after_id=after_id)
         logger.info({"event": "read_posts", "count": len(posts)})  
-        
+        cursor_key = lambda post: (post.id,)
+
+    if (next_page := next_cursor(posts, limit, cursor_key)) is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
+    return posts
+
+
+@router.get("/search", response_model=list[Post])
+async def search_posts(
+    response: Response,
+    q: str | None = Query(None, min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH),
+    prefix: str | None = Query(None, min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: str | None = None,
+    post_service: PostService = Depends(get_post_service),
+):
+    """Поиск постов: ?q= - по словам в заголовке и тексте, ?prefix= - по началу заголовка.
+
+    ?q= возвращает посты от самых релевантных (bm25), ?prefix= - по
+    алфавиту заголовков, для подсказок при вводе. Следующая страница -
+    по курсору из X-Next-Cursor, как в GET /posts/.
+    """
+    if (q is None) == (prefix is None):
+        raise HTTPException(status_code=400, detail="Exactly one of q and prefix is required")
+    try:
+        if q is not None:
+            after = decode_cursor(cursor, float, int) if cursor is not None else None
+            found = await post_service.search_posts(q, limit=limit, after=after)
+            posts = [post for post, _ in found]
+            next_page = next_cursor(found, limit, lambda item: (item[1], item[0].id))
+        else:
+            after = decode_cursor(cursor, str, int) if cursor is not None else None
+            posts = await post_service.autocomplete_posts(prefix, limit=limit, after=after)
+            next_page = next_cursor(posts, limit, lambda post: (post.title, post.id))
+    except InvalidCursor as e:
+        logger.warning({"event": "search_posts_invalid_cursor", "reason": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info({"event": "search_posts", "mode": "fts" if q is not None else "prefix", "count": len(posts)})
+    if next_page is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     return posts
 
 
@@ -48,6 +117,22 @@ async def create_post(
     return db_post
 
 
+@router.post("/bulk", response_model=PostBulkResult)
+async def create_posts_bulk(
+        bulk: PostBulkCreate,
+        post_service: PostService = Depends(get_post_service)
+):
+    """Создать до MAX_POSTS_PER_BULK постов одним запросом.
+
+    Ответ 200 и для частично успешной пачки: ids - id созданных постов в
+    порядке запроса (null для несозданных), errors - причина по индексу поста.
+    """
+    result = await post_service.create_posts_bulk(bulk.posts)
+    logger.info({"event": "create_posts_bulk", "requested": len(bulk.posts),
+                 "created": len(bulk.posts) - len(result.errors), "failed": len(result.errors)})
+    return result
+
+
 @router.get("/{post_id}", response_model=Post)
 async def read_post(
         post_id: int,
@@ -1,15 +1,245 @@
+import atexit
+import json
+import multiprocessing
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
 from loguru import logger
 
+try:
+    import orjson
+except ImportError:  # без orjson записи сериализуются стандартным json
+    orjson = None
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# false - логи не пишутся совсем (например, чтобы измерить их стоимость)
+LOG_ENABLED = os.getenv("LOG_ENABLED", "true").lower() == "true"
+# Сериализация и запись в stdout в отдельном потоке; false - прямо в месте вызова через loguru
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+# Сколько записей может ждать потока-писателя, остальные отбрасываются
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Как часто поток-писатель забирает записи: реже - крупнее пачки и меньше борьбы за GIL
+LOG_FLUSH_INTERVAL_S = float(os.getenv("LOG_FLUSH_INTERVAL_S", 0.05))
+
+
+def parse_sampling(raw: str) -> dict[str, float]:
+    """Разбирает строку вида "gateway_request_received=0.1,proxy_forwarding=0"."""
+    rates = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+# Доля событий каждого типа, которая попадает в лог; не указанные пишутся все
+LOG_SAMPLING = parse_sampling(os.getenv("LOG_SAMPLING", ""))
+
+_START_TIME = time.time()
+
+
+def serialize_record(record: tuple) -> bytes:
+    """Сериализует запись в ту же JSON-структуру, что loguru с serialize=True."""
+    (level_name, message, timestamp, path, function, line, name,
+     process_id, process_name, thread_id, thread_name, extra) = record
+    level = logger.level(level_name)
+    moment = datetime.fromtimestamp(timestamp).astimezone()
+    elapsed = timedelta(seconds=timestamp - _START_TIME)
+    file_name = os.path.basename(path)
+    data = {
+        "text": f"{moment:%Y-%m-%d %H:%M:%S} | {level_name} | {message}\n",
+        "record": {
+            "elapsed": {"repr": str(elapsed), "seconds": elapsed.total_seconds()},
+            "exception": None,
+            "extra": extra,
+            "file": {"name": file_name, "path": path},
+            "function": function,
+            "level": {"icon": level.icon, "name": level_name, "no": level.no},
+            "line": line,
+            "message": message,
+            "module": os.path.splitext(file_name)[0],
+            "name": name,
+            "process": {"id": process_id, "name": process_name},
+            "thread": {"id": thread_id, "name": thread_name},
+            "time": {"repr": str(moment), "timestamp": timestamp},
+        },
+    }
+    if orjson is not None:
+        return orjson.dumps(data, default=str) + b"\n"
+    return (json.dumps(data, default=str, ensure_ascii=False) + "\n").encode()
+
+
+_STOP = object()
+
+
+class LogWriter:
+    """Пишет записи логов в поток вывода из фонового потока.
+
+    В месте вызова запись только кладётся в ограниченную очередь; JSON и
+    запись в stdout делает поток-писатель, пачками. Если писатель не
+    успевает и очередь заполнена, запись отбрасывается и учитывается в
+    dropped, а в лог потом попадает событие log_records_dropped.
+    """
+
+    def __init__(self, stream=None, max_queue: int = LOG_QUEUE_SIZE, batch_size: int = 1024,
+                 flush_interval_s: float = LOG_FLUSH_INTERVAL_S):
+        self._stream = stream
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._process_name = ""
+        self._extra: dict = {}
+        self.written = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+
+    def emit(self, level_name: str, message, frame, extra: dict):
+        if self._pid != os.getpid():
+            # Первая запись или процесс после fork: поток родителя здесь не существует
+            self._start()
+        thread = threading.current_thread()
+        code = frame.f_code
+        record = (level_name, str(message), time.time(), code.co_filename, code.co_name, frame.f_lineno,
+                  frame.f_globals.get("__name__"), self._pid, self._process_name,
+                  thread.ident, thread.name, extra)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._max_queue)
+            self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                            name="log-writer", daemon=True)
+            self._process_name = multiprocessing.current_process().name
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self, records: queue.Queue):
+        stream = self._stream or sys.stdout
+        output = getattr(stream, "buffer", None)
+        while True:
+            batch = [records.get()]
+            if self._flush_interval_s and batch[0] is not _STOP:
+                # Даём набраться пачке, а не просыпаемся на каждую запись
+                time.sleep(self._flush_interval_s)
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is _STOP for record in batch)
+            lines = [serialize_record(record) for record in batch if record is not _STOP]
+            if lines:
+                # Сообщение о потерях уйдёт с теми же полями extra (имя сервиса)
+                self._extra = next(record for record in batch if record is not _STOP)[-1]
+                data = b"".join(lines)
+                if output is not None:
+                    output.write(data)
+                else:
+                    stream.write(data.decode())
+                stream.flush()
+                self.written += len(lines)
+            if stop:
+                return
+            if self.dropped > self._reported_dropped and records.empty():
+                lost = self.dropped - self._reported_dropped
+                self._reported_dropped = self.dropped
+                self.emit("WARNING", {"event": "log_records_dropped", "count": lost, "total": self.dropped},
+                          sys._getframe(), self._extra)
+
+    def close(self, timeout: float = 5.0):
+        """Дописывает очередь и останавливает поток-писатель."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped,
+                "queued": self._queue.qsize() if self._queue is not None else 0}
+
+
+class EventLogger:
+    """Логгер сервиса: принимает событие-словарь с ключом "event".
+
+    Решение о выборке принимается до того, как запись будет собрана и
+    отформатирована, поэтому отброшенное событие почти ничего не стоит. С
+    потоком-писателем в месте вызова запоминаются только сообщение и место
+    вызова; без него запись целиком делает loguru, как раньше.
+    """
+
+    __slots__ = ("_extra", "_writer", "_min_level", "_logger")
+
+    def __init__(self, service_name: str, writer: LogWriter | None = None, level: str = LOG_LEVEL):
+        self._extra = {"service": service_name}
+        self._writer = writer
+        self._min_level = logger.level(level).no
+        # depth=2: в записи остаются модуль, функция и строка вызывающего кода
+        self._logger = logger.bind(service=service_name).opt(depth=2)
+
+    def _log(self, level_name: str, level_no: int, message):
+        if not _sampled(message):
+            return
+        if self._writer is None:
+            self._logger.log(level_name, message)
+        elif level_no >= self._min_level:
+            self._writer.emit(level_name, message, sys._getframe(2), self._extra)
+
+    def debug(self, message):
+        self._log("DEBUG", 10, message)
+
+    def info(self, message):
+        self._log("INFO", 20, message)
+
+    def warning(self, message):
+        self._log("WARNING", 30, message)
+
+    def error(self, message):
+        self._log("ERROR", 40, message)
+
+
+def _sampled(message) -> bool:
+    if not LOG_SAMPLING or not isinstance(message, dict):
+        return True
+    rate = LOG_SAMPLING.get(message.get("event"))
+    return rate is None or random.random() < rate
+
+
+writer = LogWriter()
+
 logger.remove()
 
-logger.add(
-    sys.stdout,
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-    serialize=True,  # JSON
-    level="INFO"
-)
+if LOG_ENABLED and LOG_ASYNC:
+    atexit.register(writer.close)
+elif LOG_ENABLED:
+    logger.add(
+        sys.stdout,
+        format=LOG_FORMAT,
+        serialize=True,  # JSON
+        level=LOG_LEVEL
+    )
+
 
-def get_logger(service_name: str):
+def get_logger(service_name: str) -> EventLogger:
     """Возвращает logger с привязанным именем сервиса"""
-    return logger.bind(service=service_name)
\ No newline at end of file
+    if LOG_ENABLED and LOG_ASYNC:
+        return EventLogger(service_name, writer)
+    return EventLogger(service_name)
@@ -0,0 +1,120 @@
+"""Версионные миграции схемы БД.
+
+Миграция - номер версии, имя и SQL-операторы. Применённые версии
+записываются в таблицу schema_migrations; migrate() применяет
+недостающие по возрастанию версии в одной транзакции, поэтому при
+ошибке схема остаётся в прежнем состоянии. В SQLite транзакция
+открывается как BEGIN IMMEDIATE: если миграции одновременно запускают
+несколько процессов-воркеров, остальные ждут первого и затем видят, что
+применять уже нечего.
+
+Откат миграций не поддерживается: схема только развивается вперёд.
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Sequence
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: tuple[str, ...]
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+CREATE_VERSIONS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations "
+    "(version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TEXT NOT NULL)"
+)
+
+
+def _check_order(migrations: Sequence[Migration]):
+    versions = [migration.version for migration in migrations]
+    if versions != sorted(set(versions)):
+        raise MigrationError(f"Migration versions must be unique and ascending: {versions}")
+
+
+async def _begin(conn: AsyncConnection):
+    if conn.dialect.name == "sqlite":
+        # Сразу берёт блокировку записи, чтобы два процесса не применили одну миграцию дважды
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def _applied(conn: AsyncConnection) -> dict[int, str]:
+    result = await conn.exec_driver_sql("SELECT version, applied_at FROM schema_migrations")
+    return dict(result.all())
+
+
+async def migrate(engine: AsyncEngine, migrations: Sequence[Migration], target: int | None = None,
+                  logger=None) -> list[Migration]:
+    """Применяет недостающие миграции до target включительно (по умолчанию все), возвращает применённые."""
+    _check_order(migrations)
+    known = {migration.version for migration in migrations}
+    async with engine.connect() as conn:
+        await _begin(conn)
+        await conn.exec_driver_sql(CREATE_VERSIONS_TABLE)
+        applied = await _applied(conn)
+        unknown = sorted(set(applied) - known)
+        if unknown:
+            await conn.rollback()
+            raise MigrationError(f"Database has migrations unknown to this code: {unknown}")
+
+        pending = [migration for migration in migrations
+                   if migration.version not in applied and (target is None or migration.version <= target)]
+        for migration in pending:
+            started = time.perf_counter()
+            for statement in migration.statements:
+                await conn.exec_driver_sql(statement)
+            await conn.exec_driver_sql(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now(timezone.utc).isoformat()))
+            if logger is not None:
+                logger.info({"event": "migration_applied", "version": migration.version, "name": migration.name,
+                             "duration_ms": round((time.perf_counter() - started) * 1000, 2)})
+        await conn.commit()
+    return pending
+
+
+async def migration_status(engine: AsyncEngine, migrations: Sequence[Migration]) -> list[dict]:
+    """Список миграций с датой применения (None - ещё не применена)."""
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql(CREATE_VERSIONS_TABLE)
+        applied = await _applied(conn)
+        await conn.commit()
+    return [{"version": migration.version, "name": migration.name, "applied_at": applied.get(migration.version)}
+            for migration in migrations]
+
+
+def run_cli(engine: AsyncEngine, migrations: Sequence[Migration], argv: Sequence[str] | None = None):
+    """Командная строка миграций: upgrade [--to N] и status."""
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Миграции схемы БД")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade = commands.add_parser("upgrade", help="применить недостающие миграции")
+    upgrade.add_argument("--to", type=int, help="последняя применяемая версия")
+    commands.add_parser("status", help="показать применённые и ожидающие миграции")
+    args = parser.parse_args(argv)
+
+    async def run():
+        try:
+            if args.command == "upgrade":
+                applied = await migrate(engine, migrations, target=args.to)
+                for migration in applied:
+                    print(f"applied {migration.version:04d} {migration.name}")
+                if not applied:
+                    print("schema is up to date")
+            else:
+                for row in await migration_status(engine, migrations):
+                    print(f"{row['version']:04d} {row['name']:<32} {row['applied_at'] or 'pending'}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+"""Постраничная выборка по ключу (keyset pagination).
+
+Курсор - непрозрачная для клиента строка с ключом последней записи
+страницы, например (id), (category_id, id) или (title, id). Следующая
+страница выбирается условием "ключ больше курсора" по индексу, поэтому
+её стоимость не зависит от глубины, в отличие от OFFSET, который читает
+и выбрасывает все пропущенные строки.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Callable, Sequence
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*key: int | float | str) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Разбирает курсор с ключом заданных типов, например (int, int); при любой ошибке - InvalidCursor."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor") from None
+    if not isinstance(key, list) or len(key) != len(types):
+        raise InvalidCursor("Invalid cursor")
+    values = []
+    for value, expected in zip(key, types):
+        if isinstance(value, bool):
+            raise InvalidCursor("Invalid cursor")
+        if expected is float and isinstance(value, int):
+            value = float(value)
+        if not isinstance(value, expected):
+            raise InvalidCursor("Invalid cursor")
+        values.append(value)
+    return tuple(values)
+
+
+def next_cursor(items: Sequence[Any], limit: int, key: Callable[[Any], tuple]) -> str | None:
+    """Курсор следующей страницы; None, если страница неполная и дальше записей нет."""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(*key(items[-1]))
@@ -1,16 +1,62 @@
 # app/infrastructure/rabbitmq.py
 
 import asyncio
+import functools
+import json
+import time
 import uuid
-from typing import Optional
+from collections import OrderedDict
+from typing import Callable, Optional
 
 import aio_pika
 from aio_pika.abc import AbstractIncomingMessage
 
 import os
 
+from app.core import metrics
+from app.core.logging import get_logger
+
+logger = get_logger("posts_service")
+
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
 
+# Кэш проверок существования категорий: число записей, TTL для найденных и ненайденных id.
+# TTL 0 отключает кэширование этого вида ответов. Событий об изменении категорий нет,
+# поэтому запись живёт до конца TTL: если в categories_service категорию удалят,
+# посты в неё принимаются ещё до CATEGORY_CACHE_TTL_S секунд
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", 10000))
+CATEGORY_CACHE_TTL_S = float(os.getenv("CATEGORY_CACHE_TTL_S", 60.0))
+CATEGORY_CACHE_NEGATIVE_TTL_S = float(os.getenv("CATEGORY_CACHE_NEGATIVE_TTL_S", 5.0))
+
+# Пакетные проверки: промахи кэша за окно (мс) или до max_ids id уходят одним RPC-сообщением.
+# 0 - каждая проверка отдельным сообщением, как раньше
+CATEGORY_RPC_BATCH_WINDOW_MS = float(os.getenv("CATEGORY_RPC_BATCH_WINDOW_MS", 2.0))
+CATEGORY_RPC_BATCH_MAX_IDS = int(os.getenv("CATEGORY_RPC_BATCH_MAX_IDS", 100))
+# Через сколько секунд после ответа "пакеты не поддерживаются" снова пробовать пакет:
+# во время обновления categories_service ответить по-старому может одна ещё не обновлённая реплика
+CATEGORY_RPC_BATCH_RETRY_S = float(os.getenv("CATEGORY_RPC_BATCH_RETRY_S", 30.0))
+BATCH_CONTENT_TYPE = "application/json"
+
+RPC_DURATION = metrics.registry.histogram(
+    "rpc_client_duration_seconds", "Время RPC-вызова от публикации до ответа", ("queue",))
+RPC_TIMEOUTS = metrics.registry.counter(
+    "rpc_client_timeouts", "RPC-вызовы без ответа за отведённое время", ("queue",))
+metrics.registry.callback_gauge(
+    "rpc_client_in_flight", "RPC-вызовы, ожидающие ответа", ("queue",),
+    lambda: [(("category_check_queue",), len(category_validator_instance.rpc_client.futures))])
+CATEGORY_CACHE_LOOKUPS = metrics.registry.counter(
+    "category_cache_lookups", "Проверки категорий по результату в кэше: hit, miss, coalesced", ("result",))
+metrics.registry.callback_gauge(
+    "category_cache_entries", "Записей в кэше проверок категорий", (),
+    lambda: [((), len(category_validator_instance.cache))])
+RPC_BATCH_SIZE = metrics.registry.histogram(
+    "rpc_client_batch_size", "Число id в пакетной проверке категорий", (),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+
+class BatchNotSupported(Exception):
+    """Ответ на пакетный запрос не в пакетном формате: categories_service старой версии."""
+
 
 class RpcClient:
     """Асинхронный RPC клиент для RabbitMQ."""
@@ -40,16 +86,43 @@ class RpcClient:
             future.set_result(message.body)
 
     async def call(self, category_id: int) -> Optional[bytes]:
+        """Проверка одной категории: b'true' / b'false', None - нет ответа за таймаут."""
+        return await self._request(str(category_id).encode())
+
+    async def call_many(self, category_ids: list[int]) -> Optional[dict[int, bool]]:
+        """Проверка нескольких категорий одним сообщением: id -> существует.
+
+        None - нет ответа за таймаут. Если сервис категорий не понимает
+        пакетный формат или не смог обработать запрос - BatchNotSupported
+        или RuntimeError соответственно.
+        """
+        response = await self._request(json.dumps({"ids": category_ids}).encode(), BATCH_CONTENT_TYPE)
+        if response is None:
+            return None
+        try:
+            payload = json.loads(response)
+        except ValueError:
+            # Старый обработчик не разбирает JSON и отвечает b"false"
+            raise BatchNotSupported(response[:100]) from None
+        if not isinstance(payload, dict):
+            raise BatchNotSupported(response[:100])
+        if "error" in payload:
+            raise RuntimeError(f"Batch category check failed: {payload['error']}")
+        return {int(category_id): bool(exists) for category_id, exists in payload["results"].items()}
+
+    async def _request(self, body: bytes, content_type: Optional[str] = None) -> Optional[bytes]:
         if not self.connection or self.connection.is_closed:
             raise ConnectionError("RPC Client is not connected.")
 
         correlation_id = str(uuid.uuid4())
         future = self.loop.create_future()
         self.futures[correlation_id] = future
+        started = time.perf_counter()
 
         await self.channel.default_exchange.publish(  # Use self.channel
             aio_pika.Message(
-                body=str(category_id).encode(),
+                body=body,
+                content_type=content_type,
                 correlation_id=correlation_id,
                 reply_to=self.callback_queue.name,
             ),
@@ -57,17 +130,118 @@ class RpcClient:
         )
 
         try:
-            return await asyncio.wait_for(future, timeout=5.0)
+            response = await asyncio.wait_for(future, timeout=5.0)
         except asyncio.TimeoutError:
             self.futures.pop(correlation_id, None)
+            RPC_TIMEOUTS.labels("category_check_queue").inc()
             return None
-        
-        
+        RPC_DURATION.labels("category_check_queue").observe(time.perf_counter() - started)
+        return response
+
+
+def _single_result(response: Optional[bytes]) -> Optional[bool]:
+    return None if response is None else response == b'true'
+
+
+class CategoryCheckBatcher:
+    """Собирает проверки категорий в пакетные RPC-вызовы.
+
+    Первый id пакета запускает таймер на window_s; все id, пришедшие до
+    его срабатывания (или пока их меньше max_ids), уходят одним
+    сообщением call_many, и categories_service проверяет их одним SELECT.
+    Если сервис категорий ещё старой версии и пакетный формат не
+    понимает, проверки идут по одной retry_s секунд, затем батчер снова
+    пробует пакет.
+    """
+
+    def __init__(self, rpc_client: RpcClient, window_s: float, max_ids: int,
+                 retry_s: float = CATEGORY_RPC_BATCH_RETRY_S, clock: Callable[[], float] = time.monotonic):
+        self.rpc_client = rpc_client
+        self.window_s = window_s
+        self.max_ids = max_ids
+        self.retry_s = retry_s
+        self._clock = clock
+        # До этого момента по clock пакеты не отправляются
+        self._unsupported_until = float("-inf")
+        self._pending: dict[int, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: set[asyncio.Task] = set()
+
+    @property
+    def supported(self) -> bool:
+        return self._clock() >= self._unsupported_until
+
+    async def check(self, category_id: int) -> Optional[bool]:
+        if not self.supported:
+            return _single_result(await self.rpc_client.call(category_id))
+        future = self._pending.get(category_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[category_id] = loop.create_future()
+            if len(self._pending) >= self.max_ids:
+                self.flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_s, self.flush)
+        return await asyncio.shield(future)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: dict[int, asyncio.Future]):
+        RPC_BATCH_SIZE.observe(len(batch))
+        try:
+            try:
+                results = await self.rpc_client.call_many(list(batch))
+            except BatchNotSupported:
+                self._unsupported_until = self._clock() + self.retry_s
+                logger.warning({"event": "rpc_batch_not_supported", "fallback": "single",
+                                "retry_in_s": self.retry_s})
+                responses = await asyncio.gather(*(self.rpc_client.call(category_id) for category_id in batch))
+                results = {category_id: _single_result(response) for category_id, response in zip(batch, responses)}
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for category_id, future in batch.items():
+            if not future.done():
+                future.set_result(None if results is None else results.get(category_id, False))
+
+
 class RabbitMQCategoryValidator:
-    """Реализация валидатора категорий через RabbitMQ RPC."""
+    """Реализация валидатора категорий через RabbitMQ RPC.
 
-    def __init__(self):
-        self.rpc_client = RpcClient()
+    Ответы кэшируются в LRU на ttl_s для существующих категорий и на
+    negative_ttl_s для несуществующих (категория может появиться позже).
+    Запись не сбрасывается раньше TTL, так что удаление категории становится
+    заметно не позже чем через ttl_s.
+    Одновременные проверки одного id ждут один общий RPC-вызов, промахи
+    по разным id собираются в пакетные вызовы (CategoryCheckBatcher).
+    Таймаут RPC не кэшируется: следующая проверка снова идёт в
+    categories_service.
+    """
+
+    def __init__(self, rpc_client: Optional[RpcClient] = None, cache_size: int = CATEGORY_CACHE_SIZE,
+                 ttl_s: float = CATEGORY_CACHE_TTL_S, negative_ttl_s: float = CATEGORY_CACHE_NEGATIVE_TTL_S,
+                 batch_window_s: float = CATEGORY_RPC_BATCH_WINDOW_MS / 1000,
+                 batch_max_ids: int = CATEGORY_RPC_BATCH_MAX_IDS, clock: Callable[[], float] = time.monotonic):
+        self.rpc_client = rpc_client or RpcClient()
+        self.batcher = CategoryCheckBatcher(self.rpc_client, batch_window_s, batch_max_ids, clock=clock) \
+            if batch_window_s > 0 and batch_max_ids > 1 else None
+        self.cache_size = cache_size
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self._clock = clock
+        # category_id -> (существует, момент истечения по clock)
+        self.cache: OrderedDict[int, tuple[bool, float]] = OrderedDict()
+        self._in_flight: dict[int, asyncio.Task] = {}
 
     async def connect(self):
         await self.rpc_client.connect()
@@ -76,10 +250,47 @@ class RabbitMQCategoryValidator:
         await self.rpc_client.close()
 
     async def check_exists(self, category_id: int) -> bool:
-        response = await self.rpc_client.call(category_id)
-        if response is None:
-            return False
-        return response == b'true'
+        entry = self.cache.get(category_id)
+        if entry is not None:
+            exists, expires_at = entry
+            if expires_at > self._clock():
+                self.cache.move_to_end(category_id)
+                CATEGORY_CACHE_LOOKUPS.labels("hit").inc()
+                return exists
+            del self.cache[category_id]
+
+        call = self._in_flight.get(category_id)
+        if call is None:
+            CATEGORY_CACHE_LOOKUPS.labels("miss").inc()
+            call = asyncio.ensure_future(self._load(category_id))
+            self._in_flight[category_id] = call
+            call.add_done_callback(functools.partial(self._store, category_id))
+        else:
+            CATEGORY_CACHE_LOOKUPS.labels("coalesced").inc()
+        # shield: отмена одного ожидающего не отменяет вызов, которого ждут остальные
+        return bool(await asyncio.shield(call))
+
+    async def _load(self, category_id: int) -> Optional[bool]:
+        """Ответ categories_service: существует ли категория; None - нет ответа."""
+        if self.batcher is not None:
+            return await self.batcher.check(category_id)
+        return _single_result(await self.rpc_client.call(category_id))
+
+    def _store(self, category_id: int, call: asyncio.Task):
+        if call.cancelled() or call.exception() is not None:
+            exists = None
+        else:
+            exists = call.result()
+        del self._in_flight[category_id]
+        if exists is None:
+            return
+        ttl_s = self.ttl_s if exists else self.negative_ttl_s
+        if ttl_s <= 0 or self.cache_size <= 0:
+            return
+        self.cache[category_id] = (exists, self._clock() + ttl_s)
+        self.cache.move_to_end(category_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
 
 
 category_validator_instance = RabbitMQCategoryValidator()
\ No newline at end of file
@@ -1,21 +1,28 @@
 import asyncio
-import time
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.api.routers import posts
-from app.core.database import create_db_and_tables
+from app.migrations import run_migrations
 from app.core.rabbitmq import category_validator_instance
 from app.core.logging import get_logger
+from app.core.middleware import RequestLoggingMiddleware
+from app.core import metrics
 
 logger = get_logger("posts_service")
 
+# Применять миграции БД при старте; false - только через python -m app.migrations upgrade
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info({"event": "service_startup"})
-    await create_db_and_tables()
+    if MIGRATE_ON_STARTUP:
+        await run_migrations()
     await category_validator_instance.connect()
     logger.info({"event": "service_ready", "rabbitmq": "connected"})
     yield
@@ -28,36 +35,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    logger.info({
-        "event": "request_started",
-        "method": request.method,
-        "path": str(request.url.path),
-        "client_ip": request.client.host if request.client else None
-    })
-    
-    response = await call_next(request)
-    process_time_ms = (time.time() - start_time) * 1000
-    
-    log_data = {
-        "event": "request_completed",
-        "method": request.method,
-        "path": str(request.url.path),
-        "status_code": response.status_code,
-        "duration_ms": round(process_time_ms, 2)
-    }
-    
-    if response.status_code >= 500:
-        logger.error(log_data)
-    elif response.status_code >= 400:
-        logger.warning(log_data)
-    else:
-        logger.info(log_data)
-    
-    return response
+# Логирование и метрики запросов - чистое ASGI-middleware, без BaseHTTPMiddleware
+app.add_middleware(RequestLoggingMiddleware, logger=logger)
 
 
 app.include_router(posts.router)
@@ -66,4 +45,10 @@ app.include_router(posts.router)
 @app.get("/health")
 async def health_check():
     """Healthcheck"""
-    return {"status": "healthy", "service": "posts_service"}
\ No newline at end of file
+    return {"status": "healthy", "service": "posts_service"}
+
+
+@app.get("/metrics")
+async def service_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
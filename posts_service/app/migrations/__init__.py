@@ -0,0 +1,44 @@
+"""Миграции схемы БД постов, по возрастанию версии.
+
+Новая миграция добавляется в конец MIGRATIONS со следующим номером;
+применённые миграции не меняются. Модели в app/models описывают ту же
+схему, что получается после всех миграций.
+"""
+from app.core.database import engine
+from app.core.logging import get_logger
+from app.core.migrations import Migration, migrate
+
+logger = get_logger("posts_service")
+
+MIGRATIONS = [
+    # IF NOT EXISTS: базы, созданные раньше через Base.metadata.create_all, принимаются как версия 1
+    Migration(1, "create_posts", (
+        "CREATE TABLE IF NOT EXISTS posts ("
+        "id INTEGER NOT NULL, title VARCHAR, content VARCHAR, category_id INTEGER, PRIMARY KEY (id))",
+        "CREATE INDEX IF NOT EXISTS ix_posts_title ON posts (title)",
+    )),
+    # Посты категории по возрастанию id (GET /posts/?category_id=, курсор (category_id, id)):
+    # поиск по индексу вместо полного просмотра таблицы и без сортировки
+    Migration(2, "posts_category_id_id_index", (
+        "CREATE INDEX IF NOT EXISTS ix_posts_category_id_id ON posts (category_id, id)",
+    )),
+    # Полнотекстовый индекс для GET /posts/search: FTS5 с внешним содержимым - текст хранится
+    # только в posts, индекс синхронизируют триггеры; rebuild индексирует уже существующие посты
+    Migration(3, "posts_fts", (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+        "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE ON posts BEGIN "
+        "INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END",
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    )),
+]
+
+
+async def run_migrations(target: int | None = None) -> list[Migration]:
+    return await migrate(engine, MIGRATIONS, target=target, logger=logger)
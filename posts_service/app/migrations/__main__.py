@@ -0,0 +1,7 @@
+"""python -m app.migrations upgrade [--to N] | status"""
+from app.core.database import engine
+from app.core.migrations import run_cli
+from app.migrations import MIGRATIONS
+
+if __name__ == "__main__":
+    run_cli(engine, MIGRATIONS)
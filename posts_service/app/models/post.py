@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 
 from app.core.database import Base
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (Index("ix_posts_category_id_id", "category_id", "id"),)
 
     id = Column(Integer, primary_key=True)
     title = Column(String, index=True)
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, column, func, insert, literal_column, or_, select, table, tuple_
 
 from app.models.post import Post
 
@@ -12,12 +12,52 @@ class PostRepository:
         result = await self.db.scalar(select(Post).where(Post.id == post_id))
         return result
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> list[Post]:
-        result = await self.db.scalars(select(Post).offset(skip).limit(limit))
+    async def get_all(self, skip: int = 0, limit: int = 100, after_id: int | None = None) -> list[Post]:
+        """Страница постов по возрастанию id: после after_id (курсор) или со смещением skip."""
+        query = select(Post).order_by(Post.id).limit(limit)
+        query = query.where(Post.id > after_id) if after_id is not None else query.offset(skip)
+        result = await self.db.scalars(query)
         return result.all()
 
-    async def get_by_category_id(self, category_id: int, skip: int = 0, limit: int = 100) -> list[Post]:
-        result = await self.db.scalars(select(Post).where(Post.category_id == category_id).offset(skip).limit(limit))
+    async def get_by_category_id(self, category_id: int, skip: int = 0, limit: int = 100,
+                                 after_id: int | None = None) -> list[Post]:
+        query = select(Post).where(Post.category_id == category_id).order_by(Post.id).limit(limit)
+        query = query.where(Post.id > after_id) if after_id is not None else query.offset(skip)
+        result = await self.db.scalars(query)
+        return result.all()
+
+    async def search(self, match: str, limit: int = 20,
+                     after: tuple[float, int] | None = None) -> list[tuple[Post, float]]:
+        """Посты по запросу FTS5 match с рангом bm25 (меньше - релевантнее), по возрастанию (rank, id).
+
+        after - (rank, id) последнего поста предыдущей страницы.
+        """
+        fts = table("posts_fts", column("rowid"))
+        rank = func.bm25(literal_column("posts_fts"))
+        query = (select(Post, rank.label("rank"))
+                 .join(fts, fts.c.rowid == Post.id)
+                 .where(literal_column("posts_fts").op("MATCH")(match))
+                 .order_by(rank, Post.id)
+                 .limit(limit))
+        if after is not None:
+            query = query.where(or_(rank > after[0], and_(rank == after[0], Post.id > after[1])))
+        result = await self.db.execute(query)
+        return [(post, post_rank) for post, post_rank in result.all()]
+
+    async def get_by_title_prefix(self, prefix: str, limit: int = 20,
+                                  after: tuple[str, int] | None = None) -> list[Post]:
+        """Посты, чей заголовок начинается с prefix, по возрастанию (title, id).
+
+        Диапазон prefix <= title < следующая строка идёт по индексу ix_posts_title,
+        сравнение - с учётом регистра. after - (title, id) последнего поста предыдущей страницы.
+        """
+        query = select(Post).where(Post.title >= prefix).order_by(Post.title, Post.id).limit(limit)
+        upper = _prefix_upper_bound(prefix)
+        if upper is not None:
+            query = query.where(Post.title < upper)
+        if after is not None:
+            query = query.where(tuple_(Post.title, Post.id) > tuple_(*after))
+        result = await self.db.scalars(query)
         return result.all()
 
     async def create(self, title: str, content: str, category_id: int) -> Post:
@@ -30,3 +70,29 @@ class PostRepository:
         await self.db.commit()
         await self.db.refresh(db_post)
         return db_post
+
+    async def create_many(self, posts: list[dict]) -> list[int]:
+        """Вставляет посты одним executemany в одной транзакции, возвращает id в порядке posts."""
+        try:
+            ids = await self.db.scalars(insert(Post).returning(Post.id, sort_by_parameter_order=True), posts)
+            ids = ids.all()
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return list(ids)
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """Наименьшая строка больше всех строк, начинающихся с prefix; None - такой нет.
+
+    Суррогаты U+D800-U+DFFF пропускаются: одиночный суррогат нельзя передать в SQLite.
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
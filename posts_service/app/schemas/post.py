@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel, ConfigDict, Field, PositiveInt
 
 
@@ -10,4 +12,23 @@ class PostBase(BaseModel):
 class Post(PostBase):
     id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Сколько постов можно создать одним запросом POST /posts/bulk
+MAX_POSTS_PER_BULK = 1000
+
+
+class PostBulkCreate(BaseModel):
+    # Элементы проверяются по одному в сервисе: ошибка в одном посте не отклоняет весь запрос
+    posts: list[Any] = Field(..., min_length=1, max_length=MAX_POSTS_PER_BULK)
+
+
+class PostBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class PostBulkResult(BaseModel):
+    ids: list[int | None]  # id созданного поста на позиции запроса, None - пост не создан
+    errors: list[PostBulkError]
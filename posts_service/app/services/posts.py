@@ -1,9 +1,37 @@
-from typing import List, Optional
+import asyncio
+import os
+from typing import Any, List, Optional
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.repositories.posts import PostRepository
-from app.schemas.post import Post, PostBase
+from app.schemas.post import Post, PostBase, PostBulkError, PostBulkResult
 from app.core.rabbitmq import RabbitMQCategoryValidator
+from app.core.logging import get_logger
+
+logger = get_logger("posts_service")
+
+# Сколько постов вставляется одной транзакцией при массовом создании
+BULK_INSERT_CHUNK = int(os.getenv("POSTS_BULK_INSERT_CHUNK", 500))
+
+
+def to_fts_query(query: str) -> Optional[str]:
+    """Запрос пользователя в выражение FTS5: все слова должны встретиться.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 (AND, NEAR,
+    скобки, кавычки) в запросе ищутся как обычный текст и не ломают его.
+    Слово со звёздочкой на конце (fast*) ищется как префикс. None - в
+    запросе нет ни одного слова.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if not any(char.isalnum() for char in word):
+            continue
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
 
 
 class PostService:
@@ -11,19 +39,31 @@ class PostService:
         self.post_repo = post_repo
         self.category_validator = category_validator
 
-    async def get_all_posts(self, skip: int = 0, limit: int = 100) -> List[Post]:
-        return await self.post_repo.get_all(skip=skip, limit=limit)
+    async def get_all_posts(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Post]:
+        return await self.post_repo.get_all(skip=skip, limit=limit, after_id=after_id)
 
     async def get_post_by_id(self, post_id: int) -> Optional[Post]:
         return await self.post_repo.get_by_id(post_id)
 
-    async def get_posts_by_category(self, category_id: int, skip: int = 0, limit: int = 100) -> \
-            List[Post]:
+    async def get_posts_by_category(self, category_id: int, skip: int = 0, limit: int = 100,
+                                    after_id: Optional[int] = None) -> List[Post]:
         if category_id and not await self.category_validator.check_exists(category_id):
             raise HTTPException(status_code=400,
                                 detail="Invalid category_id: Category not found")
 
-        return await self.post_repo.get_by_category_id(category_id, skip=skip, limit=limit)
+        return await self.post_repo.get_by_category_id(category_id, skip=skip, limit=limit, after_id=after_id)
+
+    async def search_posts(self, query: str, limit: int = 20,
+                           after: Optional[tuple[float, int]] = None) -> list[tuple[Post, float]]:
+        """Полнотекстовый поиск по заголовку и тексту, самые релевантные первыми."""
+        match = to_fts_query(query)
+        if match is None:
+            return []
+        return await self.post_repo.search(match, limit=limit, after=after)
+
+    async def autocomplete_posts(self, prefix: str, limit: int = 20,
+                                 after: Optional[tuple[str, int]] = None) -> List[Post]:
+        return await self.post_repo.get_by_title_prefix(prefix, limit=limit, after=after)
 
     async def create_post(self, post: PostBase) -> Optional[Post]:
         if not await self.category_validator.check_exists(post.category_id):
@@ -35,3 +75,47 @@ class PostService:
             content=post.content,
             category_id=post.category_id
         )
+
+    async def create_posts_bulk(self, items: list[Any]) -> PostBulkResult:
+        """Создаёт посты пачкой; ошибка отдельного поста не мешает остальным.
+
+        Каждая категория проверяется один раз, сколько бы постов на неё ни
+        ссылалось (проверки идут параллельно и уходят пакетом RPC). Посты
+        вставляются транзакциями по BULK_INSERT_CHUNK штук.
+        """
+        ids: list[Optional[int]] = [None] * len(items)
+        errors: list[PostBulkError] = []
+        valid: list[tuple[int, PostBase]] = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, PostBase.model_validate(item)))
+            except ValidationError as e:
+                detail = "; ".join(f"{'.'.join(map(str, error['loc'])) or 'post'}: {error['msg']}"
+                                   for error in e.errors())
+                errors.append(PostBulkError(index=index, detail=detail))
+
+        category_ids = sorted({post.category_id for _, post in valid})
+        exists = await asyncio.gather(*(self.category_validator.check_exists(category_id)
+                                         for category_id in category_ids))
+        known = {category_id for category_id, found in zip(category_ids, exists) if found}
+        rows = []
+        for index, post in valid:
+            if post.category_id in known:
+                rows.append((index, post))
+            else:
+                errors.append(PostBulkError(index=index, detail="Invalid category_id: Category not found"))
+
+        for start in range(0, len(rows), BULK_INSERT_CHUNK):
+            chunk = rows[start:start + BULK_INSERT_CHUNK]
+            try:
+                created = await self.post_repo.create_many([post.model_dump() for _, post in chunk])
+            except SQLAlchemyError as e:
+                logger.error({"event": "create_posts_bulk_chunk_failed", "first_index": chunk[0][0],
+                              "size": len(chunk), "error_type": type(e).__name__, "error_message": str(e)})
+                errors.extend(PostBulkError(index=index, detail="Unable to create post") for index, _ in chunk)
+                continue
+            for (index, _), post_id in zip(chunk, created):
+                ids[index] = post_id
+
+        errors.sort(key=lambda error: error.index)
+        return PostBulkResult(ids=ids, errors=errors)
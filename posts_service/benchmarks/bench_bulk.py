@@ -0,0 +1,103 @@
+"""Пропускная способность создания постов: цикл POST /posts/ против POST /posts/bulk.
+
+Приложение сервиса вызывается через ASGI без сети, база - временный
+файл SQLite со схемой из миграций (commit каждой транзакции доходит до
+диска). Проверка категорий идёт через настоящий RabbitMQCategoryValidator
+(кэш, пакеты), RabbitMQ заменён клиентом с задержкой --rpc-latency-ms на
+вызов.
+
+Запуск из каталога posts_service:
+
+    python -m benchmarks.bench_bulk --posts 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.dependencies import get_async_db, get_category_validator
+from app.core.migrations import migrate
+from app.core.rabbitmq import RabbitMQCategoryValidator
+from app.main import app
+from app.migrations import MIGRATIONS
+from app.schemas.post import MAX_POSTS_PER_BULK
+
+
+class LatencyRpcClient:
+    """Вместо RabbitMQ: все категории существуют, каждый вызов стоит latency_s."""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def call(self, category_id: int) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        return b"true"
+
+    async def call_many(self, category_ids: list[int]) -> dict[int, bool]:
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        return {category_id: True for category_id in category_ids}
+
+
+def _posts(count: int, categories: int) -> list[dict]:
+    return [{"title": f"post {i}", "content": "text " * 20, "category_id": i % categories + 1}
+            for i in range(count)]
+
+
+async def _run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'posts.db')}")
+        await migrate(engine, MIGRATIONS)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        rpc = LatencyRpcClient(args.rpc_latency_ms / 1000)
+        validator = RabbitMQCategoryValidator(rpc)
+
+        async def _get_db():
+            async with sessions() as session:
+                yield session
+
+        app.dependency_overrides[get_async_db] = _get_db
+        app.dependency_overrides[get_category_validator] = lambda: validator
+        posts = _posts(args.posts, args.categories)
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://posts") as client:
+                started = time.perf_counter()
+                if mode == "single":
+                    for post in posts:
+                        assert (await client.post("/posts/", json=post)).status_code == 201
+                else:
+                    for start in range(0, len(posts), args.bulk_size):
+                        response = await client.post("/posts/bulk", json={"posts": posts[start:start + args.bulk_size]})
+                        assert response.status_code == 200 and not response.json()["errors"]
+                elapsed = time.perf_counter() - started
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+    return {"mode": mode, "posts": args.posts, "seconds": round(elapsed, 2),
+            "posts_per_s": round(args.posts / elapsed, 1), "rpc_calls": rpc.calls}
+
+
+async def _run(args):
+    for mode in ("single", "bulk"):
+        result = await _run_mode(mode, args)
+        print(f"{result['mode']:>7}: {result['posts']} posts in {result['seconds']}s, "
+              f"{result['posts_per_s']} posts/s, {result['rpc_calls']} RPC calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--bulk-size", type=int, default=MAX_POSTS_PER_BULK)
+    parser.add_argument("--rpc-latency-ms", type=float, default=1.0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
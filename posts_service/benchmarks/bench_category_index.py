@@ -0,0 +1,78 @@
+"""Выборка постов категории на 1 млн строк до и после индекса (category_id, id).
+
+Схема создаётся миграциями до версии 1 (без индекса), таблица
+заполняется --rows постами, и через PostRepository замеряется медиана
+времени страницы категории: первая, по курсору из середины и со
+смещением. Затем применяются остальные миграции и замер повторяется.
+Для каждого запроса печатается план SQLite (EXPLAIN QUERY PLAN).
+
+Запуск из каталога posts_service:
+
+    python -m benchmarks.bench_category_index --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate
+from app.migrations import MIGRATIONS
+from app.models.post import Post
+from app.repositories.posts import PostRepository
+from benchmarks.bench_pagination import _fill, _median_ms
+
+
+async def _plan(session, category_id: int, after_id: int) -> str:
+    query = select(Post).where(Post.category_id == category_id, Post.id > after_id).order_by(Post.id).limit(100)
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    rows = (await session.connection()).exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+    return "; ".join(row[-1] for row in (await rows).all())
+
+
+async def _measure(sessions, args, label: str):
+    middle = args.rows // 2
+    async with sessions() as session:
+        repository = PostRepository(session)
+        cases = [
+            ("first page", lambda: repository.get_by_category_id(1, limit=args.limit)),
+            ("cursor, middle", lambda: repository.get_by_category_id(1, limit=args.limit, after_id=middle)),
+            ("skip, middle", lambda: repository.get_by_category_id(
+                1, skip=middle // args.categories, limit=args.limit)),
+        ]
+        print(f"{label}: {await _plan(session, 1, middle)}")
+        for name, page in cases:
+            print(f"  {name:<16} {await _median_ms(page, args.repeat):>8.2f} ms")
+
+
+async def _run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        await migrate(engine, MIGRATIONS, target=1)
+        _fill(path, args.rows, args.categories)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        await _measure(sessions, args, "before")
+        started = time.perf_counter()
+        await migrate(engine, MIGRATIONS)
+        print(f"migrations applied in {time.perf_counter() - started:.1f}s")
+        await _measure(sessions, args, "after")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
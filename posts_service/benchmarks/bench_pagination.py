@@ -0,0 +1,87 @@
+"""Задержка страницы постов в зависимости от глубины: skip/limit против курсора.
+
+Заполняет временную базу SQLite --rows постами (category_id от 1 до
+--categories по кругу) и для глубин 0, 10k и конца таблицы замеряет
+медиану времени страницы через PostRepository: со смещением (OFFSET
+читает и выбрасывает пропущенные строки) и по курсору (id > last_id,
+поиск по первичному ключу). То же - для постов одной категории.
+
+Запуск из каталога posts_service:
+
+    python -m benchmarks.bench_pagination --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.repositories.posts import PostRepository
+
+
+def _fill(path: str, rows: int, categories: int):
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO posts (id, title, content, category_id) VALUES (?, ?, ?, ?)",
+                     ((i, f"post {i}", "text", i % categories + 1) for i in range(1, rows + 1)))
+    conn.commit()
+    conn.close()
+
+
+async def _median_ms(page, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await page()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def _run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        started = time.perf_counter()
+        _fill(path, args.rows, args.categories)
+        print(f"filled {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        depths = sorted({0, min(10_000, args.rows), max(0, args.rows - args.limit)})
+        print(f"{'query':>10} {'depth':>9} {'skip, ms':>10} {'cursor, ms':>11}")
+        async with sessions() as session:
+            repository = PostRepository(session)
+            for depth in depths:
+                # Посты пронумерованы подряд, поэтому курсор страницы на глубине depth - id = depth
+                offset_ms = await _median_ms(lambda: repository.get_all(skip=depth, limit=args.limit), args.repeat)
+                cursor_ms = await _median_ms(lambda: repository.get_all(limit=args.limit, after_id=depth),
+                                             args.repeat)
+                print(f"{'all':>10} {depth:>9} {offset_ms:>10.2f} {cursor_ms:>11.2f}")
+            for depth in depths:
+                # В категории 1 каждый --categories-й пост: та же глубина внутри категории
+                category_depth = depth // args.categories
+                after_id = category_depth * args.categories
+                offset_ms = await _median_ms(lambda: repository.get_by_category_id(
+                    1, skip=category_depth, limit=args.limit), args.repeat)
+                cursor_ms = await _median_ms(lambda: repository.get_by_category_id(
+                    1, limit=args.limit, after_id=after_id), args.repeat)
+                print(f"{'category':>10} {category_depth:>9} {offset_ms:>10.2f} {cursor_ms:>11.2f}")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Задержка поиска постов на 1 млн строк: FTS5 с bm25, подсказки по префиксу, LIKE для сравнения.
+
+Схема создаётся миграциями до версии 2, таблица заполняется --rows
+постами из слов синтетического словаря (частоты слов - по закону Ципфа,
+как в обычном тексте), затем миграция 3 строит полнотекстовый индекс.
+Через PostRepository замеряется медиана времени первой и следующей (по
+курсору) страницы для частого, среднего и редкого слова, двух слов и
+префикса слова, а также подсказок по началу заголовка. Для сравнения -
+поиск подстроки через LIKE '%слово%' без индекса.
+
+Запуск из каталога posts_service:
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate
+from app.migrations import MIGRATIONS
+from app.models.post import Post
+from app.repositories.posts import PostRepository
+from app.services.posts import to_fts_query
+from benchmarks.bench_pagination import _median_ms
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "de", "po", "ze", "ar", "in", "ol", "us", "em"]
+
+
+def _vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _fill(path: str, rows: int, vocabulary: list[str], rng: random.Random):
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    conn = sqlite3.connect(path)
+    chunk = 50_000
+    for start in range(1, rows + 1, chunk):
+        count = min(chunk, rows + 1 - start)
+        words = rng.choices(vocabulary, weights, k=count * 34)
+        conn.executemany(
+            "INSERT INTO posts (id, title, content, category_id) VALUES (?, ?, ?, ?)",
+            ((start + i, " ".join(words[i * 34:i * 34 + 4]).capitalize(), " ".join(words[i * 34 + 4:(i + 1) * 34]),
+              (start + i) % 100 + 1) for i in range(count)))
+        conn.commit()
+    conn.close()
+
+
+async def _run(args):
+    rng = random.Random(42)
+    vocabulary = _vocabulary(args.vocabulary, rng)
+    common, medium, rare = vocabulary[0], vocabulary[len(vocabulary) // 50], vocabulary[-1]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        await migrate(engine, MIGRATIONS, target=2)
+        started = time.perf_counter()
+        _fill(path, args.rows, vocabulary, rng)
+        print(f"filled {args.rows} rows in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        await migrate(engine, MIGRATIONS)
+        print(f"full-text index built in {time.perf_counter() - started:.1f}s")
+
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with sessions() as session:
+            repository = PostRepository(session)
+            print(f"{'query':<34} {'matches':>8} {'page 1, ms':>11} {'page 2, ms':>11}")
+            for label, query in [(f"fts common '{common}'", common), (f"fts medium '{medium}'", medium),
+                                 (f"fts rare '{rare}'", rare), (f"fts two words '{medium} {rare}'", f"{medium} {rare}"),
+                                 (f"fts prefix '{medium[:3]}*'", f"{medium[:3]}*")]:
+                match = to_fts_query(query)
+                first = await repository.search(match, limit=args.limit)
+                after = (first[-1][1], first[-1][0].id) if len(first) == args.limit else None
+                matches = (await session.connection()).exec_driver_sql(
+                    "SELECT count(*) FROM posts_fts WHERE posts_fts MATCH ?", (match,))
+                page1 = await _median_ms(lambda: repository.search(match, limit=args.limit), args.repeat)
+                page2 = await _median_ms(lambda: repository.search(match, limit=args.limit, after=after),
+                                         args.repeat) if after else float("nan")
+                print(f"{label:<34} {(await matches).scalar():>8} {page1:>11.2f} {page2:>11.2f}")
+
+            for size in (1, 2, 4):
+                prefix = vocabulary[len(vocabulary) // 3].capitalize()[:size]
+                first = await repository.get_by_title_prefix(prefix, limit=args.limit)
+                after = (first[-1].title, first[-1].id) if len(first) == args.limit else None
+                page1 = await _median_ms(lambda: repository.get_by_title_prefix(prefix, limit=args.limit), args.repeat)
+                page2 = await _median_ms(lambda: repository.get_by_title_prefix(prefix, limit=args.limit, after=after),
+                                         args.repeat) if after else float("nan")
+                print(f"{f'title prefix {prefix!r}':<34} {'':>8} {page1:>11.2f} {page2:>11.2f}")
+
+            like = select(Post).where(Post.content.like(f"%{rare}%")).limit(args.limit)
+            like_ms = await _median_ms(lambda: session.scalars(like), max(1, args.repeat // 5))
+            print(f"{f'LIKE %{rare}% (no index)':<34} {'':>8} {like_ms:>11.2f}")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -133,6 +133,113 @@ async def test_get_posts_with_pagination(client, mock_category_validator):
     assert data[1]["title"] == "Post 3"
 
 
+@pytest.mark.asyncio
+async def test_get_posts_with_cursor(client, mock_category_validator):
+    """Тест: обход постов категории по курсору из X-Next-Cursor"""
+    mock_category_validator.check_exists.return_value = True
+
+    for i in range(5):
+        await client.post("/posts/", json={"title": f"Post {i}", "content": f"Content {i}", "category_id": 1 + i % 2})
+
+    titles = []
+    response = await client.get("/posts/?category_id=1&limit=2")
+    while True:
+        assert response.status_code == 200
+        titles += [post["title"] for post in response.json()]
+        if "x-next-cursor" not in response.headers:
+            break
+        response = await client.get(f"/posts/?category_id=1&limit=2&cursor={response.headers['x-next-cursor']}")
+
+    assert titles == ["Post 0", "Post 2", "Post 4"]
+
+    first_page = await client.get("/posts/?limit=2")
+    wrong_category = await client.get(f"/posts/?category_id=2&cursor={first_page.headers['x-next-cursor']}")
+    assert wrong_category.status_code == 400
+    assert (await client.get("/posts/?cursor=garbage")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_posts_bulk(client, mock_category_validator):
+    """Тест: массовое создание - каждая категория проверяется один раз, ошибки по индексам"""
+    mock_category_validator.check_exists.side_effect = lambda category_id: category_id != 99
+    posts = [{"title": f"Post {i}", "content": "Content", "category_id": 1 + i % 2} for i in range(4)]
+    posts.insert(1, {"title": "", "content": "Content", "category_id": 1})
+    posts.insert(3, {"title": "Orphan", "content": "Content", "category_id": 99})
+
+    response = await client.post("/posts/bulk", json={"posts": posts})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [error["index"] for error in data["errors"]] == [1, 3]
+    assert "Category not found" in data["errors"][1]["detail"]
+    created = [post_id for post_id in data["ids"] if post_id is not None]
+    assert len(created) == 4 and data["ids"][1] is None and data["ids"][3] is None
+    assert sorted(call.args[0] for call in mock_category_validator.check_exists.call_args_list) == [1, 2, 99]
+
+    listed = (await client.get("/posts/")).json()
+    assert [post["id"] for post in listed] == created
+    assert (await client.post("/posts/bulk", json={"posts": []})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_search_posts_ranked(client, mock_category_validator):
+    """Тест: полнотекстовый поиск - релевантные посты первыми, операторы FTS в запросе не ломают его"""
+    posts = [
+        {"title": "Cooking pasta", "content": "Water, salt and pasta", "category_id": 1},
+        {"title": "FastAPI guide", "content": "FastAPI with SQLite: FastAPI routers", "category_id": 1},
+        {"title": "Notes", "content": "A short note about fastapi", "category_id": 2},
+        {"title": "Привет", "content": "Заметка про FastAPI на русском", "category_id": 2},
+    ]
+    await client.post("/posts/bulk", json={"posts": posts})
+
+    response = await client.get("/posts/search", params={"q": "fastapi"})
+    assert response.status_code == 200
+    titles = [post["title"] for post in response.json()]
+    assert titles[0] == "FastAPI guide" and sorted(titles[1:]) == ["Notes", "Привет"]
+
+    page = await client.get("/posts/search", params={"q": "fastapi", "limit": 2})
+    rest = await client.get("/posts/search", params={"q": "fastapi", "limit": 2,
+                                                    "cursor": page.headers["x-next-cursor"]})
+    assert [post["title"] for post in page.json() + rest.json()] == titles
+
+    assert [p["title"] for p in (await client.get("/posts/search", params={"q": "заметка fast*"})).json()] == ["Привет"]
+    assert (await client.get("/posts/search", params={"q": 'AND "( NEAR'})).json() == []
+    assert (await client.get("/posts/search")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_posts_by_title_prefix_with_cursor(client, mock_category_validator):
+    """Тест: подсказки по началу заголовка - по алфавиту, страницы по курсору"""
+    titles = ["Fast food", "FastAPI", "Fasting", "Faster", "Slow", "fast lowercase"]
+    await client.post("/posts/bulk", json={"posts": [{"title": t, "content": "text", "category_id": 1}
+                                                     for t in titles]})
+
+    found = []
+    response = await client.get("/posts/search", params={"prefix": "Fast", "limit": 2})
+    while True:
+        found += [post["title"] for post in response.json()]
+        if "x-next-cursor" not in response.headers:
+            break
+        response = await client.get("/posts/search", params={"prefix": "Fast", "limit": 2,
+                                                             "cursor": response.headers["x-next-cursor"]})
+
+    assert found == ["Fast food", "FastAPI", "Faster", "Fasting"]
+
+
+@pytest.mark.asyncio
+async def test_search_posts_by_title_prefix_before_surrogates(client, mock_category_validator):
+    """Тест: префикс, кончающийся на U+D7FF, не ломает верхнюю границу диапазона"""
+    titles = ["a\ud7ff", "a\ud7ffz", "a\ue000", "b"]
+    await client.post("/posts/bulk", json={"posts": [{"title": t, "content": "text", "category_id": 1}
+                                                     for t in titles]})
+
+    response = await client.get("/posts/search?prefix=a%ED%9F%BF")
+
+    assert response.status_code == 200
+    assert [post["title"] for post in response.json()] == ["a\ud7ff", "a\ud7ffz"]
+    assert [p["title"] for p in (await client.get("/posts/search", params={"prefix": "a\U0010ffff"})).json()] == []
+
+
 @pytest.mark.asyncio
 async def test_create_post_invalid_data(client):
     """Тест: создание поста с невалидными данными"""
@@ -159,3 +266,15 @@ async def test_create_post_invalid_data(client):
 
 
 
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    """Тест: /metrics отдаёт гистограммы запросов по шаблону маршрута и SQL-запросов"""
+    await client.get("/posts/999")
+    
+    response = await client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert ('http_request_duration_seconds_count{method="GET",route="/posts/{post_id}",status_code="404"}'
+            in response.text)
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in response.text
+    assert "rpc_client_timeouts" in response.text
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.core.rabbitmq import BatchNotSupported, RabbitMQCategoryValidator
+
+
+class FakeRpcClient:
+    """RPC-клиент с ответами из словаря: id -> b'true' / b'false' / None (таймаут)"""
+
+    def __init__(self, responses: dict, batch_supported: bool = True):
+        self.responses = responses
+        self.batch_supported = batch_supported
+        self.calls = []
+        self.batches = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def call(self, category_id: int):
+        self.calls.append(category_id)
+        await self.release.wait()
+        return self.responses.get(category_id)
+
+    async def call_many(self, category_ids: list[int]):
+        if not self.batch_supported:
+            raise BatchNotSupported(b"false")
+        self.calls.extend(category_ids)
+        self.batches.append(category_ids)
+        await self.release.wait()
+        if any(self.responses.get(i) is None for i in category_ids):
+            return None
+        return {i: self.responses[i] == b"true" for i in category_ids}
+
+
+@pytest.mark.asyncio
+async def test_validator_caches_positive_and_negative_results():
+    """Тест: найденные и ненайденные id кэшируются на свои TTL, таймаут не кэшируется"""
+    now = [0.0]
+    rpc = FakeRpcClient({1: b"true", 2: b"false"})
+    validator = RabbitMQCategoryValidator(rpc, ttl_s=60, negative_ttl_s=5, clock=lambda: now[0])
+
+    assert [await validator.check_exists(i) for i in (1, 2, 3, 1, 2, 3)] == [True, False, False] * 2
+    assert rpc.calls == [1, 2, 3, 3]
+
+    now[0] = 10  # отрицательная запись истекла, положительная ещё нет
+    rpc.responses[2] = b"true"
+    assert await validator.check_exists(2) is True
+    assert await validator.check_exists(1) is True
+    assert rpc.calls == [1, 2, 3, 3, 2]
+
+    now[0] = 61  # положительная запись истекла: удаление категории становится видно
+    rpc.responses[1] = b"false"
+    assert await validator.check_exists(1) is False
+    assert rpc.calls[-1] == 1
+
+
+@pytest.mark.asyncio
+async def test_validator_single_flight_and_lru_eviction():
+    """Тест: одновременные проверки одного id делят один RPC-вызов, старые записи вытесняются"""
+    rpc = FakeRpcClient({1: b"true", 2: b"true", 3: b"true"})
+    validator = RabbitMQCategoryValidator(rpc, cache_size=2)
+
+    rpc.release.clear()
+    checks = [asyncio.create_task(validator.check_exists(1)) for _ in range(10)]
+    await asyncio.sleep(0)
+    rpc.release.set()
+    assert await asyncio.gather(*checks) == [True] * 10
+    assert rpc.calls == [1]
+
+    await validator.check_exists(2)
+    await validator.check_exists(1)  # 1 становится самой свежей записью
+    await validator.check_exists(3)
+    assert list(validator.cache) == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_validator_batches_concurrent_misses():
+    """Тест: промахи по разным id за окно уходят одним пакетным вызовом, размер пакета ограничен"""
+    rpc = FakeRpcClient({i: b"true" if i % 2 else b"false" for i in range(1, 8)})
+    validator = RabbitMQCategoryValidator(rpc, batch_window_s=0.01, batch_max_ids=5)
+
+    results = await asyncio.gather(*(validator.check_exists(i) for i in range(1, 8)))
+
+    assert results == [True, False, True, False, True, False, True]
+    assert rpc.batches == [[1, 2, 3, 4, 5], [6, 7]]
+
+
+@pytest.mark.asyncio
+async def test_validator_falls_back_to_single_checks():
+    """Тест: старый categories_service без пакетного формата - проверки идут по одной"""
+    rpc = FakeRpcClient({1: b"true", 2: b"false"}, batch_supported=False)
+    validator = RabbitMQCategoryValidator(rpc, batch_window_s=0.01)
+
+    assert await asyncio.gather(validator.check_exists(1), validator.check_exists(2)) == [True, False]
+    assert sorted(rpc.calls) == [1, 2]
+    assert validator.batcher.supported is False
+
+
+@pytest.mark.asyncio
+async def test_batching_is_retried_after_unsupported_reply():
+    """Тест: после ответа старого формата пакеты снова пробуются по истечении паузы"""
+    now = [0.0]
+    rpc = FakeRpcClient({1: b"true", 2: b"false", 3: b"true"}, batch_supported=False)
+    validator = RabbitMQCategoryValidator(rpc, ttl_s=0, negative_ttl_s=0, batch_window_s=0.01,
+                                          clock=lambda: now[0])
+    validator.batcher.retry_s = 30
+
+    assert await validator.check_exists(1) is True
+    assert validator.batcher.supported is False
+
+    # Все реплики categories_service обновились, но пауза ещё идёт - проверки по одной
+    rpc.batch_supported = True
+    now[0] = 10
+    assert await validator.check_exists(2) is False
+    assert rpc.batches == []
+
+    now[0] = 31
+    assert await asyncio.gather(validator.check_exists(1), validator.check_exists(3)) == [True, True]
+    assert rpc.batches == [[1, 3]]
+    assert validator.batcher.supported is True
@@ -0,0 +1,60 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.migrations import Migration, MigrationError, migrate, migration_status
+from app.migrations import MIGRATIONS
+
+
+@pytest_asyncio.fixture()
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'posts.db'}")
+    yield engine
+    await engine.dispose()
+
+
+async def _indexes(engine) -> set[str]:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'posts'")
+        return {name for name, in result.all()}
+
+
+@pytest.mark.asyncio
+async def test_migrate_fresh_database_once(engine):
+    """Тест: миграции создают схему с индексом (category_id, id), повторный запуск ничего не делает"""
+    applied = await migrate(engine, MIGRATIONS)
+
+    assert [migration.version for migration in applied] == [1, 2, 3]
+    assert {"ix_posts_title", "ix_posts_category_id_id"} <= await _indexes(engine)
+    assert await migrate(engine, MIGRATIONS) == []
+    assert all(row["applied_at"] for row in await migration_status(engine, MIGRATIONS))
+
+
+@pytest.mark.asyncio
+async def test_migrate_adopts_database_created_by_create_all(engine):
+    """Тест: база, созданная до миграций, сохраняет данные, получает новый индекс и поиск по старым постам"""
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE TABLE posts (id INTEGER NOT NULL, title VARCHAR, content VARCHAR, "
+                                   "category_id INTEGER, PRIMARY KEY (id))")
+        await conn.exec_driver_sql("CREATE INDEX ix_posts_title ON posts (title)")
+        await conn.exec_driver_sql("INSERT INTO posts VALUES (1, 'title', 'text', 3)")
+
+    await migrate(engine, MIGRATIONS)
+
+    assert "ix_posts_category_id_id" in await _indexes(engine)
+    async with engine.connect() as conn:
+        assert (await conn.exec_driver_sql("SELECT category_id FROM posts")).scalar() == 3
+        assert (await conn.exec_driver_sql("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'text'")).scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_migrate_failure_and_unknown_versions(engine):
+    """Тест: ошибка в миграции откатывает весь запуск; версия из будущего останавливает миграции"""
+    broken = [*MIGRATIONS, Migration(99, "broken", ("CREATE TABLE broken (id INTEGER)", "SELECT * FROM missing"))]
+    with pytest.raises(Exception):
+        await migrate(engine, broken)
+    assert all(row["applied_at"] is None for row in await migration_status(engine, MIGRATIONS))
+
+    await migrate(engine, [*MIGRATIONS, Migration(99, "future", ())])
+    with pytest.raises(MigrationError):
+        await migrate(engine, MIGRATIONS)
@@ -0,0 +1,66 @@
+"""Проверяет, что общие модули сервисов совпадают байт в байт.
+
+Каждый сервис собирается и тестируется отдельно (свой Dockerfile, свой
+requirements.txt), поэтому общий код - логирование, метрики, middleware,
+запуск, пагинация, миграции - лежит в каждом сервисе копией. Правка
+должна попасть во все копии; проверка падает и показывает разницу, если
+копии разошлись.
+
+    python scripts/check_shared_modules.py
+"""
+import difflib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ALL_SERVICES = ("api_gateway_service", "categories_service", "posts_service")
+DATA_SERVICES = ("categories_service", "posts_service")
+
+# Модуль -> сервисы, в которых лежат его копии
+SHARED_MODULES = {
+    "app/core/logging.py": ALL_SERVICES,
+    "app/core/metrics.py": ALL_SERVICES,
+    "app/core/middleware.py": ALL_SERVICES,
+    "app/serve.py": ALL_SERVICES,
+    "app/core/pagination.py": DATA_SERVICES,
+    "app/core/migrations.py": DATA_SERVICES,
+    "app/migrations/__main__.py": DATA_SERVICES,
+}
+
+
+def check() -> list[str]:
+    """Возвращает описания расхождений; пустой список - все копии совпадают."""
+    problems = []
+    for module, services in SHARED_MODULES.items():
+        reference = ROOT / services[0] / module
+        if not reference.exists():
+            problems.append(f"{services[0]}/{module}: missing")
+            continue
+        expected = reference.read_text(encoding="utf-8")
+        for service in services[1:]:
+            copy = ROOT / service / module
+            if not copy.exists():
+                problems.append(f"{service}/{module}: missing")
+                continue
+            actual = copy.read_text(encoding="utf-8")
+            if actual != expected:
+                diff = difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                            f"{services[0]}/{module}", f"{service}/{module}")
+                problems.append("".join(diff))
+    return problems
+
+
+def main() -> int:
+    problems = check()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"\n{len(problems)} shared module copies differ; apply the change to every copy", file=sys.stderr)
+        return 1
+    print(f"{sum(len(services) for services in SHARED_MODULES.values())} shared module copies are in sync")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())